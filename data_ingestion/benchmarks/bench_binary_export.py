@@ -0,0 +1,124 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compare the size and load time of the JSONL and binary exports.
+
+Writes the same synthetic chunks in the JSONL format of `export_chunks` and as
+a binary export, then loads the ids and embeddings of each. Run from the
+data_ingestion directory:
+
+    uv run python -m benchmarks.bench_binary_export --chunks 100000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pyarrow as pa
+from data_ingestion_pipeline.utils.binary_export import (
+    load_binary_export,
+    write_binary_export,
+)
+
+
+def make_batches(
+    num_chunks: int, dimensions: int, batch_size: int = 10_000
+) -> list[pa.RecordBatch]:
+    rng = np.random.default_rng(0)
+    batches = []
+    for start in range(0, num_chunks, batch_size):
+        rows = min(batch_size, num_chunks - start)
+        vectors = rng.standard_normal((rows, dimensions), dtype=np.float32)
+        batches.append(
+            pa.RecordBatch.from_pydict(
+                {
+                    "id": [f"{start + i}__0" for i in range(rows)],
+                    "embedding": pa.FixedSizeListArray.from_arrays(
+                        pa.array(vectors.ravel()), dimensions
+                    ).cast(pa.list_(pa.float32())),
+                    "content": ["chunk text " * 100] * rows,
+                }
+            )
+        )
+    return batches
+
+
+def write_jsonl(batches: list[pa.RecordBatch], path: str) -> None:
+    with open(path, "w") as f:
+        for batch in batches:
+            for row in batch.to_pylist():
+                json_data = json.dumps(
+                    {
+                        "id": row["id"],
+                        "embedding": row["embedding"],
+                        "content": row["content"],
+                    }
+                )
+                f.write(json.dumps({"id": row["id"], "json_data": json_data}) + "\n")
+
+
+def load_jsonl(path: str) -> tuple[list[str], np.ndarray]:
+    ids, embeddings = [], []
+    with open(path) as f:
+        for line in f:
+            document = json.loads(line)
+            ids.append(document["id"])
+            embeddings.append(json.loads(document["json_data"])["embedding"])
+    return ids, np.array(embeddings, dtype=np.float32)
+
+
+def size_mb(path: str) -> float:
+    if os.path.isdir(path):
+        return sum(entry.stat().st_size for entry in os.scandir(path)) / 1e6
+    return os.path.getsize(path) / 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--dimensions", type=int, default=768)
+    args = parser.parse_args()
+
+    batches = make_batches(args.chunks, args.dimensions)
+    with tempfile.TemporaryDirectory() as directory:
+        jsonl_path = os.path.join(directory, "documents.jsonl")
+        binary_path = os.path.join(directory, "binary")
+        write_jsonl(batches, jsonl_path)
+        write_binary_export(batches, binary_path)
+
+        start = time.perf_counter()
+        _, embeddings = load_jsonl(jsonl_path)
+        jsonl_time = time.perf_counter() - start
+        print(
+            f"JSONL  {size_mb(jsonl_path):9.1f} MB  load {jsonl_time:7.2f}s "
+            f"{embeddings.shape}"
+        )
+
+        start = time.perf_counter()
+        export = load_binary_export(binary_path, columns=["id"])
+        # Touch every vector so the comparison includes reading them
+        norms = np.linalg.norm(export.embeddings, axis=1)
+        binary_time = time.perf_counter() - start
+        print(
+            f"binary {size_mb(binary_path):9.1f} MB  load {binary_time:7.2f}s "
+            f"{export.embeddings.shape} ({len(norms)} norms)"
+        )
+        print(f"{jsonl_time / binary_time:.1f}x faster to load")
+
+
+if __name__ == "__main__":
+    main()
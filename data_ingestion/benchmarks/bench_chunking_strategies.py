@@ -0,0 +1,125 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compare the chunks and embedding cost of the chunking strategies.
+
+Embedding cost is counted in characters and tokens (estimate_tokens) sent to the
+model, which is what text embedding models are billed on. A chunk straddles
+sections when it holds text of two sections (the question or an answer) and
+one of them only partially, e.g. the tail of one answer and the next answer.
+
+Run from the data_ingestion directory:
+
+    uv run python -m benchmarks.bench_chunking_strategies --questions 20000
+"""
+
+import argparse
+import re
+import time
+from dataclasses import dataclass
+
+from benchmarks.bench_text_splitter import make_documents
+from data_ingestion_pipeline.utils.text_splitter import (
+    CHUNKING_STRATEGIES,
+    make_text_splitter,
+)
+from data_ingestion_pipeline.utils.tokens import estimate_tokens
+
+_HEADING = re.compile(r"^#{1,6} ", re.MULTILINE)
+
+
+def section_bounds(document: str) -> list[tuple[int, int]]:
+    """Spans of the question and of each answer, without surrounding whitespace."""
+    starts = [0, *[m.start() for m in _HEADING.finditer(document) if m.start() > 0]]
+    spans = []
+    for start, end in zip(starts, [*starts[1:], len(document)], strict=True):
+        section = document[start:end]
+        stripped = section.strip()
+        if stripped:
+            offset = start + section.index(stripped)
+            spans.append((offset, offset + len(stripped)))
+    return spans
+
+
+def straddles(chunk: tuple[int, int], sections: list[tuple[int, int]]) -> bool:
+    """Whether the chunk holds part of a section along with another section."""
+    overlapping = [s for s in sections if s[0] < chunk[1] and chunk[0] < s[1]]
+    if len(overlapping) < 2:
+        return False
+    return overlapping[0][0] < chunk[0] or overlapping[-1][1] > chunk[1]
+
+
+@dataclass
+class StrategyReport:
+    chunks: int = 0
+    characters: int = 0
+    tokens: int = 0
+    straddling_chunks: int = 0
+    seconds: float = 0.0
+
+
+def report(
+    strategy: str, documents: list[str], args: argparse.Namespace
+) -> StrategyReport:
+    splitter = make_text_splitter(strategy, args.chunk_size, args.chunk_overlap)
+    result = StrategyReport()
+    start = time.perf_counter()
+    offsets = [splitter.split_offsets(document) for document in documents]
+    result.seconds = time.perf_counter() - start
+    for document, spans in zip(documents, offsets, strict=True):
+        sections = section_bounds(document)
+        for chunk_start, chunk_end in spans:
+            chunk = document[chunk_start:chunk_end]
+            result.chunks += 1
+            result.characters += len(chunk)
+            result.tokens += estimate_tokens(chunk)
+            if straddles((chunk_start, chunk_end), sections):
+                result.straddling_chunks += 1
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=10000)
+    parser.add_argument("--chunk-size", type=int, default=1500)
+    parser.add_argument("--chunk-overlap", type=int, default=20)
+    args = parser.parse_args()
+
+    documents = make_documents(args.questions)
+    print(f"{len(documents)} documents, {sum(map(len, documents)) / 1e6:.1f} MB")
+    print(
+        f"{'strategy':<10} {'chunks':>9} {'characters':>12} {'tokens':>10} "
+        f"{'straddling':>12} {'time':>8}"
+    )
+    reports = {}
+    for strategy in CHUNKING_STRATEGIES:
+        reports[strategy] = result = report(strategy, documents, args)
+        print(
+            f"{strategy:<10} {result.chunks:>9} {result.characters:>12} "
+            f"{result.tokens:>10} {result.straddling_chunks:>12} "
+            f"{result.seconds:>7.2f}s"
+        )
+
+    baseline, sections = reports["recursive"], reports["sections"]
+    # Negative savings mean the strategy costs more than the recursive splitter
+    print(
+        "sections vs recursive savings: "
+        f"chunks (index entries) {1 - sections.chunks / baseline.chunks:+.1%}, "
+        f"embedded tokens {1 - sections.tokens / baseline.tokens:+.1%}, "
+        f"straddling chunks {baseline.straddling_chunks - sections.straddling_chunks}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Load test the embedding scheduler against the local fake embedding server.
+
+Run from the data_ingestion directory:
+
+    uv run python -m benchmarks.bench_embedding_scheduler --chunks 20000 --concurrency 1 4 16
+"""
+
+import argparse
+import time
+import urllib.error
+
+from benchmarks.fake_embedding_server import running_server
+from benchmarks.synthetic import iter_questions
+from data_ingestion_pipeline.utils.embedding_scheduler import (
+    DEFAULT_BATCH_TOKENS,
+    EmbeddingScheduler,
+    HTTPEmbeddingClient,
+)
+
+
+def make_chunks(num_chunks: int) -> list[str]:
+    """Question bodies cut to chunk-sized texts."""
+    chunks: list[str] = []
+    for question in iter_questions(num_chunks):
+        chunks.append(question["question_text"][:1500])
+    return chunks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--batch-tokens", type=int, default=DEFAULT_BATCH_TOKENS)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    texts = make_chunks(args.chunks)
+    print(f"{len(texts)} chunks, {args.error_rate:.0%} of requests fail with 429")
+    with running_server(latency=args.latency, error_rate=args.error_rate) as url:
+        for concurrency in args.concurrency:
+            scheduler = EmbeddingScheduler(
+                HTTPEmbeddingClient(url),
+                max_concurrency=concurrency,
+                max_batch_tokens=args.batch_tokens,
+                initial_backoff=0.05,
+                retry_on=(urllib.error.HTTPError,),
+            )
+            start = time.perf_counter()
+            run = scheduler.embed(texts)
+            elapsed = time.perf_counter() - start
+            print(
+                f"concurrency {concurrency:<3} {elapsed:7.2f}s "
+                f"{len(texts) / elapsed:9.0f} chunks/s  {run}"
+            )
+
+
+if __name__ == "__main__":
+    main()
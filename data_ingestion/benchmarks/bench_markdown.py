@@ -0,0 +1,98 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark HTML to Markdown conversion: swifter apply vs. process pool.
+
+Run from the data_ingestion directory:
+
+    uv run python -m benchmarks.bench_markdown --questions 20000 --workers 1 4 8
+"""
+
+import argparse
+import time
+from collections.abc import Callable
+from typing import Any
+
+from benchmarks.synthetic import make_questions
+from data_ingestion_pipeline.utils.markdown import (
+    convert_html_to_markdown,
+    convert_in_batches,
+    create_answers_markdown,
+)
+
+
+def swifter_path(questions: list[dict[str, Any]]) -> tuple[list[str], list[str]]:
+    """The conversion as previously done in process_data."""
+    import pandas as pd
+    import swifter  # noqa: F401
+
+    df = pd.DataFrame(questions)
+    question_md = df["question_text"].swifter.apply(convert_html_to_markdown)
+    answers_md = df["answers"].swifter.apply(create_answers_markdown)
+    return question_md.tolist(), answers_md.tolist()
+
+
+def pool_path(
+    questions: list[dict[str, Any]], workers: int, batch_size: int
+) -> tuple[list[str], list[str]]:
+    question_md = convert_in_batches(
+        [q["question_text"] for q in questions],
+        convert_html_to_markdown,
+        max_workers=workers,
+        batch_size=batch_size,
+    )
+    answers_md = convert_in_batches(
+        [q["answers"] for q in questions],
+        create_answers_markdown,
+        max_workers=workers,
+        batch_size=batch_size,
+    )
+    return question_md, answers_md
+
+
+def timed(label: str, func: Callable[[], Any]) -> tuple[float, Any]:
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:8.2f}s")
+    return elapsed, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=5000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--skip-swifter", action="store_true")
+    args = parser.parse_args()
+
+    questions = make_questions(args.questions)
+    print(f"{len(questions)} synthetic questions")
+
+    baseline = None
+    if not args.skip_swifter:
+        baseline_time, baseline = timed("swifter", lambda: swifter_path(questions))
+
+    for workers in args.workers:
+        elapsed, result = timed(
+            f"process pool ({workers} workers)",
+            lambda workers=workers: pool_path(questions, workers, args.batch_size),
+        )
+        if baseline is not None:
+            assert result == baseline, "process pool output differs from swifter"
+            print(f"{'':<28} {baseline_time / elapsed:8.2f}x vs swifter")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Recall@k, size and search time of quantized binary exports.
+
+Re-exports a corpus as float32, float16 and int8 and compares the top-k
+results of each against full precision. Pass a float32 binary export of our
+corpus (the `binary_files` output of `export_chunks`, or `run_local.py
+--binary-export float32`) with `--export-dir`; without it, a synthetic
+clustered corpus is used. Run from the data_ingestion directory:
+
+    uv run python -m benchmarks.bench_quantization --export-dir binary --k 1 10 100
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from collections.abc import Iterator
+
+import numpy as np
+import pyarrow as pa
+from data_ingestion_pipeline.utils.binary_export import (
+    QUANTIZATIONS,
+    BinaryExport,
+    load_binary_export,
+    write_binary_export,
+)
+
+
+def synthetic_corpus(num_chunks: int, dimensions: int) -> np.ndarray:
+    """Unit vectors around a few hundred topics, like answers to similar questions."""
+    rng = np.random.default_rng(0)
+    topics = rng.standard_normal((max(num_chunks // 100, 1), dimensions))
+    vectors = topics[rng.integers(len(topics), size=num_chunks)]
+    vectors += 0.5 * rng.standard_normal((num_chunks, dimensions))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def vector_batches(
+    vectors: np.ndarray, batch_size: int = 10_000
+) -> Iterator[pa.RecordBatch]:
+    for start in range(0, len(vectors), batch_size):
+        block = vectors[start : start + batch_size]
+        yield pa.RecordBatch.from_pydict(
+            {
+                "id": [str(start + i) for i in range(len(block))],
+                "embedding": pa.FixedSizeListArray.from_arrays(
+                    pa.array(np.ascontiguousarray(block, dtype=np.float32).ravel()),
+                    block.shape[1],
+                ).cast(pa.list_(pa.float32())),
+            }
+        )
+
+
+def size_mb(directory: str) -> float:
+    return sum(entry.stat().st_size for entry in os.scandir(directory)) / 1e6
+
+
+def recall(rows: np.ndarray, exact_rows: np.ndarray) -> float:
+    """Share of the exact top-k found by the quantized search."""
+    k = exact_rows.shape[1]
+    return float(
+        np.mean(
+            [
+                len(set(found) & set(exact)) / k
+                for found, exact in zip(rows, exact_rows, strict=True)
+            ]
+        )
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--export-dir", default=None)
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args()
+
+    if args.export_dir:
+        vectors = load_binary_export(args.export_dir, columns=[]).vectors()
+    else:
+        vectors = synthetic_corpus(args.chunks, args.dimensions)
+
+    # Queries near the corpus, as questions are near the answers that match them
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.integers(len(vectors), size=args.queries)]
+    queries = queries + 0.5 * rng.standard_normal(queries.shape).astype(np.float32)
+    max_k = max(args.k)
+    print(
+        f"{len(vectors)} vectors of {vectors.shape[1]} dimensions, {len(queries)} queries"
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        exports: dict[str, BinaryExport] = {}
+        for quantization in QUANTIZATIONS:
+            path = os.path.join(directory, quantization)
+            write_binary_export(
+                vector_batches(vectors), path, quantization=quantization
+            )
+            exports[quantization] = load_binary_export(path, columns=[])
+
+        _, exact_rows = exports["float32"].search(queries, k=max_k)
+        for quantization, export in exports.items():
+            start = time.perf_counter()
+            _, rows = export.search(queries, k=max_k)
+            elapsed = time.perf_counter() - start
+            recalls = "  ".join(
+                f"recall@{k} {recall(rows[:, :k], exact_rows[:, :k]):.4f}"
+                for k in args.k
+            )
+            print(
+                f"{quantization:<8} {size_mb(os.path.join(directory, quantization)):9.1f} MB "
+                f"search {elapsed:7.2f}s  {recalls}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark OffsetTextSplitter against LangChain's RecursiveCharacterTextSplitter.
+
+Run from the data_ingestion directory:
+
+    uv run python -m benchmarks.bench_text_splitter --questions 20000
+"""
+
+import argparse
+import re
+import time
+from collections.abc import Callable
+
+from benchmarks.synthetic import iter_questions
+from data_ingestion_pipeline.utils.text_splitter import OffsetTextSplitter
+
+_TAG = re.compile(r"<[^>]+>")
+
+
+def make_documents(num_questions: int) -> list[str]:
+    """Markdown-like documents shaped like convert_markdown's full_text_md."""
+    documents = []
+    for question in iter_questions(num_questions):
+        answers = "".join(
+            f"\n\n## Answer {i + 1}:\n{_TAG.sub('', answer['body'])}"
+            for i, answer in enumerate(question["answers"])
+        )
+        documents.append(
+            f"# {question['question_title']}\n"
+            f"{_TAG.sub('', question['question_text'])}\n{answers}"
+        )
+    return documents
+
+
+def throughput(label: str, split: Callable[[str], list[str]], docs: list[str]) -> float:
+    total_chars = sum(len(doc) for doc in docs)
+    start = time.perf_counter()
+    chunks = sum(len(split(doc)) for doc in docs)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<32} {elapsed:8.2f}s {total_chars / elapsed / 1e6:8.2f} MB/s "
+        f"{chunks} chunks"
+    )
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=10000)
+    parser.add_argument("--chunk-size", type=int, default=1500)
+    parser.add_argument("--chunk-overlap", type=int, default=20)
+    args = parser.parse_args()
+
+    documents = make_documents(args.questions)
+    print(f"{len(documents)} documents, {sum(map(len, documents)) / 1e6:.1f} MB")
+
+    splitter = OffsetTextSplitter(
+        chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap
+    )
+    offset_time = throughput("OffsetTextSplitter", splitter.split_text, documents)
+
+    try:
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+    except ImportError:
+        print("langchain-text-splitters not installed, skipping the comparison")
+        return
+
+    reference = RecursiveCharacterTextSplitter(
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        length_function=len,
+    )
+    reference_time = throughput(
+        "RecursiveCharacterTextSplitter", reference.split_text, documents
+    )
+    print(f"{'':<32} {reference_time / offset_time:8.2f}x speedup")
+
+
+if __name__ == "__main__":
+    main()
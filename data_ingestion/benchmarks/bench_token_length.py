@@ -0,0 +1,107 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark token-based chunk sizing against character-based sizing.
+
+Splits the same documents with `len`, with `estimate_tokens` and with a
+memoizing `TokenCounter`, and reports the splitter time relative to the
+character path together with the token spread of the resulting chunks.
+
+Run from the data_ingestion directory:
+
+    uv run python -m benchmarks.bench_token_length --questions 20000
+"""
+
+import argparse
+import statistics
+import time
+from collections.abc import Callable
+
+from benchmarks.bench_text_splitter import make_documents
+from data_ingestion_pipeline.utils.text_splitter import OffsetTextSplitter
+from data_ingestion_pipeline.utils.tokens import TokenCounter, estimate_tokens
+
+
+def run(
+    label: str,
+    documents: list[str],
+    chunk_size: int,
+    chunk_overlap: int,
+    length_function: Callable[[str], int],
+    baseline: float | None = None,
+) -> float:
+    splitter = OffsetTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=length_function,
+    )
+    start = time.perf_counter()
+    chunks = [
+        chunk for document in documents for chunk in splitter.split_text(document)
+    ]
+    elapsed = time.perf_counter() - start
+    tokens = sorted(estimate_tokens(chunk) for chunk in chunks)
+    overhead = f"{elapsed / baseline:6.2f}x" if baseline else f"{'':>7}"
+    print(
+        f"{label:<34} {elapsed:7.2f}s {overhead} {len(chunks):>8} "
+        f"{statistics.median(tokens):>8.0f} {tokens[len(tokens) * 99 // 100]:>8} "
+        f"{tokens[-1]:>8}"
+    )
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=10000)
+    parser.add_argument("--chunk-size", type=int, default=1500, help="In characters")
+    parser.add_argument("--token-chunk-size", type=int, default=400)
+    parser.add_argument("--chunk-overlap", type=int, default=20)
+    args = parser.parse_args()
+
+    documents = make_documents(args.questions)
+    print(f"{len(documents)} documents, {sum(map(len, documents)) / 1e6:.1f} MB")
+    print(
+        f"{'length function':<34} {'time':>8} {'factor':>7} {'chunks':>8} "
+        f"{'median':>8} {'p99':>8} {'max':>8}  (tokens per chunk)"
+    )
+    baseline = run(
+        f"len, {args.chunk_size} characters",
+        documents,
+        args.chunk_size,
+        args.chunk_overlap,
+        len,
+    )
+    token_overlap = max(1, args.chunk_overlap // 4)
+    run(
+        f"estimate_tokens, {args.token_chunk_size} tokens",
+        documents,
+        args.token_chunk_size,
+        token_overlap,
+        estimate_tokens,
+        baseline,
+    )
+    counter = TokenCounter()
+    run(
+        f"TokenCounter, {args.token_chunk_size} tokens",
+        documents,
+        args.token_chunk_size,
+        token_overlap,
+        counter,
+        baseline,
+    )
+    print(f"TokenCounter memo: {len(counter)} distinct short texts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Local fake embedding server for load testing the embedding scheduler.
+
+Accepts `POST {"texts": [...]}` and answers `{"embeddings": [[...], ...]}` with
+deterministic vectors after a configurable latency. A share of requests fails
+with HTTP 429, like a quota error, and batches above `max_texts` are rejected
+with HTTP 400. Run it standalone from the data_ingestion directory:
+
+    uv run python -m benchmarks.fake_embedding_server --port 8080 --error-rate 0.1
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from data_ingestion_pipeline.utils.embedding_scheduler import deterministic_embedding
+
+
+def make_handler(
+    latency: float, error_rate: float, max_texts: int, dimensions: int, seed: int
+) -> type[BaseHTTPRequestHandler]:
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            texts = body["texts"]
+            time.sleep(latency)
+            with rng_lock:
+                fail = rng.random() < error_rate
+            if fail:
+                self._respond(429, {"error": "Quota exceeded"})
+            elif len(texts) > max_texts:
+                self._respond(400, {"error": f"At most {max_texts} texts allowed"})
+            else:
+                embeddings = [
+                    deterministic_embedding(text, dimensions) for text in texts
+                ]
+                self._respond(200, {"embeddings": embeddings})
+
+        def _respond(self, status: int, payload: dict) -> None:
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format: str, *args: object) -> None:
+            pass
+
+    return Handler
+
+
+@contextmanager
+def running_server(
+    latency: float = 0.05,
+    error_rate: float = 0.0,
+    max_texts: int = 250,
+    dimensions: int = 768,
+    port: int = 0,
+    seed: int = 0,
+) -> Iterator[str]:
+    """Serve fake embeddings on a background thread, yielding the endpoint URL."""
+    handler = make_handler(latency, error_rate, max_texts, dimensions, seed)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/embed"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-texts", type=int, default=250)
+    parser.add_argument("--dimensions", type=int, default=768)
+    args = parser.parse_args()
+
+    with running_server(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        max_texts=args.max_texts,
+        dimensions=args.dimensions,
+        port=args.port,
+    ) as url:
+        print(f"Serving fake embeddings on {url}")
+        threading.Event().wait()
+
+
+if __name__ == "__main__":
+    main()
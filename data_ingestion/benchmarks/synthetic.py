@@ -0,0 +1,83 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Synthetic StackOverflow-shaped records for the ingestion benchmarks.
+
+Rows mirror the columns selected by `fetch_questions` from
+`stackoverflow_python_questions_and_answers`: HTML question bodies with
+paragraphs, lists and code blocks, and a list of HTML answers per question.
+"""
+
+import random
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+from typing import Any
+
+_WORDS = (
+    "python pandas dataframe list dict index column value error import module "
+    "function class return loop iterate string bytes unicode file path read "
+    "write async await thread process memory numpy array shape dtype merge "
+    "join group apply lambda regex match sort key default argument exception"
+).split()
+
+_CODE = (
+    "import pandas as pd\n"
+    "df = pd.read_csv('data.csv')\n"
+    "for index, row in df.iterrows():\n"
+    "    print(index, row['value'])\n"
+)
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _html_body(rng: random.Random, paragraphs: int) -> str:
+    parts = []
+    for _ in range(paragraphs):
+        parts.append(f"<p>{_sentence(rng, rng.randint(12, 40))}</p>")
+        roll = rng.random()
+        if roll < 0.4:
+            parts.append(f"<pre><code>{_CODE * rng.randint(1, 3)}</code></pre>")
+        elif roll < 0.6:
+            items = "".join(
+                f"<li><code>{rng.choice(_WORDS)}</code> {_sentence(rng, 6)}</li>"
+                for _ in range(rng.randint(2, 5))
+            )
+            parts.append(f"<ul>{items}</ul>")
+    return "\n".join(parts)
+
+
+def iter_questions(num_questions: int, seed: int = 0) -> Iterator[dict[str, Any]]:
+    """Yield `num_questions` deterministic StackOverflow-shaped records."""
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1)
+    for question_id in range(1, num_questions + 1):
+        created = start + timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+        yield {
+            "creation_date": created,
+            "last_edit_date": created + timedelta(days=rng.randint(0, 30)),
+            "question_id": question_id,
+            "question_title": _sentence(rng, rng.randint(5, 12)),
+            "question_text": _html_body(rng, rng.randint(1, 4)),
+            "answers": [
+                {"body": _html_body(rng, rng.randint(1, 5))}
+                for _ in range(rng.randint(0, 5))
+            ],
+        }
+
+
+def make_questions(num_questions: int, seed: int = 0) -> list[dict[str, Any]]:
+    """Return `num_questions` deterministic StackOverflow-shaped records."""
+    return list(iter_questions(num_questions, seed=seed))
@@ -0,0 +1,287 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ruff: noqa
+
+from data_ingestion_pipeline.config import COMPONENT_IMAGE
+from kfp.dsl import Dataset, Input, Metrics, Output, component
+
+
+@component(base_image=COMPONENT_IMAGE)
+def chunk_questions(
+    project_id: str,
+    markdown: Input[Dataset],
+    documents: Output[Dataset],
+    chunks: Output[Dataset],
+    metrics: Output[Metrics],
+    chunk_size: int = 1500,
+    chunk_overlap: int = 20,
+    location: str = "us-central1",
+    destination_dataset: str = "stackoverflow_data",
+    deduped_table: str = "questions_embeddings",
+    embedding_model: str = "text-embedding-005",
+    reuse_unchanged: bool = True,
+    chunk_batch_size: int = 50000,
+    near_duplicate_threshold: float = 0.0,
+    near_duplicate_action: str = "collapse",
+    page_size: int = 0,
+    chunking_strategy: str = "recursive",
+    chunk_length_unit: str = "characters",
+) -> None:
+    """Fingerprint questions and split the changed ones into chunks.
+
+    Args:
+        markdown: Parquet files written by convert_markdown
+        documents: Parquet files of the questions with their content_hash, and
+            whether they reuse the chunks and embeddings stored for them
+        chunks: Parquet files with the question_id, chunk_id, text_chunk and
+            text_hash of the chunks to embed. Near-duplicates collapsed onto
+            an earlier chunk have its id as canonical_chunk_id.
+        metrics: Wall time, rows and chunks of each stage, and the near-duplicate savings
+        chunk_size: Size of text chunks
+        chunk_overlap: Overlap between chunks
+        location: BigQuery location
+        destination_dataset: BigQuery dataset of the deduplicated table
+        deduped_table: Table storing the deduplicated results
+        embedding_model: Embedding model, part of the content fingerprint
+        reuse_unchanged: Reuse the stored chunks and embeddings of questions whose content fingerprint did not change
+        chunk_batch_size: Maximum number of chunks held in memory at once
+        near_duplicate_threshold: Estimated Jaccard similarity from which a chunk is a near-duplicate of an earlier chunk of its batch (0 disables the detection)
+        near_duplicate_action: "collapse" to give near-duplicates the embedding of their canonical chunk, "drop" to leave them out of the index
+        page_size: Questions streamed from BigQuery and fingerprinted or split at a time, with content hashes and each chunk batch appended to BigQuery as they are computed (0 holds them in the component until the end)
+        chunking_strategy: "recursive" to split on paragraphs, lines and words, "sections" to split on the question and answer headings first and keep whole answers together
+        chunk_length_unit: Unit of chunk_size and chunk_overlap: "characters", or "tokens" as estimated by a fast local tokenizer approximation, to stay within the embedding model's token limit
+    """
+    import itertools
+    import logging
+
+    import bigframes.pandas as bpd
+    import google.api_core.exceptions
+    import pandas as pd
+    from google.cloud import bigquery
+
+    from data_ingestion_pipeline.utils.bigquery_artifacts import (
+        create_staging_table,
+        load_table,
+        write_table,
+    )
+    from data_ingestion_pipeline.utils.chunking import iter_chunk_batches
+    from data_ingestion_pipeline.utils.embedding_cache import text_hash
+    from data_ingestion_pipeline.utils.fingerprint import (
+        content_fingerprint,
+        fingerprint_salt,
+    )
+    from data_ingestion_pipeline.utils.instrumentation import StageRecorder
+    from data_ingestion_pipeline.utils.near_duplicates import NearDuplicateFilter
+    from data_ingestion_pipeline.utils.paging import process_pages
+    from data_ingestion_pipeline.utils.text_splitter import make_text_splitter
+
+    # Initialize logging
+    logging.basicConfig(level=logging.INFO)
+
+    # Invalid settings fail before any BigQuery work
+    text_splitter = make_text_splitter(
+        chunking_strategy, chunk_size, chunk_overlap, chunk_length_unit
+    )
+    # Near-duplicate chunks (quoted questions, duplicate questions) are found
+    # within each chunk batch before embedding
+    near_duplicate_filter = NearDuplicateFilter(
+        near_duplicate_threshold, near_duplicate_action
+    )
+
+    # Initialize clients
+    bq_client = bigquery.Client(project=project_id, location=location)
+    bpd.options.bigquery.project = project_id
+    bpd.options.bigquery.location = location
+
+    recorder = StageRecorder(run_name="chunk_questions")
+
+    def fetch_previous_fingerprints(table_ref: str) -> bpd.DataFrame | None:
+        """Fetch the content fingerprint stored for each question, if any."""
+        try:
+            table = bq_client.get_table(table_ref)
+        except google.api_core.exceptions.NotFound:
+            return None
+        if "content_hash" not in {f.name for f in table.schema}:
+            return None
+        return bpd.read_gbq(
+            f"""
+            SELECT question_id, ANY_VALUE(content_hash) AS previous_content_hash
+            FROM `{table_ref}`
+            WHERE content_hash IS NOT NULL
+            GROUP BY question_id
+            """
+        )
+
+    dataset_ref = f"{project_id}.{destination_dataset}"
+    empty_chunks_query = """
+        SELECT
+            CAST(NULL AS INT64) AS question_id,
+            CAST(NULL AS STRING) AS chunk_id,
+            CAST(NULL AS STRING) AS text_chunk,
+            CAST(NULL AS STRING) AS text_hash,
+            CAST(NULL AS STRING) AS canonical_chunk_id
+        LIMIT 0
+    """
+
+    with recorder.stage("fingerprint") as stage_metrics:
+        df = bpd.read_gbq(load_table(bq_client, markdown.uri, dataset_ref, location))
+        stage_metrics.rows_in = len(df)
+
+        # Fingerprint the content. The chunking parameters and embedding model are
+        # part of the fingerprint, so changing them re-processes every question.
+        salt = fingerprint_salt(
+            chunk_size,
+            chunk_overlap,
+            embedding_model,
+            chunking_strategy,
+            chunk_length_unit,
+        )
+
+        def fingerprint(text: str) -> str:
+            return content_fingerprint(text, salt=salt)
+
+        if page_size > 0:
+            # Hash a page of documents at a time and join the hashes back
+            hashes_table_ref = create_staging_table(
+                bq_client,
+                documents.uri,
+                dataset_ref,
+                """
+                SELECT
+                    CAST(NULL AS INT64) AS question_id,
+                    CAST(NULL AS STRING) AS content_hash
+                LIMIT 0
+                """,
+            )
+            process_pages(
+                df[["question_id", "full_text_md"]].to_pandas_batches(
+                    page_size=page_size
+                ),
+                lambda page: pd.DataFrame(
+                    {
+                        "question_id": page["question_id"],
+                        "content_hash": page["full_text_md"].map(fingerprint),
+                    }
+                ),
+                lambda page: bpd.read_pandas(page).to_gbq(
+                    destination_table=hashes_table_ref, if_exists="append"
+                ),
+            )
+            df = df.merge(bpd.read_gbq(hashes_table_ref), how="left", on="question_id")
+        else:
+            df["content_hash"] = df["full_text_md"].to_pandas().map(fingerprint)
+
+        # Questions whose fingerprint is unchanged skip splitting and embedding and
+        # carry over their previously stored chunks and vectors.
+        deduped_table_ref = f"{project_id}.{destination_dataset}.{deduped_table}"
+        previous_fingerprints = (
+            fetch_previous_fingerprints(deduped_table_ref) if reuse_unchanged else None
+        )
+        if previous_fingerprints is not None:
+            df = df.merge(previous_fingerprints, how="left", on="question_id")
+            df["reused"] = df["content_hash"] == df["previous_content_hash"].fillna("")
+            df = df.drop(columns=["previous_content_hash"])
+        else:
+            df["reused"] = False
+        documents_table = write_table(bq_client, df.to_gbq(), documents)
+        df_changed = df[~df["reused"]]
+        stage_metrics.rows_out = num_changed = len(df_changed)
+        logging.info(
+            f"{documents_table.num_rows - num_changed} unchanged questions reuse "
+            f"their chunks and embeddings, {num_changed} questions will be "
+            "re-chunked and re-embedded."
+        )
+
+    # Chunks are streamed in batches of `chunk_batch_size` narrow records
+    # (question_id, chunk_id, text_chunk), so the question metadata is never
+    # copied once per chunk in the component's memory.
+    logging.info("Splitting text into chunks...")
+    questions = (
+        (row.question_id, row.full_text_md)
+        for page in df_changed[["question_id", "full_text_md"]].to_pandas_batches(
+            page_size=page_size or None
+        )
+        for row in page.itertuples(index=False)
+    )
+    batches = iter_chunk_batches(
+        questions, text_splitter.split_text, batch_size=chunk_batch_size
+    )
+    df_chunk_batches = []
+    if page_size > 0:
+        # Each chunk batch is appended as soon as it is split
+        chunks_table_ref = create_staging_table(
+            bq_client, chunks.uri, dataset_ref, empty_chunks_query
+        )
+    for batch_number in itertools.count(1):
+        # Includes reading the next page of questions from BigQuery
+        with recorder.stage("chunk") as stage_metrics:
+            batch = next(batches, None)
+            stage_metrics.chunks = stage_metrics.rows_out = len(batch or [])
+        if batch is None:
+            break
+        with recorder.stage("near_duplicates") as stage_metrics:
+            stage_metrics.rows_in = len(batch)
+            # Dropped near-duplicates are left out, collapsed ones point at
+            # the chunk whose embedding they get
+            kept = [
+                (batch[i], None if i == j else batch[j].chunk_id)
+                for i, j in near_duplicate_filter.apply(
+                    [record.text_chunk for record in batch]
+                )
+            ]
+            df_chunk_batch = bpd.read_pandas(
+                pd.DataFrame(
+                    {
+                        "question_id": [record.question_id for record, _ in kept],
+                        "chunk_id": [record.chunk_id for record, _ in kept],
+                        "text_chunk": [record.text_chunk for record, _ in kept],
+                        "text_hash": [
+                            text_hash(record.text_chunk) for record, _ in kept
+                        ],
+                        "canonical_chunk_id": pd.Series(
+                            [canonical_id for _, canonical_id in kept],
+                            dtype="string",
+                        ),
+                    }
+                )
+            )
+            if page_size > 0:
+                df_chunk_batch.to_gbq(
+                    destination_table=chunks_table_ref, if_exists="append"
+                )
+            else:
+                df_chunk_batches.append(df_chunk_batch)
+            stage_metrics.rows_out = len(kept)
+        logging.info(f"Chunk batch {batch_number}: {len(batch)} chunks")
+    logging.info("Text split into chunks.")
+    logging.info(f"Near-duplicate chunks: {near_duplicate_filter.stats}")
+
+    if df_chunk_batches:
+        chunks_table_ref = bpd.concat(df_chunk_batches, ignore_index=True).to_gbq()
+    elif page_size <= 0:
+        chunks_table_ref = bpd.read_gbq(empty_chunks_query).to_gbq()
+    write_table(bq_client, chunks_table_ref, chunks)
+
+    recorder.log_to(metrics)
+    metrics.log_metric(
+        "near_duplicate_chunks", near_duplicate_filter.stats.near_duplicates
+    )
+    metrics.log_metric(
+        "near_duplicate_embeddings_saved", near_duplicate_filter.stats.embeddings_saved
+    )
+    metrics.log_metric(
+        "near_duplicate_index_entries_saved",
+        near_duplicate_filter.stats.index_entries_saved,
+    )
+    logging.info(f"Stages: {recorder}")
@@ -0,0 +1,129 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ruff: noqa
+
+from data_ingestion_pipeline.config import COMPONENT_IMAGE
+from kfp.dsl import Dataset, Input, Metrics, Output, component
+
+
+@component(base_image=COMPONENT_IMAGE)
+def convert_markdown(
+    project_id: str,
+    questions: Input[Dataset],
+    markdown: Output[Dataset],
+    metrics: Output[Metrics],
+    location: str = "us-central1",
+    destination_dataset: str = "stackoverflow_data",
+    markdown_workers: int = 0,
+    page_size: int = 0,
+) -> None:
+    """Convert the HTML of questions and answers to one markdown document each.
+
+    Args:
+        questions: Parquet files written by fetch_questions
+        markdown: Parquet files with the question_id, last_edit_date,
+            question_text and full_text_md of each question
+        metrics: Wall time and rows of the conversion
+        location: BigQuery location
+        destination_dataset: BigQuery dataset the input is loaded into
+        markdown_workers: Processes used for HTML to markdown conversion (0 uses all cores)
+        page_size: Questions streamed from BigQuery and converted at a time, each page's markdown being appended to BigQuery before the next is read (0 converts every question at once)
+    """
+    import logging
+
+    import bigframes.pandas as bpd
+    import pandas as pd
+    from google.cloud import bigquery
+
+    from data_ingestion_pipeline.utils.bigquery_artifacts import (
+        create_staging_table,
+        load_table,
+        write_table,
+    )
+    from data_ingestion_pipeline.utils.instrumentation import StageRecorder
+    from data_ingestion_pipeline.utils.markdown import convert_questions
+    from data_ingestion_pipeline.utils.paging import process_pages
+
+    # Initialize logging
+    logging.basicConfig(level=logging.INFO)
+
+    # Initialize clients
+    bq_client = bigquery.Client(project=project_id, location=location)
+    bpd.options.bigquery.project = project_id
+    bpd.options.bigquery.location = location
+
+    recorder = StageRecorder(run_name="convert_markdown")
+
+    def convert_page(page: pd.DataFrame) -> pd.DataFrame:
+        """Convert a page of questions to one markdown document each."""
+        full_text_md = convert_questions(
+            page["question_title"].tolist(),
+            page["question_text"].tolist(),
+            page["answers"].tolist(),
+            max_workers=markdown_workers,
+        )
+        return page[["last_edit_date", "question_id", "question_text"]].assign(
+            full_text_md=pd.Series(full_text_md, index=page.index, dtype="string")
+        )
+
+    dataset_ref = f"{project_id}.{destination_dataset}"
+
+    # Convert content to markdown
+    with recorder.stage("markdown") as stage_metrics:
+        questions_table_ref = load_table(
+            bq_client, questions.uri, dataset_ref, location
+        )
+        if page_size > 0:
+            # Only one page of questions and their markdown is held at a time
+            logging.info(
+                f"Converting content to markdown in pages of {page_size} questions..."
+            )
+            markdown_table_ref = create_staging_table(
+                bq_client,
+                markdown.uri,
+                dataset_ref,
+                f"""
+                SELECT
+                    last_edit_date,
+                    question_id,
+                    question_text,
+                    CAST(NULL AS STRING) AS full_text_md
+                FROM `{questions_table_ref}`
+                LIMIT 0
+                """,
+            )
+            page_stats = process_pages(
+                bpd.read_gbq(questions_table_ref).to_pandas_batches(
+                    page_size=page_size
+                ),
+                convert_page,
+                lambda page: bpd.read_pandas(page).to_gbq(
+                    destination_table=markdown_table_ref, if_exists="append"
+                ),
+            )
+            logging.info(f"Markdown pages: {page_stats}")
+            stage_metrics.rows_in = page_stats.rows_in
+        else:
+            logging.info("Converting content to markdown...")
+            df = bpd.read_gbq(questions_table_ref).to_pandas()
+            stage_metrics.rows_in = len(df)
+            markdown_table_ref = bpd.read_pandas(convert_page(df)).to_gbq()
+
+        table = write_table(bq_client, markdown_table_ref, markdown)
+        stage_metrics.rows_out = table.num_rows
+        stage_metrics.bytes_written = table.num_bytes
+        logging.info("Content converted to markdown.")
+
+    recorder.log_to(metrics)
+    logging.info(f"Stages: {recorder}")
@@ -0,0 +1,380 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ruff: noqa
+
+from data_ingestion_pipeline.config import COMPONENT_IMAGE
+from kfp.dsl import Dataset, Input, Metrics, Output, component
+
+
+@component(base_image=COMPONENT_IMAGE)
+def embed_chunks(
+    project_id: str,
+    chunks: Input[Dataset],
+    embedded_chunks: Output[Dataset],
+    metrics: Output[Metrics],
+    location: str = "us-central1",
+    destination_dataset: str = "stackoverflow_data",
+    embedding_model: str = "text-embedding-005",
+    embedding_cache_table: str = "embedding_cache",
+    chunk_batch_size: int = 50000,
+    embedding_max_concurrency: int = 8,
+    embedding_batch_tokens: int = 15000,
+    embedding_max_retries: int = 5,
+    backfill_batch_size: int = 0,
+    backfill_table: str = "embedding_backfill",
+    page_size: int = 0,
+) -> None:
+    """Generate an embedding per chunk, sending only cache misses to the model.
+
+    Args:
+        chunks: Parquet files written by chunk_questions
+        embedded_chunks: Parquet files with the question_id, chunk_id,
+            text_chunk, embedding and embedding_status of each chunk
+        metrics: Wall time and rows of each embedded batch, the rows left failed, and the unique chunk texts found in the embedding cache (embedding_cache_hits) and sent to the model (embedding_cache_misses)
+        location: BigQuery and Vertex AI location
+        destination_dataset: BigQuery dataset of the embedding cache
+        embedding_model: Vertex AI text embedding model
+        embedding_cache_table: Table caching embeddings by model and chunk text hash (empty disables the cache)
+        chunk_batch_size: Maximum number of chunks held in memory and embedded at once
+        embedding_max_concurrency: Maximum number of embedding requests in flight
+        embedding_batch_tokens: Token budget of one embedding request, counted with estimate_tokens and kept below the API's 20,000 token limit
+        embedding_max_retries: Retries of a failed embedding request before its rows get an embedding_status
+        backfill_batch_size: Embed question_id ranges of this many questions, checkpointing each completed range so a retried task resumes after it (0 disables backfill mode)
+        backfill_table: Table holding the embedded chunks of completed ranges; their checkpoints are kept in `<backfill_table>_checkpoints`
+        page_size: Chunks streamed from BigQuery and embedded at a time instead of chunk_batch_size, each page's embeddings being appended to BigQuery before the next is read (0 keeps a reference to every batch until the end)
+    """
+    import logging
+    from datetime import datetime
+
+    import backoff
+    import bigframes.pandas as bpd
+    import google.api_core.exceptions
+    from google.cloud import bigquery
+
+    from data_ingestion_pipeline.utils.backfill import (
+        BigQueryCheckpoint,
+        id_ranges,
+        run_backfill,
+    )
+    from data_ingestion_pipeline.utils.bigquery_artifacts import (
+        create_staging_table,
+        load_table,
+        write_table,
+    )
+    from data_ingestion_pipeline.utils.embedding_cache import CacheStats
+    from data_ingestion_pipeline.utils.embedding_scheduler import (
+        EmbeddingScheduler,
+        VertexAIEmbeddingClient,
+    )
+    from data_ingestion_pipeline.utils.instrumentation import StageRecorder
+
+    # Initialize logging
+    logging.basicConfig(level=logging.INFO)
+
+    # Initialize clients
+    bq_client = bigquery.Client(project=project_id, location=location)
+    bpd.options.bigquery.project = project_id
+    bpd.options.bigquery.location = location
+
+    recorder = StageRecorder(run_name="embed_chunks")
+
+    def get_table_or_none(table_ref: str) -> bigquery.Table | None:
+        """Return the table if it exists."""
+        try:
+            return bq_client.get_table(table_ref)
+        except google.api_core.exceptions.NotFound:
+            return None
+
+    def create_table_if_not_exist(
+        df: bpd.DataFrame, table_ref: str, partition_column: str
+    ) -> None:
+        """Create BigQuery table with time partitioning if it doesn't exist."""
+        table_schema = bq_client.get_table(df.head(0).to_gbq()).schema
+        table = bigquery.Table(table_ref, schema=table_schema)
+        table.time_partitioning = bigquery.TimePartitioning(
+            type_=bigquery.TimePartitioningType.DAY, field=partition_column
+        )
+        bq_client.create_table(table=table, exists_ok=True)
+
+    # Chunks are sent to the model in token-budgeted batches, several at a time.
+    # Only failed batches are retried; rows of batches that keep failing get a
+    # non-empty embedding_status instead of failing the component.
+    # The first invocation in a new project might fail due to permission propagation.
+    @backoff.on_exception(
+        backoff.expo,
+        (
+            google.api_core.exceptions.InvalidArgument,
+            google.api_core.exceptions.PermissionDenied,
+        ),
+        max_tries=10,
+    )
+    def create_embedding_client() -> VertexAIEmbeddingClient:
+        client = VertexAIEmbeddingClient(
+            embedding_model, project=project_id, location=location
+        )
+        client.embed(["permission check"])
+        return client
+
+    scheduler = EmbeddingScheduler(
+        create_embedding_client(),
+        max_concurrency=embedding_max_concurrency,
+        max_batch_tokens=embedding_batch_tokens,
+        max_retries=embedding_max_retries,
+        retry_on=(
+            google.api_core.exceptions.ResourceExhausted,
+            google.api_core.exceptions.ServiceUnavailable,
+            google.api_core.exceptions.InternalServerError,
+            google.api_core.exceptions.DeadlineExceeded,
+        ),
+    )
+    # Rows still failing after the scheduler's retries keep their
+    # embedding_status and are re-embedded by repair_embeddings
+    failed_embeddings = 0
+    # Unique chunk texts found in the cache and sent to the model, over all batches
+    cache_stats = CacheStats()
+    cache_table_ref = (
+        f"{project_id}.{destination_dataset}.{embedding_cache_table}"
+        if embedding_cache_table
+        else None
+    )
+
+    def embed(df: bpd.DataFrame) -> bpd.DataFrame:
+        """Generate an embedding per chunk, sending only embedding cache misses to the model.
+
+        Expects a `text_hash` column holding the hash of each chunk's text.
+        """
+        nonlocal failed_embeddings
+
+        df_hits = None
+        if cache_table_ref and get_table_or_none(cache_table_ref) is not None:
+            # Only the cache entries of the batch's texts are read
+            hashes_table_ref = df[["text_hash"]].drop_duplicates().to_gbq()
+            df_cache = bpd.read_gbq(
+                f"""
+                SELECT
+                    cache.text_hash,
+                    ANY_VALUE(cache.embedding) AS cached_embedding,
+                    TRUE AS cache_hit
+                FROM `{cache_table_ref}` AS cache
+                INNER JOIN `{hashes_table_ref}` AS hashes
+                    ON cache.text_hash = hashes.text_hash
+                WHERE cache.model_name = "{embedding_model}"
+                GROUP BY cache.text_hash
+                """,
+                use_cache=False,
+            )
+            df = df.merge(df_cache, how="left", on="text_hash")
+            is_hit = df["cache_hit"].fillna(False)
+            df_hits = (
+                df[is_hit]
+                .drop(columns=["cache_hit"])
+                .rename(columns={"cached_embedding": "embedding"})
+                .assign(embedding_status="")
+            )
+            df = df[~is_hit].drop(columns=["cached_embedding", "cache_hit"])
+
+        # Identical chunks (e.g. quoted questions) are embedded once
+        df_unique = df[["text_hash", "text_chunk"]].drop_duplicates("text_hash")
+        stats = CacheStats(
+            hits=0 if df_hits is None else df_hits["text_hash"].nunique(),
+            misses=len(df_unique),
+        )
+        cache_stats.hits += stats.hits
+        cache_stats.misses += stats.misses
+        logging.info(
+            f"Embedding cache: {stats}. Sending the {stats.misses} misses to the model."
+        )
+
+        if len(df_unique) > 0:
+            pdf_unique = df_unique.to_pandas()
+            texts = pdf_unique["text_chunk"].tolist()
+            run = scheduler.embed(texts)
+            logging.info(f"Embedding requests: {run}")
+            failed_embeddings += run.failed_rows
+            df_unique = bpd.read_pandas(
+                pdf_unique.assign(
+                    embedding=run.embeddings, embedding_status=run.statuses
+                )
+            )
+            df = df.merge(
+                df_unique.drop(columns=["text_chunk"]), how="inner", on="text_hash"
+            )
+            logging.info("Embeddings generated.")
+
+            if cache_table_ref:
+                # Cache right away so a retried run does not pay for them again
+                df_new_entries = df_unique[df_unique["embedding_status"] == ""][
+                    ["text_hash", "embedding"]
+                ].assign(model_name=embedding_model, creation_timestamp=datetime.now())
+                create_table_if_not_exist(
+                    df=df_new_entries,
+                    table_ref=cache_table_ref,
+                    partition_column="creation_timestamp",
+                )
+                df_new_entries.to_gbq(
+                    destination_table=cache_table_ref, if_exists="append"
+                )
+                logging.info("Embedding cache updated.")
+
+        if df_hits is not None:
+            df = (
+                bpd.concat([df, df_hits[df.columns]], ignore_index=True)
+                if len(df_unique) > 0
+                else df_hits
+            )
+        return df.drop(columns=["text_hash"])
+
+    embedded_columns = [
+        "question_id",
+        "chunk_id",
+        "text_chunk",
+        "embedding",
+        "embedding_status",
+    ]
+    empty_embedded_query = """
+        SELECT
+            CAST(NULL AS INT64) AS question_id,
+            CAST(NULL AS STRING) AS chunk_id,
+            CAST(NULL AS STRING) AS text_chunk,
+            CAST([] AS ARRAY<FLOAT64>) AS embedding,
+            CAST(NULL AS STRING) AS embedding_status
+        LIMIT 0
+    """
+
+    df_chunks = bpd.read_gbq(
+        load_table(
+            bq_client, chunks.uri, f"{project_id}.{destination_dataset}", location
+        )
+    )
+    # Near-duplicates collapsed onto a canonical chunk are not embedded
+    is_canonical = df_chunks["canonical_chunk_id"].isnull()
+    df_canonical = df_chunks[is_canonical].drop(columns=["canonical_chunk_id"])
+    df_duplicates = df_chunks[~is_canonical].drop(columns=["text_hash"])
+
+    def backfill() -> bpd.DataFrame | None:
+        """Embed the canonical chunks range by range, resuming from the checkpoint."""
+        if len(df_canonical) == 0:
+            return None
+        # A retried task reads the same input artifact, hence resumes its ranges
+        run_key = chunks.uri
+        backfill_table_ref = f"{project_id}.{destination_dataset}.{backfill_table}"
+        checkpoint = BigQueryCheckpoint(
+            bq_client, f"{backfill_table_ref}_checkpoints", run_key
+        )
+        question_ids = df_canonical["question_id"]
+        # Ranges hold backfill_batch_size of the question ids present, so sparse
+        # ids never cost a DELETE, count and checkpoint for an empty range
+        ranges = id_ranges(
+            question_ids.drop_duplicates().sort_values().to_pandas().tolist(),
+            backfill_batch_size,
+        )
+
+        def embed_range(start: int, end: int) -> int:
+            with recorder.stage("embed") as stage_metrics:
+                if get_table_or_none(backfill_table_ref) is not None:
+                    # Drop rows of an attempt interrupted before its checkpoint
+                    bq_client.query(
+                        f"""
+                        DELETE FROM `{backfill_table_ref}`
+                        WHERE run_key = "{run_key}"
+                            AND question_id >= {start} AND question_id < {end}
+                        """
+                    ).result()
+                df_range = df_canonical[
+                    (question_ids >= start) & (question_ids < end)
+                ].cache()
+                stage_metrics.rows_in = len(df_range)
+                if stage_metrics.rows_in == 0:
+                    return 0
+                logging.info(
+                    f"Embedding question_id range [{start}, {end}) "
+                    f"({stage_metrics.rows_in} chunks)..."
+                )
+                embed(df_range).assign(run_key=run_key).to_gbq(
+                    destination_table=backfill_table_ref, if_exists="append"
+                )
+                stage_metrics.rows_out = stage_metrics.rows_in
+                return stage_metrics.rows_in
+
+        stats = run_backfill(ranges, embed_range, checkpoint)
+        logging.info(f"Backfill: {stats}")
+        metrics.log_metric("backfill_ranges", stats.total_ranges)
+        metrics.log_metric("backfill_ranges_resumed", stats.resumed_ranges)
+        metrics.log_metric("backfill_rows_per_second", round(stats.rows_per_second, 1))
+        return bpd.read_gbq(
+            f"""
+            SELECT * EXCEPT (run_key) FROM `{backfill_table_ref}`
+            WHERE run_key = "{run_key}"
+            """,
+            use_cache=False,
+        )
+
+    df_embedded = None
+    if backfill_batch_size > 0:
+        df_embedded = backfill()
+    else:
+        df_embedded_batches = []
+        if page_size > 0:
+            # Each page's embeddings are appended as soon as they are generated
+            embedded_staging_ref = create_staging_table(
+                bq_client,
+                embedded_chunks.uri,
+                f"{project_id}.{destination_dataset}",
+                empty_embedded_query,
+            )
+        pages = df_canonical.to_pandas_batches(page_size=page_size or chunk_batch_size)
+        for batch_number, page in enumerate(pages, start=1):
+            with recorder.stage("embed") as stage_metrics:
+                stage_metrics.rows_in = len(page)
+                logging.info(
+                    f"Embedding chunk batch {batch_number} ({len(page)} chunks)..."
+                )
+                df_embedded_batch = embed(bpd.read_pandas(page))[embedded_columns]
+                if page_size > 0:
+                    df_embedded_batch.to_gbq(
+                        destination_table=embedded_staging_ref, if_exists="append"
+                    )
+                else:
+                    df_embedded_batches.append(df_embedded_batch)
+                stage_metrics.rows_out = len(page)
+        if page_size > 0:
+            df_embedded = bpd.read_gbq(embedded_staging_ref, use_cache=False)
+        elif df_embedded_batches:
+            df_embedded = bpd.concat(df_embedded_batches, ignore_index=True)
+
+    if df_embedded is not None:
+        df_collapsed = df_duplicates.merge(
+            df_embedded[["chunk_id", "embedding", "embedding_status"]].rename(
+                columns={"chunk_id": "canonical_chunk_id"}
+            ),
+            how="inner",
+            on="canonical_chunk_id",
+        ).drop(columns=["canonical_chunk_id"])
+        df_embedded = bpd.concat(
+            [df_embedded, df_collapsed[df_embedded.columns]], ignore_index=True
+        )
+        embedded_table_ref = df_embedded.to_gbq()
+    else:
+        embedded_table_ref = bpd.read_gbq(empty_embedded_query).to_gbq()
+    with recorder.stage("write") as stage_metrics:
+        table = write_table(bq_client, embedded_table_ref, embedded_chunks)
+        stage_metrics.rows_out = table.num_rows
+        stage_metrics.bytes_written = table.num_bytes
+
+    metrics.log_metric("failed_embeddings", failed_embeddings)
+    metrics.log_metric("embedding_cache_hits", cache_stats.hits)
+    metrics.log_metric("embedding_cache_misses", cache_stats.misses)
+    logging.info(f"Embedding cache over the run: {cache_stats}")
+    recorder.log_to(metrics)
+    logging.info(f"Stages: {recorder}")
@@ -0,0 +1,237 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ruff: noqa
+
+from data_ingestion_pipeline.config import COMPONENT_IMAGE
+from kfp.dsl import Dataset, Input, Metrics, Output, component
+
+
+@component(base_image=COMPONENT_IMAGE)
+def export_chunks(
+    project_id: str,
+    stored_chunks: Input[Dataset],
+    deleted_chunk_ids: Input[Dataset],
+    output_files: Output[Dataset],
+    deleted_chunks: Output[Dataset],
+    metrics: Output[Metrics],
+    binary_files: Output[Dataset],
+    location: str = "us-central1",
+    destination_dataset: str = "stackoverflow_data",
+    deduped_table: str = "questions_embeddings",
+    embedding_column: str = "embedding",
+    binary_export: bool = False,
+    binary_export_quantization: str = "float32",
+    normalized_export: bool = False,
+    sharded_export: bool = False,
+    export_shard_mb: int = 64,
+    export_workers: int = 4,
+) -> None:
+    """Export the stored chunks to JSONL for ingest_data.
+
+    Args:
+        stored_chunks: Parquet files written by store_chunks or repair_embeddings
+        deleted_chunk_ids: Parquet files written by store_chunks
+        output_files: Output dataset path. Its `reconciliation_mode` metadata
+            tells whether it holds every chunk (FULL) or only this run's changes
+            (INCREMENTAL). With sharded_export, it is a directory of gzip JSONL
+            shards and a manifest.json.
+        deleted_chunks: Ids of the chunks deleted by this run, as JSONL
+        metrics: Wall time, rows out and bytes written of each export
+        binary_files: Binary export of every chunk (Parquet metadata and a float32 embedding array) when binary_export is set
+        location: BigQuery location
+        destination_dataset: BigQuery dataset of the deduplicated table
+        deduped_table: Table storing the deduplicated results
+        embedding_column: Name of the embedding field of the exported documents
+        binary_export: Also export the deduplicated table to binary_files, for tooling that loads the whole corpus
+        binary_export_quantization: Precision of the binary export's embeddings: "float32", "float16" or "int8" (with a scale per vector)
+        normalized_export: Leave the question text out of the chunk documents; retrievers look it up in deduped_table by question_id (utils/rehydration.py)
+        sharded_export: Export the chunk documents as gzip-compressed JSONL shards with a manifest instead of a BigQuery extract
+        export_shard_mb: Uncompressed size in MB after which a shard is closed
+        export_workers: Shards compressed and written in parallel
+    """
+    import json
+    import logging
+    import os
+
+    import bigframes.pandas as bpd
+    from google.cloud import bigquery
+
+    from data_ingestion_pipeline.utils.bigquery_artifacts import load_table
+    from data_ingestion_pipeline.utils.binary_export import (
+        QUANTIZATIONS,
+        write_binary_export,
+    )
+    from data_ingestion_pipeline.utils.instrumentation import StageRecorder
+    from data_ingestion_pipeline.utils.sharded_export import (
+        SHARDED_FORMAT,
+        write_sharded_jsonl,
+    )
+
+    # Initialize logging
+    logging.basicConfig(level=logging.INFO)
+
+    # Fail before the JSONL export rather than after it
+    if binary_export and binary_export_quantization not in QUANTIZATIONS:
+        raise ValueError(
+            f"binary_export_quantization must be one of {list(QUANTIZATIONS)}, "
+            f"got {binary_export_quantization!r}"
+        )
+
+    # Initialize clients
+    bq_client = bigquery.Client(project=project_id, location=location)
+    bpd.options.bigquery.project = project_id
+    bpd.options.bigquery.location = location
+
+    recorder = StageRecorder(run_name="export_chunks")
+    dataset_ref = f"{project_id}.{destination_dataset}"
+    deduped_table_ref = f"{dataset_ref}.{deduped_table}"
+
+    def export_to_jsonl(query: str, artifact: Dataset) -> bigquery.Table:
+        """Export the query results to JSONL files under the artifact's URI.
+
+        Returns:
+            The exported table
+        """
+        table = bq_client.get_table(bpd.read_gbq(query).to_gbq())
+        num_rows = table.num_rows
+
+        artifact.uri = artifact.uri + "*.jsonl"
+        artifact.metadata["num_rows"] = num_rows
+
+        job_config = bigquery.ExtractJobConfig()
+        job_config.destination_format = (
+            bigquery.DestinationFormat.NEWLINE_DELIMITED_JSON
+        )
+        extract_job = bq_client.extract_table(
+            table, artifact.uri, job_config=job_config
+        )
+        extract_job.result()
+        return table
+
+    def export_to_sharded_jsonl(query: str, artifact: Dataset) -> bigquery.Table:
+        """Export the query results as gzip JSONL shards and a manifest.
+
+        Rows are streamed from BigQuery in pages and written to the artifact's
+        directory by parallel writers.
+
+        Returns:
+            The exported table
+        """
+        table = bq_client.get_table(bpd.read_gbq(query).to_gbq())
+        lines = (
+            json.dumps(row)
+            for batch in bq_client.list_rows(table).to_arrow_iterable()
+            for row in batch.to_pylist()
+        )
+        manifest = write_sharded_jsonl(
+            lines,
+            artifact.path,
+            target_shard_bytes=export_shard_mb * 2**20,
+            max_workers=export_workers,
+        )
+        artifact.metadata["format"] = SHARDED_FORMAT
+        artifact.metadata["num_rows"] = manifest["num_rows"]
+        artifact.metadata["num_shards"] = len(manifest["shards"])
+        return table
+
+    # Export to JSONL
+    with recorder.stage("export") as stage_metrics:
+        reconciliation_mode = stored_chunks.metadata.get("reconciliation_mode", "FULL")
+        logging.info(f"Exporting to JSONL for {reconciliation_mode} reconciliation...")
+        export_source_ref = load_table(
+            bq_client, stored_chunks.uri, dataset_ref, location
+        )
+        deleted_table_ref = load_table(
+            bq_client, deleted_chunk_ids.uri, dataset_ref, location
+        )
+
+        # The normalized layout leaves the question text out of the chunks
+        parent_fields = "" if normalized_export else ", question_text, full_text_md"
+        export_query = f"""
+        SELECT
+            chunk_id as id,
+            TO_JSON_STRING(STRUCT(
+                chunk_id as id,
+                embedding as {embedding_column},
+                text_chunk as content,
+                question_id,
+                CAST(creation_timestamp AS STRING) as creation_timestamp,
+                CAST(last_edit_date AS STRING) as last_edit_date
+                {parent_fields}
+            )) as json_data
+        FROM
+            `{export_source_ref}`
+        WHERE
+            chunk_id IS NOT NULL
+            AND ARRAY_LENGTH(embedding) > 0
+            AND IFNULL(embedding_status, "") = ""
+        """
+        output_files.metadata["reconciliation_mode"] = reconciliation_mode
+        output_files.metadata["layout"] = (
+            "normalized" if normalized_export else "denormalized"
+        )
+        exported_table = (
+            export_to_sharded_jsonl(export_query, output_files)
+            if sharded_export
+            else export_to_jsonl(export_query, output_files)
+        )
+
+        deleted_table = export_to_jsonl(
+            f"SELECT chunk_id AS id FROM `{deleted_table_ref}`", deleted_chunks
+        )
+        exported_tables = [exported_table, deleted_table]
+        stage_metrics.rows_out = sum(table.num_rows for table in exported_tables)
+        stage_metrics.bytes_written = sum(table.num_bytes for table in exported_tables)
+        logging.info(
+            f"Exported {exported_table.num_rows} chunks and "
+            f"{deleted_table.num_rows} deleted chunk ids to JSONL."
+        )
+
+    # Export the whole corpus in binary form
+    if binary_export:
+        with recorder.stage("binary_export") as stage_metrics:
+            logging.info("Exporting to Parquet and float32 embeddings...")
+            binary_query = f"""
+            SELECT
+                chunk_id as id,
+                embedding as {embedding_column},
+                text_chunk as content,
+                question_id,
+                CAST(creation_timestamp AS STRING) as creation_timestamp,
+                CAST(last_edit_date AS STRING) as last_edit_date,
+                question_text,
+                full_text_md
+            FROM
+                `{deduped_table_ref}`
+            WHERE
+                chunk_id IS NOT NULL
+                AND ARRAY_LENGTH(embedding) > 0
+                AND IFNULL(embedding_status, "") = ""
+            """
+            binary_table = bq_client.get_table(bpd.read_gbq(binary_query).to_gbq())
+            manifest = write_binary_export(
+                bq_client.list_rows(binary_table).to_arrow_iterable(),
+                binary_files.path,
+                embedding_column=embedding_column,
+                quantization=binary_export_quantization,
+            )
+            binary_files.metadata.update(manifest)
+            stage_metrics.rows_out = manifest["num_rows"]
+            stage_metrics.bytes_written = sum(
+                entry.stat().st_size for entry in os.scandir(binary_files.path)
+            )
+            logging.info(f"Exported {manifest['num_rows']} chunks in binary form.")
+
+    recorder.log_to(metrics)
+    logging.info(f"Stages: {recorder}")
@@ -0,0 +1,119 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ruff: noqa
+
+"""
+The processing components are derived from the notebook:
+https://github.com/GoogleCloudPlatform/generative-ai/blob/main/gemini/use-cases/retrieval-augmented_generation/scalable_rag_with_bigframes.ipynb
+
+They leverage BigQuery for data processing. We also suggest looking at remote functions for enhanced scalability.
+"""
+
+from data_ingestion_pipeline.config import COMPONENT_IMAGE
+from kfp.dsl import Dataset, Metrics, Output, component
+
+
+@component(base_image=COMPONENT_IMAGE)
+def fetch_questions(
+    project_id: str,
+    schedule_time: str,
+    questions: Output[Dataset],
+    metrics: Output[Metrics],
+    is_incremental: bool = True,
+    look_back_days: int = 1,
+    location: str = "us-central1",
+    window_start: str = "",
+    window_end: str = "",
+) -> None:
+    """Fetch the latest version of each StackOverflow question from BigQuery.
+
+    Args:
+        questions: Parquet files of the questions and their answers
+        metrics: Wall time, rows out and bytes written of the fetch
+        is_incremental: Whether to process only recent data
+        look_back_days: Number of days to look back for incremental processing
+        location: BigQuery location
+        window_start: First day (YYYY-MM-DD) to fetch instead of the look-back window
+        window_end: Last day (YYYY-MM-DD) to fetch instead of the look-back window
+    """
+    import logging
+    from datetime import datetime
+
+    import bigframes.pandas as bpd
+    from google.cloud import bigquery
+
+    from data_ingestion_pipeline.utils.bigquery_artifacts import write_table
+    from data_ingestion_pipeline.utils.instrumentation import StageRecorder
+    from data_ingestion_pipeline.utils.partitions import processing_window
+
+    # Initialize logging
+    logging.basicConfig(level=logging.INFO)
+
+    # Initialize clients
+    logging.info("Initializing clients...")
+    bq_client = bigquery.Client(project=project_id, location=location)
+    bpd.options.bigquery.project = project_id
+    bpd.options.bigquery.location = location
+    logging.info("Clients initialized.")
+
+    recorder = StageRecorder(run_name="fetch_questions")
+
+    # Set date range for data fetch. A partition of the run gets its own window.
+    START_DATE, END_DATE = processing_window(schedule_time, look_back_days)
+    if window_start:
+        START_DATE = datetime.fromisoformat(window_start)
+    if window_end:
+        END_DATE = datetime.fromisoformat(window_end)
+
+    logging.info(f"Date range set: START_DATE={START_DATE}, END_DATE={END_DATE}")
+
+    def fetch_stackoverflow_data(
+        dataset_suffix: str, start_date: str, end_date: str
+    ) -> bpd.DataFrame:
+        """Fetch StackOverflow data from BigQuery."""
+        query = f"""
+            SELECT
+                creation_date,
+                last_edit_date,
+                question_id,
+                question_title,
+                question_body AS question_text,
+                answers
+            FROM `production-ai-template.stackoverflow_qa_{dataset_suffix}.stackoverflow_python_questions_and_answers`
+            WHERE TRUE
+                {f'AND TIMESTAMP_TRUNC(creation_date, DAY) BETWEEN TIMESTAMP("{start_date}") AND TIMESTAMP("{end_date}")' if is_incremental else ""}
+        """
+        logging.info("Fetching StackOverflow data from BigQuery...")
+        return bpd.read_gbq(query)
+
+    # Fetch and preprocess data
+    with recorder.stage("fetch") as stage_metrics:
+        logging.info("Fetching and preprocessing data...")
+        df = fetch_stackoverflow_data(
+            start_date=START_DATE.strftime("%Y-%m-%d"),
+            end_date=END_DATE.strftime("%Y-%m-%d"),
+            dataset_suffix=location.lower().replace("-", "_"),
+        )
+        df = (
+            df.sort_values("last_edit_date", ascending=False)
+            .drop_duplicates("question_id")
+            .reset_index(drop=True)
+        )
+        table = write_table(bq_client, df.to_gbq(), questions)
+        stage_metrics.rows_out = table.num_rows
+        stage_metrics.bytes_written = table.num_bytes
+        logging.info(f"Fetched {table.num_rows} questions.")
+
+    recorder.log_to(metrics)
+    logging.info(f"Stages: {recorder}")
@@ -13,81 +13,107 @@
 # limitations under the License.
 # ruff: noqa
 
-from kfp.dsl import Dataset, Input, component
+from data_ingestion_pipeline.config import COMPONENT_IMAGE
+from kfp.dsl import Dataset, Input, Metrics, Output, component
 
 
-@component(
-    base_image="us-docker.pkg.dev/production-ai-template/starter-pack/data_processing:0.2"
-)
+@component(base_image=COMPONENT_IMAGE)
 def ingest_data(
     project_id: str,
     data_store_region: str,
     input_files: Input[Dataset],
     data_store_id: str,
+    deleted_chunks: Input[Dataset],
+    metrics: Output[Metrics],
     embedding_dimension: int = 768,
     embedding_column: str = "embedding",
+    delete_workers: int = 16,
+    import_workers: int = 4,
+    import_shards_per_request: int = 1,
+    import_max_attempts: int = 3,
+    readiness_timeout: int = 900,
+    readiness_sample_size: int = 20,
+    schema_cache_uri: str = "",
 ) -> None:
     """Process and ingest documents into Vertex AI Search datastore.
 
     Args:
         project_id: Google Cloud project ID
         data_store_region: Region for Vertex AI Search
-        input_files: Input dataset containing documents
+        input_files: Input dataset containing documents. With INCREMENTAL
+            `reconciliation_mode` metadata, it holds only changed documents.
+            With `jsonl.gz` format metadata, it is a sharded export whose
+            manifest is checked before importing.
         data_store_id: ID of target datastore
+        deleted_chunks: JSONL ids of documents to delete from the datastore
+        metrics: Whether the schema was updated, documents imported, import
+            attempts and seconds until a sample of the imported documents
+            could be looked up
         embedding_column: Name of embedding column in schema
+        delete_workers: Number of concurrent document delete requests
+        import_workers: Number of concurrent import requests of an INCREMENTAL import
+        import_shards_per_request: Shards or extracted files imported by one
+            request of an INCREMENTAL import
+        import_max_attempts: Attempts per import request; only failed
+            requests are resubmitted
+        readiness_timeout: Seconds to wait for imported documents to become visible
+        readiness_sample_size: Number of imported documents polled for visibility
+        schema_cache_uri: gs:// URI of a blob caching the hash of the last applied
+            embedding field, so unchanged runs skip the schema calls (empty
+            always reads the schema)
     """
+    import gzip
     import json
     import logging
-    import time
+    import random
+    from concurrent.futures import ThreadPoolExecutor
 
+    import google.api_core.exceptions
+    import google.api_core.operation
     from google.api_core.client_options import ClientOptions
-    from google.cloud import discoveryengine
+    from google.cloud import discoveryengine, storage
 
-    def update_schema_as_json(
-        original_schema: str,
-        embedding_dimension: int,
-        field_name: str | None = None,
-    ) -> str:
-        """Update datastore schema JSON to include embedding field.
-
-        Args:
-            original_schema: Original schema JSON string
-            field_name: Name of embedding field to add
-
-        Returns:
-            Updated schema JSON string
-        """
-        original_schema_dict = json.loads(original_schema)
-
-        if original_schema_dict.get("properties") is None:
-            original_schema_dict["properties"] = {}
-
-        if field_name:
-            field_schema = {
-                "type": "array",
-                "keyPropertyMapping": "embedding_vector",
-                "dimension": embedding_dimension,
-                "items": {"type": "number"},
-            }
-            original_schema_dict["properties"][field_name] = field_schema
+    from data_ingestion_pipeline.utils.import_scheduler import (
+        ShardedImporter,
+        expand_wildcard,
+    )
+    from data_ingestion_pipeline.utils.readiness import (
+        DiscoveryEngineDocumentLookup,
+        wait_until_visible,
+    )
+    from data_ingestion_pipeline.utils.schema_reconciler import (
+        BlobHashCache,
+        SchemaReconciler,
+        embedding_field_schema,
+    )
+    from data_ingestion_pipeline.utils.sharded_export import (
+        MANIFEST_FILE,
+        SHARDED_FORMAT,
+        manifest_shards,
+        verify_shards,
+    )
 
-        return json.dumps(original_schema_dict)
+    # Files accepted by one ImportDocuments request
+    MAX_IMPORT_URIS = 100
 
     def update_data_store_schema(
         project_id: str,
         location: str,
         data_store_id: str,
-        field_name: str | None = None,
+        field_name: str,
         client_options: ClientOptions | None = None,
-    ) -> None:
-        """Update datastore schema to include embedding field.
+    ) -> str:
+        """Add the embedding field to the datastore schema if it is missing.
 
         Args:
             project_id: Google Cloud project ID
             location: Google Cloud location
             data_store_id: Target datastore ID
-            embedding_column: Name of embedding column
+            field_name: Name of embedding field
             client_options: Client options for API
+
+        Returns:
+            "cached", "unchanged" or "updated"
         """
         schema_client = discoveryengine.SchemaServiceClient(
             client_options=client_options
@@ -96,40 +122,57 @@ def ingest_data(
 
         name = f"projects/{project_id}/locations/{location}/collections/{collection}/dataStores/{data_store_id}/schemas/default_schema"
 
-        schema = schema_client.get_schema(
-            request=discoveryengine.GetSchemaRequest(name=name)
-        )
-        new_schema_json = update_schema_as_json(
-            original_schema=schema.json_schema,
-            embedding_dimension=embedding_dimension,
-            field_name=field_name,
-        )
-        new_schema = discoveryengine.Schema(json_schema=new_schema_json, name=name)
+        def get_schema() -> str:
+            schema = schema_client.get_schema(
+                request=discoveryengine.GetSchemaRequest(name=name)
+            )
+            return schema.json_schema
 
-        operation = schema_client.update_schema(
-            request=discoveryengine.UpdateSchemaRequest(
-                schema=new_schema, allow_missing=True
-            ),
-            timeout=1800,
+        def update_schema(json_schema: str) -> None:
+            operation = schema_client.update_schema(
+                request=discoveryengine.UpdateSchemaRequest(
+                    schema=discoveryengine.Schema(json_schema=json_schema, name=name),
+                    allow_missing=True,
+                ),
+                timeout=1800,
+            )
+            logging.info(
+                f"Waiting for schema update operation: {operation.operation.name}"
+            )
+            operation.result()
+
+        cache = None
+        if schema_cache_uri:
+            cache = BlobHashCache(
+                storage.Blob.from_string(schema_cache_uri, client=storage.Client())
+            )
+        reconciler = SchemaReconciler(get_schema, update_schema, cache)
+        result = reconciler.reconcile(
+            name, field_name, embedding_field_schema(embedding_dimension)
         )
-        logging.info(f"Waiting for schema update operation: {operation.operation.name}")
-        operation.result()
+        return result.action
 
-    def add_data_in_store(
+    def start_import(
         project_id: str,
         location: str,
         data_store_id: str,
-        input_files_uri: str,
+        input_uris: list[str],
+        reconciliation_mode: str = "FULL",
         client_options: ClientOptions | None = None,
-    ) -> None:
-        """Import documents into datastore.
+    ) -> google.api_core.operation.Operation:
+        """Start importing documents into datastore.
 
         Args:
             project_id: Google Cloud project ID
             location: Google Cloud location
             data_store_id: Target datastore ID
-            input_files_uri: URI of input files
+            input_uris: URIs (or patterns) of input files
+            reconciliation_mode: FULL replaces the datastore's documents,
+                INCREMENTAL only adds and updates documents
             client_options: Client options for API
+
+        Returns:
+            The import operation
         """
         client = discoveryengine.DocumentServiceClient(client_options=client_options)
 
@@ -143,41 +186,236 @@ def ingest_data(
         request = discoveryengine.ImportDocumentsRequest(
             parent=parent,
             gcs_source=discoveryengine.GcsSource(
-                input_uris=[input_files_uri],
+                input_uris=input_uris,
                 data_schema="document",
             ),
-            reconciliation_mode=discoveryengine.ImportDocumentsRequest.ReconciliationMode.FULL,
+            reconciliation_mode=discoveryengine.ImportDocumentsRequest.ReconciliationMode[
+                reconciliation_mode
+            ],
         )
 
         operation = client.import_documents(request=request)
-        logging.info(f"Waiting for import operation: {operation.operation.name}")
-        operation.result()
+        logging.info(
+            f"Started import operation {operation.operation.name} "
+            f"for {len(input_uris)} files"
+        )
+        return operation
+
+    def read_sharded_export(files_uri: str) -> list[str]:
+        """Check the shards of a sharded export against its manifest.
+
+        Returns:
+            The URIs of the shards
+
+        Raises:
+            RuntimeError: If a shard is missing or differs from the manifest
+        """
+        bucket_name, _, prefix = files_uri.removeprefix("gs://").partition("/")
+        storage_client = storage.Client(project=project_id)
+        manifest = json.loads(
+            storage_client.bucket(bucket_name)
+            .blob(f"{prefix}/{MANIFEST_FILE}")
+            .download_as_text()
+        )
+        found = {
+            blob.name.rsplit("/", 1)[-1]: (blob.size, blob.md5_hash)
+            for blob in storage_client.list_blobs(bucket_name, prefix=f"{prefix}/")
+        }
+        problems = verify_shards(manifest, found)
+        if problems:
+            raise RuntimeError(f"Incomplete export {files_uri}: {'; '.join(problems)}")
+        logging.info(
+            f"Export {files_uri} is complete: {len(manifest['shards'])} shards, "
+            f"{manifest['num_rows']} documents"
+        )
+        return [f"{files_uri}/{shard.name}" for shard in manifest_shards(manifest)]
+
+    def read_document_ids(files_uri: str) -> list[str]:
+        """Read the `id` of each JSONL line of the files matching `gs://bucket/prefix*.jsonl`."""
+        bucket_name, _, pattern = files_uri.removeprefix("gs://").partition("/")
+        prefix = pattern.split("*", 1)[0]
+        document_ids = []
+        for blob in storage.Client(project=project_id).list_blobs(
+            bucket_name, prefix=prefix
+        ):
+            for line in blob.download_as_text().splitlines():
+                if line.strip():
+                    document_ids.append(json.loads(line)["id"])
+        return document_ids
+
+    def sample_document_ids(input_uris: list[str], sample_size: int) -> list[str]:
+        """Sample the ids of imported documents from the first input files."""
+        storage_client = storage.Client(project=project_id)
+        document_ids: list[str] = []
+        for uri in input_uris:
+            bucket_name, _, pattern = uri.removeprefix("gs://").partition("/")
+            prefix = pattern.split("*", 1)[0]
+            for blob in storage_client.list_blobs(bucket_name, prefix=prefix):
+                data = blob.download_as_bytes()
+                if blob.name.endswith(".gz"):
+                    data = gzip.decompress(data)
+                document_ids.extend(
+                    json.loads(line)["id"] for line in data.splitlines() if line.strip()
+                )
+                # Enough ids to sample from without reading the whole export
+                if len(document_ids) >= 10 * sample_size:
+                    return random.sample(document_ids, sample_size)
+        return random.sample(document_ids, min(sample_size, len(document_ids)))
+
+    def delete_documents(
+        project_id: str,
+        location: str,
+        data_store_id: str,
+        document_ids: list[str],
+        client_options: ClientOptions | None = None,
+    ) -> None:
+        """Delete documents from datastore, ignoring ones that do not exist.
+
+        Args:
+            project_id: Google Cloud project ID
+            location: Google Cloud location
+            data_store_id: Target datastore ID
+            document_ids: IDs of documents to delete
+            client_options: Client options for API
+        """
+        client = discoveryengine.DocumentServiceClient(client_options=client_options)
+
+        def delete_document(document_id: str) -> None:
+            name = client.document_path(
+                project=project_id,
+                location=location,
+                data_store=data_store_id,
+                branch="default_branch",
+                document=document_id,
+            )
+            try:
+                client.delete_document(name=name)
+            except google.api_core.exceptions.NotFound:
+                pass
+
+        with ThreadPoolExecutor(max_workers=delete_workers) as executor:
+            list(executor.map(delete_document, document_ids))
 
     client_options = ClientOptions(
         api_endpoint=f"{data_store_region}-discoveryengine.googleapis.com"
     )
 
-    logging.info("Updating data store schema...")
-    update_data_store_schema(
+    logging.info("Reconciling data store schema...")
+    schema_action = update_data_store_schema(
         project_id=project_id,
         location=data_store_region,
         data_store_id=data_store_id,
         field_name=embedding_column,
         client_options=client_options,
     )
-    logging.info("Schema updated successfully")
+    logging.info(f"Data store schema {schema_action}")
+    metrics.log_metric("schema_updated", schema_action == "updated")
 
-    logging.info("Importing data into store...")
-    add_data_in_store(
-        project_id=project_id,
-        location=data_store_region,
-        data_store_id=data_store_id,
-        client_options=client_options,
-        input_files_uri=input_files.uri,
-    )
-    logging.info("Data import completed")
-    logging.info(
-        "Sleeping for 3 minutes to allow Vertex AI Search to properly index the data..."
+    reconciliation_mode = input_files.metadata.get("reconciliation_mode", "FULL")
+    input_uris: list[str] = []
+    if reconciliation_mode == "INCREMENTAL" and not input_files.metadata.get(
+        "num_rows"
+    ):
+        logging.info("No changed documents to import")
+    else:
+        if input_files.metadata.get("format") == SHARDED_FORMAT:
+            input_uris = read_sharded_export(input_files.uri.rstrip("/"))
+        elif reconciliation_mode == "INCREMENTAL":
+            # The files of a BigQuery extract are split across requests
+            storage_client = storage.Client(project=project_id)
+            input_uris = expand_wildcard(
+                input_files.uri,
+                lambda bucket, prefix: (
+                    blob.name
+                    for blob in storage_client.list_blobs(bucket, prefix=prefix)
+                ),
+            )
+        else:
+            input_uris = [input_files.uri]
+
+        # A FULL import removes documents missing from its request, so all
+        # shards go in one request and a BigQuery extract keeps its wildcard.
+        # INCREMENTAL imports are split across concurrent requests.
+        if reconciliation_mode == "FULL":
+            if len(input_uris) > MAX_IMPORT_URIS:
+                raise ValueError(
+                    f"A FULL import accepts at most {MAX_IMPORT_URIS} files, the "
+                    f"export has {len(input_uris)} shards. Increase export_shard_mb."
+                )
+            shards_per_request = len(input_uris)
+        else:
+            shards_per_request = min(import_shards_per_request, MAX_IMPORT_URIS)
+
+        logging.info(
+            f"Importing {len(input_uris)} files into store ({reconciliation_mode}) "
+            f"with {-(-len(input_uris) // shards_per_request)} requests..."
+        )
+        importer = ShardedImporter(
+            submit=lambda uris: start_import(
+                project_id=project_id,
+                location=data_store_region,
+                data_store_id=data_store_id,
+                client_options=client_options,
+                input_uris=uris,
+                reconciliation_mode=reconciliation_mode,
+            ),
+            max_concurrency=import_workers,
+            shards_per_request=shards_per_request,
+            max_attempts=import_max_attempts,
+        )
+        report = importer.run(input_uris)
+        logging.info(str(report))
+        metrics.log_metric("imported_documents", report.success_count)
+        metrics.log_metric(
+            "import_attempts", sum(group.attempts for group in report.groups)
+        )
+        if report.failed:
+            raise RuntimeError(
+                f"{len(report.failed)} import requests failed after "
+                f"{import_max_attempts} attempts: "
+                + "; ".join(
+                    f"{group.uris}: {group.error} {group.error_samples}"
+                    for group in report.failed
+                )
+            )
+        logging.info("Data import completed")
+
+    if deleted_chunks.metadata.get("num_rows"):
+        document_ids = read_document_ids(deleted_chunks.uri)
+        logging.info(f"Deleting {len(document_ids)} documents from store...")
+        delete_documents(
+            project_id=project_id,
+            location=data_store_region,
+            data_store_id=data_store_id,
+            document_ids=document_ids,
+            client_options=client_options,
+        )
+        logging.info("Documents deleted")
+
+    # Wait until a sample of the imported documents can be looked up, instead
+    # of sleeping for a fixed time
+    sample = (
+        sample_document_ids(input_uris, readiness_sample_size) if input_uris else []
     )
-    time.sleep(180)  # Sleep for 180 seconds (3 minutes)
-    logging.info("Sleep completed. Data indexing should now be complete.")
+    if sample:
+        logging.info(f"Waiting for {len(sample)} imported documents to be visible...")
+        result = wait_until_visible(
+            sample,
+            DiscoveryEngineDocumentLookup(
+                discoveryengine.DocumentServiceClient(client_options=client_options),
+                project_id=project_id,
+                location=data_store_region,
+                data_store_id=data_store_id,
+            ),
+            timeout=readiness_timeout,
+        )
+        metrics.log_metric("indexing_latency_seconds", round(result.seconds, 1))
+        metrics.log_metric("readiness_polls", result.polls)
+        metrics.log_metric("readiness_missing_documents", len(result.missing))
+        if result.ready:
+            logging.info(f"Imported documents visible after {result.seconds:.0f}s.")
+        else:
+            logging.warning(
+                f"{len(result.missing)} of {len(sample)} sampled documents still not "
+                f"visible after {result.seconds:.0f}s: {result.missing}"
+            )
@@ -0,0 +1,51 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ruff: noqa
+
+from data_ingestion_pipeline.config import COMPONENT_IMAGE
+from kfp.dsl import component
+
+
+@component(base_image=COMPONENT_IMAGE)
+def plan_partitions(
+    schedule_time: str,
+    is_incremental: bool = True,
+    look_back_days: int = 1,
+    partition_days: int = 0,
+) -> list:
+    """Split the processing window of a run into date partitions.
+
+    Args:
+        schedule_time: Schedule time of the pipeline job
+        is_incremental: Whether the run processes only recent data. Full runs
+            have a single partition.
+        look_back_days: Number of days to look back
+        partition_days: Days per partition, 0 for a single partition
+
+    Returns:
+        The window_start and window_end of each partition
+    """
+    import logging
+
+    from data_ingestion_pipeline.utils.partitions import (
+        plan_partitions as plan,
+        processing_window,
+    )
+
+    start, end = processing_window(schedule_time, look_back_days)
+    partitions = plan(start.date(), end.date(), partition_days if is_incremental else 0)
+    logging.info(
+        f"Processing {start:%Y-%m-%d} to {end:%Y-%m-%d} in {len(partitions)} partitions"
+    )
+    return partitions
@@ -0,0 +1,227 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ruff: noqa
+
+from data_ingestion_pipeline.config import COMPONENT_IMAGE
+from kfp.dsl import Dataset, Input, Metrics, Output, component
+
+
+@component(base_image=COMPONENT_IMAGE)
+def repair_embeddings(
+    project_id: str,
+    stored_chunks: Input[Dataset],
+    repaired_chunks: Output[Dataset],
+    metrics: Output[Metrics],
+    location: str = "us-central1",
+    destination_dataset: str = "stackoverflow_data",
+    destination_table: str = "incremental_questions_embeddings",
+    deduped_table: str = "questions_embeddings",
+    embedding_cache_table: str = "embedding_cache",
+    embedding_model: str = "text-embedding-005",
+    embedding_max_concurrency: int = 8,
+    embedding_batch_tokens: int = 15000,
+    embedding_max_retries: int = 5,
+    repair_rounds: int = 2,
+    repair_backoff: float = 30.0,
+) -> None:
+    """Re-embed the chunks of the deduplicated table whose embedding failed.
+
+    Only rows with a non-empty embedding_status are sent to the model, in this
+    run or any earlier one. Repaired rows are updated in the deduplicated and
+    incremental tables, cached and added to the chunks to export.
+
+    Args:
+        stored_chunks: Parquet files written by store_chunks
+        repaired_chunks: stored_chunks with the repaired rows updated, plus
+            the repaired rows of earlier runs, with the same
+            `reconciliation_mode` metadata
+        metrics: Wall time and rows of each stage, and the repaired and still failed rows
+        location: BigQuery and Vertex AI location
+        destination_dataset: BigQuery dataset of the tables and embedding cache
+        destination_table: Table storing incremental results
+        deduped_table: Table storing the deduplicated results
+        embedding_cache_table: Table caching embeddings by model and chunk text hash, which repaired embeddings are added to (empty disables the cache)
+        embedding_model: Vertex AI text embedding model
+        embedding_max_concurrency: Maximum number of embedding requests in flight
+        embedding_batch_tokens: Token budget of one embedding request, counted with estimate_tokens and kept below the API's 20,000 token limit
+        embedding_max_retries: Retries of a failed embedding request within a round
+        repair_rounds: Rounds re-embedding the rows still failed after the previous round
+        repair_backoff: Seconds waited before the first round, doubled before each following round
+    """
+    import logging
+    from datetime import datetime
+
+    import bigframes.pandas as bpd
+    import google.api_core.exceptions
+    from google.cloud import bigquery
+
+    from data_ingestion_pipeline.utils.bigquery_artifacts import (
+        load_table,
+        write_table,
+    )
+    from data_ingestion_pipeline.utils.embedding_cache import text_hash
+    from data_ingestion_pipeline.utils.embedding_repair import EmbeddingRepairer
+    from data_ingestion_pipeline.utils.embedding_scheduler import (
+        EmbeddingRun,
+        EmbeddingScheduler,
+        VertexAIEmbeddingClient,
+    )
+    from data_ingestion_pipeline.utils.instrumentation import StageRecorder
+
+    # Initialize logging
+    logging.basicConfig(level=logging.INFO)
+
+    # Initialize clients
+    bq_client = bigquery.Client(project=project_id, location=location)
+    bpd.options.bigquery.project = project_id
+    bpd.options.bigquery.location = location
+
+    recorder = StageRecorder(run_name="repair_embeddings")
+    dataset_ref = f"{project_id}.{destination_dataset}"
+    deduped_table_ref = f"{dataset_ref}.{deduped_table}"
+    incremental_table_ref = f"{dataset_ref}.{destination_table}"
+
+    def get_table_or_none(table_ref: str) -> bigquery.Table | None:
+        """Return the table if it exists."""
+        try:
+            return bq_client.get_table(table_ref)
+        except google.api_core.exceptions.NotFound:
+            return None
+
+    with recorder.stage("select") as stage_metrics:
+        logging.info("Selecting chunks with a failed embedding...")
+        pdf_failed = bpd.read_gbq(
+            f"""
+            SELECT chunk_id, text_chunk, embedding_status
+            FROM `{deduped_table_ref}`
+            WHERE chunk_id IS NOT NULL AND IFNULL(embedding_status, "") != ""
+            """,
+            use_cache=False,
+        ).to_pandas()
+        stage_metrics.rows_out = len(pdf_failed)
+        logging.info(f"{len(pdf_failed)} chunks with a failed embedding.")
+
+    repaired_table_ref = None
+    repaired = 0
+    if len(pdf_failed) > 0:
+        with recorder.stage("repair") as stage_metrics:
+            stage_metrics.rows_in = len(pdf_failed)
+            scheduler = EmbeddingScheduler(
+                VertexAIEmbeddingClient(
+                    embedding_model, project=project_id, location=location
+                ),
+                max_concurrency=embedding_max_concurrency,
+                max_batch_tokens=embedding_batch_tokens,
+                max_retries=embedding_max_retries,
+                retry_on=(
+                    google.api_core.exceptions.ResourceExhausted,
+                    google.api_core.exceptions.ServiceUnavailable,
+                    google.api_core.exceptions.InternalServerError,
+                    google.api_core.exceptions.DeadlineExceeded,
+                ),
+            )
+            texts = pdf_failed["text_chunk"].tolist()
+            run = EmbeddingRun(
+                embeddings=[[] for _ in texts],
+                statuses=pdf_failed["embedding_status"].tolist(),
+            )
+            report = EmbeddingRepairer(
+                scheduler, max_rounds=repair_rounds, initial_backoff=repair_backoff
+            ).repair(texts, run)
+            logging.info(f"Embedding repair: {report}")
+            repaired = stage_metrics.rows_out = report.repaired
+
+            pdf_repaired = pdf_failed[["chunk_id", "text_chunk"]].assign(
+                embedding=run.embeddings, embedding_status=run.statuses
+            )
+            pdf_repaired = pdf_repaired[pdf_repaired["embedding_status"] == ""]
+            if len(pdf_repaired) > 0:
+                repaired_table_ref = bpd.read_pandas(
+                    pdf_repaired[["chunk_id", "embedding", "embedding_status"]]
+                ).to_gbq()
+                # The incremental table keeps every run's rows of a chunk, only
+                # the failed ones are updated
+                for table_ref in (deduped_table_ref, incremental_table_ref):
+                    merge_job = bq_client.query(
+                        f"""
+                        MERGE `{table_ref}` AS target
+                        USING `{repaired_table_ref}` AS source
+                        ON target.chunk_id = source.chunk_id
+                            AND IFNULL(target.embedding_status, "") != ""
+                        WHEN MATCHED THEN UPDATE SET
+                            embedding = source.embedding,
+                            embedding_status = source.embedding_status
+                        """
+                    )
+                    merge_job.result()
+                    logging.info(
+                        f"{merge_job.num_dml_affected_rows} rows repaired in "
+                        f"{table_ref}."
+                    )
+
+                # Cached like the embeddings of embed_chunks, so the repaired
+                # texts are not sent to the model again. The cache table is
+                # created by embed_chunks.
+                cache_table_ref = (
+                    f"{dataset_ref}.{embedding_cache_table}"
+                    if embedding_cache_table
+                    else None
+                )
+                if cache_table_ref and get_table_or_none(cache_table_ref) is not None:
+                    pdf_new_entries = (
+                        pdf_repaired.assign(
+                            text_hash=pdf_repaired["text_chunk"].map(text_hash)
+                        )
+                        .drop_duplicates("text_hash")[["text_hash", "embedding"]]
+                        .assign(
+                            model_name=embedding_model,
+                            creation_timestamp=datetime.now(),
+                        )
+                    )
+                    bpd.read_pandas(pdf_new_entries).to_gbq(
+                        destination_table=cache_table_ref, if_exists="append"
+                    )
+                    logging.info(f"{len(pdf_new_entries)} repaired embeddings cached.")
+    metrics.log_metric("repaired_embeddings", repaired)
+    metrics.log_metric("failed_embeddings", len(pdf_failed) - repaired)
+
+    with recorder.stage("write") as stage_metrics:
+        stored_table_ref = load_table(
+            bq_client, stored_chunks.uri, dataset_ref, location
+        )
+        repaired_chunks.metadata["reconciliation_mode"] = stored_chunks.metadata.get(
+            "reconciliation_mode", "FULL"
+        )
+        if repaired_table_ref:
+            columns = ", ".join(
+                f"`{field.name}`"
+                for field in bq_client.get_table(stored_table_ref).schema
+            )
+            output_table_ref = bpd.read_gbq(
+                f"""
+                SELECT {columns} FROM `{stored_table_ref}`
+                WHERE chunk_id NOT IN (SELECT chunk_id FROM `{repaired_table_ref}`)
+                UNION ALL
+                SELECT {columns} FROM `{deduped_table_ref}`
+                WHERE chunk_id IN (SELECT chunk_id FROM `{repaired_table_ref}`)
+                """
+            ).to_gbq()
+        else:
+            output_table_ref = stored_table_ref
+        table = write_table(bq_client, output_table_ref, repaired_chunks)
+        stage_metrics.rows_out = table.num_rows
+        stage_metrics.bytes_written = table.num_bytes
+
+    recorder.log_to(metrics)
+    logging.info(f"Stages: {recorder}")
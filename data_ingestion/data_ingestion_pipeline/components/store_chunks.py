@@ -0,0 +1,313 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ruff: noqa
+
+from typing import List
+
+from data_ingestion_pipeline.config import COMPONENT_IMAGE
+from kfp.dsl import Dataset, Input, Metrics, Output, component
+
+
+@component(base_image=COMPONENT_IMAGE)
+def store_chunks(
+    project_id: str,
+    documents: Input[List[Dataset]],
+    embedded_chunks: Input[List[Dataset]],
+    stored_chunks: Output[Dataset],
+    deleted_chunk_ids: Output[Dataset],
+    metrics: Output[Metrics],
+    is_incremental: bool = True,
+    location: str = "us-central1",
+    destination_dataset: str = "stackoverflow_data",
+    destination_table: str = "incremental_questions_embeddings",
+    deduped_table: str = "questions_embeddings",
+    incremental_dedup: bool = True,
+    delta_export: bool = True,
+) -> None:
+    """Store the run's chunks in the incremental and deduplicated tables.
+
+    Args:
+        documents: documents outputs of chunk_questions, one per partition
+        embedded_chunks: embedded_chunks outputs of embed_chunks, one per partition
+        stored_chunks: Parquet files of the chunks to export: the run's chunks
+            when it was merged into the deduplicated table and delta_export is
+            set (INCREMENTAL `reconciliation_mode` metadata), else every chunk
+            of the deduplicated table (FULL)
+        deleted_chunk_ids: Parquet files with the chunk_id of the chunks
+            deleted from the deduplicated table by this run
+        metrics: Wall time, rows and bytes written of each stage
+        is_incremental: Whether the run processed only recent data
+        location: BigQuery location
+        destination_dataset: BigQuery dataset for storing results
+        destination_table: Table for storing incremental results
+        deduped_table: Table for storing deduplicated results
+        incremental_dedup: Merge only this run's questions into the deduplicated table instead of rebuilding it from the incremental table
+        delta_export: When the run is merged, export only its chunks and deleted chunk ids instead of the whole deduplicated table
+    """
+    import logging
+    from datetime import datetime
+
+    import bigframes.pandas as bpd
+    import google.api_core.exceptions
+    from google.cloud import bigquery
+
+    from data_ingestion_pipeline.utils.bigquery_artifacts import (
+        load_table,
+        union_query,
+        write_table,
+    )
+    from data_ingestion_pipeline.utils.dedup import (
+        merge_dedup_script,
+        stale_chunks_query,
+    )
+    from data_ingestion_pipeline.utils.instrumentation import StageRecorder
+
+    # Initialize logging
+    logging.basicConfig(level=logging.INFO)
+
+    # Initialize clients
+    bq_client = bigquery.Client(project=project_id, location=location)
+    bpd.options.bigquery.project = project_id
+    bpd.options.bigquery.location = location
+
+    recorder = StageRecorder(run_name="store_chunks")
+
+    def create_table_if_not_exist(
+        df: bpd.DataFrame,
+        project_id: str,
+        dataset_id: str,
+        table_id: str,
+        partition_column: str,
+        location: str = location,
+    ) -> None:
+        """Create BigQuery table with time partitioning if it doesn't exist."""
+        table_schema = bq_client.get_table(df.head(0).to_gbq()).schema
+        table = bigquery.Table(
+            f"{project_id}.{dataset_id}.{table_id}", schema=table_schema
+        )
+        table.time_partitioning = bigquery.TimePartitioning(
+            type_=bigquery.TimePartitioningType.DAY, field=partition_column
+        )
+
+        dataset = bigquery.Dataset(f"{project_id}.{dataset_id}")
+        dataset.location = location
+        bq_client.create_dataset(dataset, exists_ok=True)
+        bq_client.create_table(table=table, exists_ok=True)
+
+    def add_missing_columns(df: bpd.DataFrame, table_ref: str) -> None:
+        """Add columns of df missing from an existing table, e.g. after a schema change."""
+        table = bq_client.get_table(table_ref)
+        existing_columns = {field.name for field in table.schema}
+        missing_fields = [
+            field
+            for field in bq_client.get_table(df.head(0).to_gbq()).schema
+            if field.name not in existing_columns
+        ]
+        if missing_fields:
+            logging.info(
+                f"Adding columns {[field.name for field in missing_fields]} to {table_ref}"
+            )
+            table.schema = [*table.schema, *missing_fields]
+            bq_client.update_table(table, ["schema"])
+
+    def get_table_or_none(table_ref: str) -> bigquery.Table | None:
+        """Return the table if it exists."""
+        try:
+            return bq_client.get_table(table_ref)
+        except google.api_core.exceptions.NotFound:
+            return None
+
+    def read_partitions(artifacts: list[Dataset], columns: list[str]) -> bpd.DataFrame:
+        """Read the rows of the artifacts of every partition."""
+        table_refs = [
+            load_table(
+                bq_client,
+                artifact.uri,
+                f"{project_id}.{destination_dataset}",
+                location,
+            )
+            for artifact in artifacts
+        ]
+        return bpd.read_gbq(union_query(table_refs, columns))
+
+    deduped_table_ref = f"{project_id}.{destination_dataset}.{deduped_table}"
+
+    with recorder.stage("join") as stage_metrics:
+        logging.info(f"Reading {len(documents)} partitions...")
+        df_documents = read_partitions(
+            documents,
+            [
+                "last_edit_date",
+                "question_id",
+                "question_text",
+                "full_text_md",
+                "content_hash",
+                "reused",
+            ],
+        )
+        df_embedded = read_partitions(
+            embedded_chunks,
+            ["question_id", "chunk_id", "text_chunk", "embedding", "embedding_status"],
+        )
+        is_reused = df_documents["reused"]
+        df_documents = df_documents.drop(columns=["reused"])
+        df_parts = [
+            df_documents[~is_reused].merge(df_embedded, how="inner", on="question_id")
+        ]
+
+        if get_table_or_none(deduped_table_ref) is not None:
+            # Updated metadata with the chunks and vectors stored on the previous run
+            previous_chunks = bpd.read_gbq(
+                f"""
+                SELECT
+                    question_id,
+                    chunk_id,
+                    text_chunk,
+                    embedding,
+                    embedding_status
+                FROM `{deduped_table_ref}`
+                """
+            )
+            df_carried_over = df_documents[is_reused].merge(
+                previous_chunks, how="inner", on="question_id"
+            )
+            df_parts.append(df_carried_over)
+
+        df = bpd.concat(
+            [df_part[df_parts[0].columns] for df_part in df_parts], ignore_index=True
+        )
+        df = df.assign(creation_timestamp=datetime.now())
+        stage_metrics.rows_out = len(df)
+
+    # Store results in BigQuery
+    with recorder.stage("store") as stage_metrics:
+        PARTITION_DATE_COLUMN = "creation_timestamp"
+
+        # Create and populate incremental table
+        logging.info("Creating and populating incremental table...")
+        create_table_if_not_exist(
+            df=df,
+            project_id=project_id,
+            dataset_id=destination_dataset,
+            table_id=destination_table,
+            partition_column=PARTITION_DATE_COLUMN,
+        )
+        incremental_table_ref = (
+            f"{project_id}.{destination_dataset}.{destination_table}"
+        )
+        add_missing_columns(df, incremental_table_ref)
+
+        table_before = bq_client.get_table(incremental_table_ref)
+        if_exists_mode = "append" if is_incremental else "replace"
+        df.to_gbq(
+            destination_table=f"{destination_dataset}.{destination_table}",
+            if_exists=if_exists_mode,
+        )
+        table_after = bq_client.get_table(incremental_table_ref)
+        if is_incremental:
+            stage_metrics.rows_out = table_after.num_rows - table_before.num_rows
+            stage_metrics.bytes_written = table_after.num_bytes - table_before.num_bytes
+        else:
+            stage_metrics.rows_out = table_after.num_rows
+            stage_metrics.bytes_written = table_after.num_bytes
+        logging.info("Incremental table created and populated.")
+
+    # By default every chunk of the deduplicated table is exported and the data
+    # store is fully reconciled against it.
+    export_source_ref = deduped_table_ref
+    deleted_table_ref = None
+
+    # Create deduplicated table
+    with recorder.stage("dedup") as stage_metrics:
+        if (
+            incremental_dedup
+            and is_incremental
+            and get_table_or_none(deduped_table_ref) is not None
+        ):
+            # Upsert the chunks of this run's questions and delete their stale
+            # chunks, so the cost follows the day's delta rather than the history.
+            logging.info("Merging run into deduplicated table...")
+            add_missing_columns(df, deduped_table_ref)
+            run_table_ref = df.to_gbq()
+            if delta_export:
+                # Read before the merge deletes them
+                export_source_ref = run_table_ref
+                deleted_table_ref = bpd.read_gbq(
+                    stale_chunks_query(deduped_table_ref, run_table_ref)
+                ).to_gbq()
+            merge_job = bq_client.query(
+                merge_dedup_script(
+                    target_table=deduped_table_ref,
+                    source_table=run_table_ref,
+                    columns=list(df.columns),
+                )
+            )
+            merge_job.result()
+            stage_metrics.rows_out = merge_job.num_dml_affected_rows or 0
+            logging.info("Run merged into deduplicated table.")
+        else:
+            logging.info("Creating deduplicated table...")
+            df_questions = bpd.read_gbq(
+                f"{destination_dataset}.{destination_table}", use_cache=False
+            )
+            max_date_df = (
+                df_questions.groupby("question_id")["creation_timestamp"]
+                .max()
+                .reset_index()
+            )
+            df_questions_dedup = max_date_df.merge(
+                df_questions, how="inner", on=["question_id", "creation_timestamp"]
+            )
+
+            create_table_if_not_exist(
+                df=df_questions_dedup,
+                project_id=project_id,
+                dataset_id=destination_dataset,
+                table_id=deduped_table,
+                partition_column=PARTITION_DATE_COLUMN,
+            )
+
+            df_questions_dedup.to_gbq(
+                destination_table=f"{destination_dataset}.{deduped_table}",
+                if_exists="replace",
+            )
+            deduped_table_after = bq_client.get_table(deduped_table_ref)
+            stage_metrics.rows_out = deduped_table_after.num_rows
+            stage_metrics.bytes_written = deduped_table_after.num_bytes
+            logging.info("Deduplicated table created and populated.")
+
+    # The chunks to export and the deleted ids are handed to export_chunks, so
+    # changing only export settings reuses this task's cached outputs
+    with recorder.stage("write") as stage_metrics:
+        reconciliation_mode = (
+            "FULL" if export_source_ref == deduped_table_ref else "INCREMENTAL"
+        )
+        stored_chunks.metadata["reconciliation_mode"] = reconciliation_mode
+        stored_table = write_table(bq_client, export_source_ref, stored_chunks)
+        deleted_chunks_query = (
+            f"SELECT chunk_id FROM `{deleted_table_ref}`"
+            if deleted_table_ref
+            else "SELECT CAST(NULL AS STRING) AS chunk_id LIMIT 0"
+        )
+        deleted_table = write_table(
+            bq_client, bpd.read_gbq(deleted_chunks_query).to_gbq(), deleted_chunk_ids
+        )
+        stage_metrics.rows_out = stored_table.num_rows + deleted_table.num_rows
+        logging.info(
+            f"{stored_table.num_rows} chunks to export for {reconciliation_mode} "
+            f"reconciliation, {deleted_table.num_rows} deleted chunks."
+        )
+
+    recorder.log_to(metrics)
+    logging.info(f"Stages: {recorder}")
@@ -0,0 +1,23 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Settings shared by the pipeline components at compile time."""
+
+import os
+
+BASE_IMAGE = "us-docker.pkg.dev/production-ai-template/starter-pack/data_processing:0.2"
+
+# Image built from data_ingestion/Dockerfile. Components run on it so that they
+# can import the helpers under data_ingestion_pipeline.utils.
+COMPONENT_IMAGE = os.getenv("COMPONENT_IMAGE", BASE_IMAGE)
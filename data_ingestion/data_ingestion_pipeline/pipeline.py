@@ -12,10 +12,27 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+
+from data_ingestion_pipeline.components.chunk_questions import chunk_questions
+from data_ingestion_pipeline.components.convert_markdown import convert_markdown
+from data_ingestion_pipeline.components.embed_chunks import embed_chunks
+from data_ingestion_pipeline.components.export_chunks import export_chunks
+from data_ingestion_pipeline.components.fetch_questions import fetch_questions
 from data_ingestion_pipeline.components.ingest_data import ingest_data
-from data_ingestion_pipeline.components.process_data import process_data
+from data_ingestion_pipeline.components.plan_partitions import plan_partitions
+from data_ingestion_pipeline.components.repair_embeddings import repair_embeddings
+from data_ingestion_pipeline.components.store_chunks import store_chunks
 from kfp import dsl
 
+# Partitions processed at once by a partitioned run. ParallelFor needs the
+# parallelism at compile time.
+MAX_PARALLEL_PARTITIONS = int(os.getenv("MAX_PARALLEL_PARTITIONS", "4"))
+
+# Precisions of the binary export's embeddings, the keys of
+# utils.binary_export.QUANTIZATIONS without importing numpy and pyarrow
+BINARY_EXPORT_QUANTIZATIONS = ("float32", "float16", "int8")
+
 
 @dsl.pipeline(description="A pipeline to run ingestion of new data into the datastore")
 def pipeline(
@@ -30,29 +47,154 @@ def pipeline(
     destination_dataset: str = "daisy_knowledge_stackoverflow_data",
     data_store_region: str = "",
     data_store_id: str = "",
+    markdown_workers: int = 0,
+    schema_cache_uri: str = "",
+    partition_days: int = 0,
+    backfill_batch_size: int = 0,
+    page_size: int = 0,
+    chunking_strategy: str = "recursive",
+    chunk_length_unit: str = "characters",
+    near_duplicate_threshold: float = 0.0,
+    near_duplicate_action: str = "collapse",
+    sharded_export: bool = False,
+    export_shard_mb: int = 64,
+    export_workers: int = 4,
+    binary_export: bool = False,
+    binary_export_quantization: str = "float32",
+    normalized_export: bool = False,
 ) -> None:
-    """Processes data and ingests it into a datastore for RAG Retrieval"""
+    """Processes data and ingests it into a datastore for RAG Retrieval
 
-    # Process the data and generate embeddings
-    processed_data = process_data(
-        project_id=project_id,
+    Each step is its own component, so a cached run only re-executes the steps
+    whose inputs changed. With `partition_days` set, an incremental run's
+    window is split into partitions of that many days, fetched, chunked and
+    embedded in parallel (at most MAX_PARALLEL_PARTITIONS at once) and stored
+    together. With `backfill_batch_size` set, chunks are embedded in
+    checkpointed `question_id` ranges of that many questions, so a retried
+    embedding task resumes after its last completed range. With `page_size` set,
+    markdown conversion, chunking and embedding stream their input in pages of
+    that many rows and append each page's results to BigQuery, so their memory
+    use does not grow with the window. With `sharded_export` set, the chunks
+    are exported as gzip JSONL shards of `export_shard_mb` MB, written by
+    `export_workers` writers and imported in parallel. With `binary_export`
+    set, the whole corpus is also exported as Parquet metadata and an
+    embedding array stored as `binary_export_quantization`, one of
+    BINARY_EXPORT_QUANTIZATIONS. With `normalized_export` set, the chunk
+    documents leave out the question text, which retrievers look up in
+    `deduped_table` by `question_id`.
+
+    Raises:
+        ValueError: If binary_export_quantization is not one of
+            BINARY_EXPORT_QUANTIZATIONS
+    """
+    # Parameters are placeholders when the pipeline is compiled, a value is
+    # only checked when given directly
+    if (
+        isinstance(binary_export_quantization, str)
+        and binary_export_quantization not in BINARY_EXPORT_QUANTIZATIONS
+    ):
+        raise ValueError(
+            f"binary_export_quantization must be one of "
+            f"{BINARY_EXPORT_QUANTIZATIONS}, got {binary_export_quantization!r}"
+        )
+
+    plan = plan_partitions(
         schedule_time=dsl.PIPELINE_JOB_SCHEDULE_TIME_UTC_PLACEHOLDER,
         is_incremental=is_incremental,
         look_back_days=look_back_days,
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
+        partition_days=partition_days,
+    )
+
+    # Each partition is processed and retried on its own
+    with dsl.ParallelFor(plan.output, parallelism=MAX_PARALLEL_PARTITIONS) as partition:
+        fetched = fetch_questions(
+            project_id=project_id,
+            schedule_time=dsl.PIPELINE_JOB_SCHEDULE_TIME_UTC_PLACEHOLDER,
+            is_incremental=is_incremental,
+            look_back_days=look_back_days,
+            location=location,
+            window_start=partition.window_start,
+            window_end=partition.window_end,
+        ).set_retry(num_retries=2)
+
+        converted = convert_markdown(
+            project_id=project_id,
+            questions=fetched.outputs["questions"],
+            location=location,
+            destination_dataset=destination_dataset,
+            markdown_workers=markdown_workers,
+            page_size=page_size,
+        ).set_retry(num_retries=2)
+
+        chunked = chunk_questions(
+            project_id=project_id,
+            markdown=converted.outputs["markdown"],
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            location=location,
+            destination_dataset=destination_dataset,
+            deduped_table=deduped_table,
+            page_size=page_size,
+            chunking_strategy=chunking_strategy,
+            chunk_length_unit=chunk_length_unit,
+            near_duplicate_threshold=near_duplicate_threshold,
+            near_duplicate_action=near_duplicate_action,
+        ).set_retry(num_retries=2)
+
+        # Generate embeddings
+        embedded = embed_chunks(
+            project_id=project_id,
+            chunks=chunked.outputs["chunks"],
+            location=location,
+            destination_dataset=destination_dataset,
+            backfill_batch_size=backfill_batch_size,
+            page_size=page_size,
+        ).set_retry(num_retries=2)
+
+    stored = store_chunks(
+        project_id=project_id,
+        documents=dsl.Collected(chunked.outputs["documents"]),
+        embedded_chunks=dsl.Collected(embedded.outputs["embedded_chunks"]),
+        is_incremental=is_incremental,
+        location=location,
         destination_dataset=destination_dataset,
         destination_table=destination_table,
         deduped_table=deduped_table,
+    ).set_retry(num_retries=2)
+
+    # Re-embed chunks whose embedding failed, in this run or an earlier one
+    repaired = repair_embeddings(
+        project_id=project_id,
+        stored_chunks=stored.outputs["stored_chunks"],
         location=location,
+        destination_dataset=destination_dataset,
+        destination_table=destination_table,
+        deduped_table=deduped_table,
+    ).set_retry(num_retries=2)
+
+    exported = export_chunks(
+        project_id=project_id,
+        stored_chunks=repaired.outputs["repaired_chunks"],
+        deleted_chunk_ids=stored.outputs["deleted_chunk_ids"],
+        location=location,
+        destination_dataset=destination_dataset,
+        deduped_table=deduped_table,
         embedding_column="embedding",
+        sharded_export=sharded_export,
+        export_shard_mb=export_shard_mb,
+        export_workers=export_workers,
+        binary_export=binary_export,
+        binary_export_quantization=binary_export_quantization,
+        normalized_export=normalized_export,
     ).set_retry(num_retries=2)
 
     # Ingest the processed data into Vertex AI Search datastore
     ingest_data(
         project_id=project_id,
         data_store_region=data_store_region,
-        input_files=processed_data.output,
+        input_files=exported.outputs["output_files"],
         data_store_id=data_store_id,
+        deleted_chunks=exported.outputs["deleted_chunks"],
         embedding_column="embedding",
+        schema_cache_uri=schema_cache_uri,
     ).set_retry(num_retries=2)
@@ -0,0 +1,186 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Run the ingestion steps locally, without a GCP project.
+
+Reads questions from a Parquet file (or directory) or a DuckDB table, embeds
+chunks with a deterministic local embedder and writes the JSONL export to
+`--output-dir`. State is kept in `--state`, so a second run only processes
+changed questions and exports a delta.
+"""
+
+import argparse
+import logging
+import os
+from datetime import datetime
+
+from data_ingestion_pipeline.utils.embedding_cache import SQLiteEmbeddingCache
+from data_ingestion_pipeline.utils.embedding_scheduler import (
+    DeterministicEmbeddingClient,
+    EmbeddingScheduler,
+)
+from data_ingestion_pipeline.utils.ingestion import run_ingestion
+from data_ingestion_pipeline.utils.near_duplicates import NEAR_DUPLICATE_ACTIONS
+from data_ingestion_pipeline.utils.sinks import SQLiteChunkSink
+from data_ingestion_pipeline.utils.sources import (
+    DuckDBQuestionSource,
+    ParquetQuestionSource,
+    QuestionSource,
+)
+from data_ingestion_pipeline.utils.text_splitter import (
+    CHUNKING_STRATEGIES,
+    LENGTH_UNITS,
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+DUCKDB_EXTENSIONS = (".duckdb", ".db")
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments for a local run."""
+
+    parser = argparse.ArgumentParser(description="Local ingestion run")
+    parser.add_argument(
+        "--input",
+        required=True,
+        help="Parquet file or directory, or DuckDB database (.duckdb, .db)",
+    )
+    parser.add_argument(
+        "--duckdb-table", default="questions", help="Table of the DuckDB database"
+    )
+    parser.add_argument(
+        "--output-dir", default="local_run/output", help="JSONL export directory"
+    )
+    parser.add_argument(
+        "--state",
+        default="local_run/state.sqlite",
+        help="SQLite state of previous runs",
+    )
+    parser.add_argument(
+        "--embedding-cache",
+        default="local_run/embedding_cache.sqlite",
+        help="SQLite embedding cache, empty disables the cache",
+    )
+    parser.add_argument("--start-date", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--end-date", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--chunk-size", type=int, default=1500)
+    parser.add_argument("--chunk-overlap", type=int, default=20)
+    parser.add_argument(
+        "--chunking-strategy",
+        choices=CHUNKING_STRATEGIES,
+        default="recursive",
+        help="'sections' splits on the question and answer headings first",
+    )
+    parser.add_argument(
+        "--chunk-length-unit",
+        choices=LENGTH_UNITS,
+        default="characters",
+        help="Unit of --chunk-size and --chunk-overlap",
+    )
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--markdown-workers", type=int, default=0)
+    parser.add_argument(
+        "--full-export",
+        action="store_true",
+        help="Export every chunk instead of this run's changes",
+    )
+    parser.add_argument(
+        "--normalized-export",
+        action="store_true",
+        help="Export question text once per question to questions.jsonl",
+    )
+    parser.add_argument(
+        "--binary-export",
+        choices=["float32", "float16", "int8"],
+        default=None,
+        help="Also write every chunk as a binary export of this precision",
+    )
+    parser.add_argument(
+        "--near-duplicate-threshold",
+        type=float,
+        default=0.0,
+        help="Similarity from which chunks are near-duplicates, e.g. 0.9 (0 disables)",
+    )
+    parser.add_argument(
+        "--near-duplicate-action",
+        choices=NEAR_DUPLICATE_ACTIONS,
+        default="collapse",
+    )
+    return parser.parse_args()
+
+
+def make_source(args: argparse.Namespace) -> QuestionSource:
+    if args.input.endswith(DUCKDB_EXTENSIONS):
+        return DuckDBQuestionSource(args.input, table=args.duckdb_table)
+    return ParquetQuestionSource(args.input)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    for path in (args.state, args.embedding_cache):
+        if path and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    sink = SQLiteChunkSink(args.state, args.output_dir)
+    cache = SQLiteEmbeddingCache(args.embedding_cache) if args.embedding_cache else None
+    scheduler = EmbeddingScheduler(
+        DeterministicEmbeddingClient(dimensions=args.dimensions), max_concurrency=1
+    )
+
+    stats = run_ingestion(
+        source=make_source(args),
+        sink=sink,
+        scheduler=scheduler,
+        model_name=f"deterministic-{args.dimensions}",
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        chunking_strategy=args.chunking_strategy,
+        chunk_length_unit=args.chunk_length_unit,
+        start_date=args.start_date,
+        end_date=args.end_date,
+        batch_size=args.batch_size,
+        markdown_workers=args.markdown_workers,
+        cache=cache,
+        full_export=args.full_export,
+        normalized_export=args.normalized_export,
+        near_duplicate_threshold=args.near_duplicate_threshold,
+        near_duplicate_action=args.near_duplicate_action,
+    )
+    logging.info(stats)
+    logging.info(f"Export: {stats.export}")
+
+    if args.binary_export:
+        # Imported here, numpy and pyarrow are only needed for binary exports
+        from data_ingestion_pipeline.utils.binary_export import (
+            record_batches,
+            write_binary_export,
+        )
+
+        manifest = write_binary_export(
+            record_batches(sink.documents(full=True)),
+            os.path.join(args.output_dir, "binary"),
+            quantization=args.binary_export,
+        )
+        logging.info(f"Binary export: {manifest}")
+
+    sink.close()
+    if cache:
+        cache.close()
@@ -17,7 +17,12 @@ import logging
 import os
 import sys
 
-from data_ingestion_pipeline.pipeline import pipeline
+from data_ingestion_pipeline.pipeline import BINARY_EXPORT_QUANTIZATIONS, pipeline
+from data_ingestion_pipeline.utils.near_duplicates import NEAR_DUPLICATE_ACTIONS
+from data_ingestion_pipeline.utils.text_splitter import (
+    CHUNKING_STRATEGIES,
+    LENGTH_UNITS,
+)
 from google.cloud import aiplatform
 from kfp import compiler
 
@@ -67,6 +72,90 @@ def parse_args() -> argparse.Namespace:
         default=os.getenv("DISABLE_CACHING", "false").lower() == "true",
         help="Enable pipeline caching",
     )
+    parser.add_argument(
+        "--look-back-days",
+        type=int,
+        default=int(os.getenv("LOOK_BACK_DAYS", "1")),
+        help="Days processed by an incremental run",
+    )
+    parser.add_argument(
+        "--partition-days",
+        type=int,
+        default=int(os.getenv("PARTITION_DAYS", "0")),
+        help="Split the window into partitions of this many days processed in parallel (0 disables)",
+    )
+    parser.add_argument(
+        "--backfill-batch-size",
+        type=int,
+        default=int(os.getenv("BACKFILL_BATCH_SIZE", "0")),
+        help="Embed checkpointed question_id ranges of this many questions, resumed on retry (0 disables)",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=int(os.getenv("PAGE_SIZE", "0")),
+        help="Stream rows through markdown, chunking and embedding in pages of this size (0 disables)",
+    )
+    parser.add_argument(
+        "--chunking-strategy",
+        choices=CHUNKING_STRATEGIES,
+        default=os.getenv("CHUNKING_STRATEGY", "recursive"),
+        help="'sections' splits on the question and answer headings first",
+    )
+    parser.add_argument(
+        "--chunk-length-unit",
+        choices=LENGTH_UNITS,
+        default=os.getenv("CHUNK_LENGTH_UNIT", "characters"),
+        help="Unit of the chunk size and overlap, 'tokens' to size by approximate tokens",
+    )
+    parser.add_argument(
+        "--near-duplicate-threshold",
+        type=float,
+        default=float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0")),
+        help="Similarity from which chunks are near-duplicates, e.g. 0.9 (0 disables)",
+    )
+    parser.add_argument(
+        "--near-duplicate-action",
+        choices=NEAR_DUPLICATE_ACTIONS,
+        default=os.getenv("NEAR_DUPLICATE_ACTION", "collapse"),
+        help="'collapse' reuses the earlier chunk's embedding, 'drop' leaves the chunk out",
+    )
+    parser.add_argument(
+        "--sharded-export",
+        action="store_true",
+        default=os.getenv("SHARDED_EXPORT", "false").lower() == "true",
+        help="Export the chunks as gzip JSONL shards imported in parallel",
+    )
+    parser.add_argument(
+        "--export-shard-mb",
+        type=int,
+        default=int(os.getenv("EXPORT_SHARD_MB", "64")),
+        help="Uncompressed size in MB after which an export shard is closed",
+    )
+    parser.add_argument(
+        "--export-workers",
+        type=int,
+        default=int(os.getenv("EXPORT_WORKERS", "4")),
+        help="Export shards compressed and written in parallel",
+    )
+    parser.add_argument(
+        "--binary-export",
+        action="store_true",
+        default=os.getenv("BINARY_EXPORT", "false").lower() == "true",
+        help="Also export the whole corpus as Parquet metadata and an embedding array",
+    )
+    parser.add_argument(
+        "--binary-export-quantization",
+        choices=BINARY_EXPORT_QUANTIZATIONS,
+        default=os.getenv("BINARY_EXPORT_QUANTIZATION", "float32"),
+        help="Precision of the binary export's embeddings",
+    )
+    parser.add_argument(
+        "--normalized-export",
+        action="store_true",
+        default=os.getenv("NORMALIZED_EXPORT", "false").lower() == "true",
+        help="Leave the question text out of the chunk documents",
+    )
     parser.add_argument(
         "--cron-schedule",
         default=os.getenv("CRON_SCHEDULE", None),
@@ -141,6 +230,38 @@ if __name__ == "__main__":
         args.data_store_region
     )
     pipeline_job_params["parameter_values"]["data_store_id"] = args.data_store_id
+    # The hash of the applied schema is kept next to the pipeline runs
+    pipeline_job_params["parameter_values"]["schema_cache_uri"] = (
+        f"{args.pipeline_root.rstrip('/')}/schema_cache/{args.data_store_id}.sha256"
+    )
+    pipeline_job_params["parameter_values"]["look_back_days"] = args.look_back_days
+    pipeline_job_params["parameter_values"]["partition_days"] = args.partition_days
+    pipeline_job_params["parameter_values"]["backfill_batch_size"] = (
+        args.backfill_batch_size
+    )
+    pipeline_job_params["parameter_values"]["page_size"] = args.page_size
+    pipeline_job_params["parameter_values"]["chunking_strategy"] = (
+        args.chunking_strategy
+    )
+    pipeline_job_params["parameter_values"]["chunk_length_unit"] = (
+        args.chunk_length_unit
+    )
+    pipeline_job_params["parameter_values"]["near_duplicate_threshold"] = (
+        args.near_duplicate_threshold
+    )
+    pipeline_job_params["parameter_values"]["near_duplicate_action"] = (
+        args.near_duplicate_action
+    )
+    pipeline_job_params["parameter_values"]["sharded_export"] = args.sharded_export
+    pipeline_job_params["parameter_values"]["export_shard_mb"] = args.export_shard_mb
+    pipeline_job_params["parameter_values"]["export_workers"] = args.export_workers
+    pipeline_job_params["parameter_values"]["binary_export"] = args.binary_export
+    pipeline_job_params["parameter_values"]["binary_export_quantization"] = (
+        args.binary_export_quantization
+    )
+    pipeline_job_params["parameter_values"]["normalized_export"] = (
+        args.normalized_export
+    )
 
     # Create pipeline job instance
     job = aiplatform.PipelineJob(**pipeline_job_params)
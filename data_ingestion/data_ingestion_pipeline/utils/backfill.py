@@ -0,0 +1,215 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Checkpointed, resumable processing of `question_id` ranges.
+
+`run_backfill` processes `question_id` ranges one at a time and records each
+completed range in a checkpoint. `id_ranges` builds the ranges from the ids
+actually present, so sparse ids never give empty ranges. After a crash or preemption, a
+rerun with the same checkpoint skips the completed ranges. Throughput and the
+estimated time left are logged after every range.
+"""
+
+import json
+import logging
+import os
+import time
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+# Half-open range of question ids, [start, end)
+IdRange = tuple[int, int]
+
+
+def id_ranges(ids: Iterable[int], batch_size: int) -> list[IdRange]:
+    """Split sorted, distinct ids into ranges of `batch_size` ids each.
+
+    Each range starts at an id and ends right after its last id, so the ids
+    missing between them never make up a range of their own.
+    """
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be positive, got {batch_size}")
+    ids = list(ids)
+    return [
+        (ids[start], ids[min(start + batch_size, len(ids)) - 1] + 1)
+        for start in range(0, len(ids), batch_size)
+    ]
+
+
+class Checkpoint(Protocol):
+    """Records the ranges completed by a backfill."""
+
+    def completed(self) -> set[IdRange]: ...
+
+    def mark(self, id_range: IdRange, rows: int) -> None: ...
+
+
+class JSONFileCheckpoint:
+    """Keeps completed ranges in a JSON file, e.g. on a mounted bucket."""
+
+    def __init__(self, path: str, run_key: str) -> None:
+        self._path = path
+        self._run_key = run_key
+
+    def _read(self) -> dict[str, list[list[int]]]:
+        if not os.path.exists(self._path):
+            return {}
+        with open(self._path) as f:
+            return json.load(f)
+
+    def completed(self) -> set[IdRange]:
+        return {(start, end) for start, end, _ in self._read().get(self._run_key, [])}
+
+    def mark(self, id_range: IdRange, rows: int) -> None:
+        state = self._read()
+        state.setdefault(self._run_key, []).append([*id_range, rows])
+        # Replace the file at once so a crash never leaves it half-written
+        os.makedirs(os.path.dirname(os.path.abspath(self._path)), exist_ok=True)
+        with open(self._path + ".tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(self._path + ".tmp", self._path)
+
+
+class BigQueryCheckpoint:
+    """Keeps completed ranges in a BigQuery table, one row per range."""
+
+    def __init__(self, client: Any, table_ref: str, run_key: str) -> None:
+        """Create a checkpoint, creating its table if needed.
+
+        Args:
+            client: A `google.cloud.bigquery.Client`
+            table_ref: `project.dataset.table` of the checkpoint table
+            run_key: Identifies the backfill whose ranges are recorded
+        """
+        from google.cloud import bigquery
+
+        self._bigquery = bigquery
+        self._client = client
+        self._table_ref = table_ref
+        self._run_key = run_key
+        client.query(
+            f"""
+            CREATE TABLE IF NOT EXISTS `{table_ref}` (
+                run_key STRING NOT NULL,
+                range_start INT64 NOT NULL,
+                range_end INT64 NOT NULL,
+                num_rows INT64,
+                completed_at TIMESTAMP
+            )
+            """
+        ).result()
+
+    def _run_key_config(self, *parameters: Any) -> Any:
+        return self._bigquery.QueryJobConfig(
+            query_parameters=[
+                self._bigquery.ScalarQueryParameter("run_key", "STRING", self._run_key),
+                *parameters,
+            ]
+        )
+
+    def completed(self) -> set[IdRange]:
+        rows = self._client.query(
+            f"""
+            SELECT range_start, range_end FROM `{self._table_ref}`
+            WHERE run_key = @run_key
+            """,
+            job_config=self._run_key_config(),
+        ).result()
+        return {(row["range_start"], row["range_end"]) for row in rows}
+
+    def mark(self, id_range: IdRange, rows: int) -> None:
+        parameter = self._bigquery.ScalarQueryParameter
+        self._client.query(
+            f"""
+            INSERT INTO `{self._table_ref}`
+            VALUES (@run_key, @range_start, @range_end, @num_rows, CURRENT_TIMESTAMP())
+            """,
+            job_config=self._run_key_config(
+                parameter("range_start", "INT64", id_range[0]),
+                parameter("range_end", "INT64", id_range[1]),
+                parameter("num_rows", "INT64", rows),
+            ),
+        ).result()
+
+
+@dataclass
+class BackfillStats:
+    """Progress of a backfill."""
+
+    total_ranges: int
+    resumed_ranges: int = 0
+    processed_ranges: int = 0
+    rows: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    @property
+    def eta_seconds(self) -> float:
+        """Seconds left at the average time per range processed so far."""
+        if not self.processed_ranges:
+            return 0.0
+        remaining = self.total_ranges - self.resumed_ranges - self.processed_ranges
+        return remaining * self.seconds / self.processed_ranges
+
+    def __str__(self) -> str:
+        done = self.resumed_ranges + self.processed_ranges
+        return (
+            f"{done} of {self.total_ranges} ranges done "
+            f"({self.resumed_ranges} resumed from checkpoint), {self.rows} rows at "
+            f"{self.rows_per_second:.0f} rows/s, ETA {self.eta_seconds:.0f}s"
+        )
+
+
+def run_backfill(
+    ranges: Sequence[IdRange],
+    process: Callable[[int, int], int],
+    checkpoint: Checkpoint,
+    clock: Callable[[], float] = time.monotonic,
+) -> BackfillStats:
+    """Process every range not completed yet, checkpointing each one.
+
+    Args:
+        ranges: `question_id` ranges to process, in order
+        process: Processes the ids in [start, end) and returns the rows
+            written. It must be safe to call again for a range that was
+            interrupted before being checkpointed.
+        checkpoint: Records completed ranges
+        clock: Monotonic clock, replaced in tests
+
+    Returns:
+        The progress of the backfill, counting only this attempt's rows
+    """
+    completed = checkpoint.completed()
+    stats = BackfillStats(total_ranges=len(ranges))
+    stats.resumed_ranges = sum(1 for id_range in ranges if id_range in completed)
+    if stats.resumed_ranges:
+        logging.info(
+            f"Resuming backfill: {stats.resumed_ranges} of {len(ranges)} ranges "
+            "already completed"
+        )
+    for id_range in ranges:
+        if id_range in completed:
+            continue
+        start = clock()
+        rows = process(*id_range)
+        checkpoint.mark(id_range, rows)
+        stats.seconds += clock() - start
+        stats.processed_ranges += 1
+        stats.rows += rows
+        logging.info(f"Backfill range [{id_range[0]}, {id_range[1]}): {stats}")
+    return stats
@@ -0,0 +1,152 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Parquet artifacts passed between the processing components.
+
+Each processing component extracts its result table to Parquet files under
+the URI of its output `Dataset`, and the next component loads them back into
+a BigQuery table that expires after a day. The files live under the pipeline
+root and are never modified, so the outputs of a cached task stay valid for
+every later run that reuses them.
+"""
+
+import hashlib
+from collections.abc import Sequence
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+PARQUET_FORMAT = "parquet"
+
+# Lifetime of the tables artifacts are loaded into or built up in
+LOADED_TABLE_TTL = timedelta(days=1)
+
+
+def parquet_uri(artifact_uri: str) -> str:
+    """Return the wildcard URI of the Parquet files of an artifact."""
+    return f"{artifact_uri.rstrip('/')}/part-*.parquet"
+
+
+def loaded_table_name(artifact_uri: str) -> str:
+    """Return the name of the table an artifact is loaded into."""
+    digest = hashlib.sha256(artifact_uri.encode("utf-8")).hexdigest()
+    return f"artifact_{digest[:16]}"
+
+
+def staging_table_name(artifact_uri: str) -> str:
+    """Return the name of the table an output artifact is built up in."""
+    digest = hashlib.sha256(artifact_uri.encode("utf-8")).hexdigest()
+    return f"staging_{digest[:16]}"
+
+
+def create_staging_table(
+    client: Any, artifact_uri: str, dataset_ref: str, query: str
+) -> str:
+    """Create the table an output artifact is built up in, expiring after a day.
+
+    Args:
+        client: A `google.cloud.bigquery.Client`
+        artifact_uri: URI of the output artifact
+        dataset_ref: `project.dataset` of the table
+        query: Query giving the table's columns and initial rows, e.g. a
+            typed `SELECT ... LIMIT 0` for a table filled by appends
+
+    Returns:
+        The `project.dataset.table` of the staging table
+    """
+    table_ref = f"{dataset_ref}.{staging_table_name(artifact_uri)}"
+    expiration_hours = int(LOADED_TABLE_TTL.total_seconds() // 3600)
+    client.query(
+        f"""
+        CREATE OR REPLACE TABLE `{table_ref}`
+        OPTIONS (
+            expiration_timestamp = TIMESTAMP_ADD(
+                CURRENT_TIMESTAMP(), INTERVAL {expiration_hours} HOUR
+            )
+        )
+        AS {query}
+        """
+    ).result()
+    return table_ref
+
+
+def write_table(client: Any, table_ref: str, artifact: Any) -> Any:
+    """Extract a table to the artifact's URI as Parquet files.
+
+    Args:
+        client: A `google.cloud.bigquery.Client`
+        table_ref: `project.dataset.table` to extract
+        artifact: Output `Dataset`; its metadata gets the format and row count
+
+    Returns:
+        The extracted table
+    """
+    from google.cloud import bigquery
+
+    job_config = bigquery.ExtractJobConfig(
+        destination_format=bigquery.DestinationFormat.PARQUET
+    )
+    client.extract_table(
+        table_ref, parquet_uri(artifact.uri), job_config=job_config
+    ).result()
+    table = client.get_table(table_ref)
+    artifact.metadata["format"] = PARQUET_FORMAT
+    artifact.metadata["num_rows"] = table.num_rows
+    return table
+
+
+def load_table(client: Any, artifact_uri: str, dataset_ref: str, location: str) -> str:
+    """Load the Parquet files of an artifact into a table expiring after a day.
+
+    Args:
+        client: A `google.cloud.bigquery.Client`
+        artifact_uri: URI of an artifact written by `write_table`
+        dataset_ref: `project.dataset` to load into, created if missing
+        location: Location of the dataset
+
+    Returns:
+        The `project.dataset.table` holding the artifact's rows
+    """
+    from google.cloud import bigquery
+
+    dataset = bigquery.Dataset(dataset_ref)
+    dataset.location = location
+    client.create_dataset(dataset, exists_ok=True)
+
+    table_ref = f"{dataset_ref}.{loaded_table_name(artifact_uri)}"
+    parquet_options = bigquery.ParquetOptions()
+    # Read LIST columns (e.g. embeddings) back as arrays
+    parquet_options.enable_list_inference = True
+    job_config = bigquery.LoadJobConfig(
+        source_format=bigquery.SourceFormat.PARQUET,
+        write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+    )
+    job_config.parquet_options = parquet_options
+    client.load_table_from_uri(
+        parquet_uri(artifact_uri), table_ref, job_config=job_config
+    ).result()
+
+    table = client.get_table(table_ref)
+    table.expires = datetime.now(timezone.utc) + LOADED_TABLE_TTL
+    client.update_table(table, ["expires"])
+    return table_ref
+
+
+def union_query(table_refs: Sequence[str], columns: Sequence[str]) -> str:
+    """Return a query for the rows of all tables, which have the given columns."""
+    if not table_refs:
+        raise ValueError("table_refs must not be empty")
+    selected = ", ".join(f"`{column}`" for column in columns)
+    return "\nUNION ALL\n".join(
+        f"SELECT {selected} FROM `{table_ref}`" for table_ref in table_refs
+    )
@@ -0,0 +1,267 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compact binary export of the chunk corpus.
+
+The JSONL export writes every embedding as text, which is several times larger
+than the vectors and slow to parse. The binary export is a directory of:
+
+- `chunks.parquet`: the id and metadata of each chunk, one row per chunk
+- `embeddings.bin`: the embeddings as one contiguous row-major array, row `i`
+  belonging to row `i` of `chunks.parquet`
+- `scales.f32`: for int8 exports, the float32 scale of each row
+- `manifest.json`: number of rows, dimensions, quantization and dtype
+
+Embeddings are stored as float32, float16 or int8. int8 uses symmetric scalar
+quantization with a scale per vector, so a vector is `scale * int8 values`.
+`load_binary_export` memory-maps the arrays, so loading the corpus for local
+retrieval, evaluation or re-ranking does not read or copy the vectors.
+"""
+
+import json
+import os
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any, NamedTuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+MANIFEST_FILE = "manifest.json"
+METADATA_FILE = "chunks.parquet"
+EMBEDDINGS_FILE = "embeddings.bin"
+SCALES_FILE = "scales.f32"
+
+# Little-endian dtype of the stored embeddings by quantization
+QUANTIZATIONS = {"float32": "<f4", "float16": "<f2", "int8": "i1"}
+
+_INT8_MAX = 127
+
+
+def _check_quantization(quantization: str) -> None:
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(
+            f"quantization must be one of {list(QUANTIZATIONS)}, got {quantization!r}"
+        )
+
+
+def quantize(
+    vectors: np.ndarray, quantization: str
+) -> tuple[np.ndarray, np.ndarray | None]:
+    """Quantize a (rows, dimensions) array.
+
+    Returns:
+        The quantized array, and for int8 the scale of each row
+
+    Raises:
+        ValueError: If the quantization is unknown
+    """
+    _check_quantization(quantization)
+    dtype = np.dtype(QUANTIZATIONS[quantization])
+    if quantization != "int8":
+        return vectors.astype(dtype, copy=False), None
+
+    scales = np.abs(vectors).max(axis=1) / _INT8_MAX
+    scales[scales == 0] = 1.0
+    quantized = np.rint(vectors / scales[:, None]).clip(-_INT8_MAX, _INT8_MAX)
+    return quantized.astype(dtype), scales.astype("<f4")
+
+
+class BinaryExport(NamedTuple):
+    """A loaded binary export."""
+
+    embeddings: np.ndarray
+    metadata: pa.Table
+    manifest: dict[str, Any]
+    scales: np.ndarray | None = None
+
+    def vectors(self, rows: slice = slice(None)) -> np.ndarray:
+        """Return the embeddings of `rows` as float32, dequantizing them."""
+        vectors = self.embeddings[rows].astype(np.float32)
+        if self.scales is not None:
+            vectors *= self.scales[rows, None]
+        return vectors
+
+    def search(
+        self, queries: np.ndarray, k: int = 10, block_rows: int = 65_536
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Exact top-k search by dot product.
+
+        Rows are dequantized `block_rows` at a time, so memory does not depend
+        on the size of the corpus.
+
+        Args:
+            queries: Query vectors, of shape (queries, dimensions)
+            k: Number of results per query
+            block_rows: Rows scored at once
+
+        Returns:
+            Scores and row indices of the results, best first, each of shape
+            (queries, k)
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(self.embeddings), block_rows):
+            block_scores = queries @ self.vectors(slice(start, start + block_rows)).T
+            indices = np.arange(start, start + block_scores.shape[1])
+            scores = np.concatenate([best_scores, block_scores], axis=1)
+            rows = np.concatenate(
+                [best_rows, np.broadcast_to(indices, block_scores.shape)], axis=1
+            )
+            if scores.shape[1] > k:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, top, axis=1)
+                rows = np.take_along_axis(rows, top, axis=1)
+            best_scores, best_rows = scores, rows
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        return (
+            np.take_along_axis(best_scores, order, axis=1),
+            np.take_along_axis(best_rows, order, axis=1),
+        )
+
+
+def record_batches(
+    rows: Iterable[dict[str, Any]], batch_size: int = 10_000
+) -> Iterator[pa.RecordBatch]:
+    """Group row dicts into record batches for `write_binary_export`."""
+    batch: list[dict[str, Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield pa.RecordBatch.from_pylist(batch)
+            batch = []
+    if batch:
+        yield pa.RecordBatch.from_pylist(batch)
+
+
+def write_binary_export(
+    batches: Iterable[pa.RecordBatch],
+    directory: str,
+    embedding_column: str = "embedding",
+    quantization: str = "float32",
+) -> dict[str, Any]:
+    """Write record batches of chunks as a binary export.
+
+    Batches are written as they arrive, so memory is bounded by one batch.
+
+    Args:
+        batches: Chunks with an `embedding_column` list column and any
+            metadata columns
+        directory: Directory to write the export to, created if missing
+        embedding_column: Column holding the embeddings
+        quantization: Stored precision, one of `QUANTIZATIONS`
+
+    Returns:
+        The manifest of the export
+
+    Raises:
+        ValueError: If the embeddings do not all have the same length, or the
+            quantization is unknown
+    """
+    _check_quantization(quantization)
+    os.makedirs(directory, exist_ok=True)
+    num_rows = 0
+    dimensions: int | None = None
+    writer: pq.ParquetWriter | None = None
+    with (
+        open(os.path.join(directory, EMBEDDINGS_FILE), "wb") as embeddings_file,
+        open(os.path.join(directory, SCALES_FILE), "wb") as scales_file,
+    ):
+        for batch in batches:
+            if batch.num_rows == 0:
+                continue
+            column = batch.column(embedding_column)
+            lengths = pc.list_value_length(column).to_numpy(zero_copy_only=False)
+            if dimensions is None:
+                dimensions = int(lengths[0])
+            if (lengths != dimensions).any():
+                raise ValueError(
+                    f"Embeddings of {embedding_column} must all have "
+                    f"{dimensions} dimensions"
+                )
+            vectors = column.flatten().to_numpy(zero_copy_only=False)
+            quantized, scales = quantize(
+                vectors.reshape(batch.num_rows, dimensions), quantization
+            )
+            embeddings_file.write(quantized.tobytes())
+            if scales is not None:
+                scales_file.write(scales.tobytes())
+
+            metadata = batch.drop_columns([embedding_column])
+            if writer is None:
+                writer = pq.ParquetWriter(
+                    os.path.join(directory, METADATA_FILE), metadata.schema
+                )
+            writer.write_batch(metadata)
+            num_rows += batch.num_rows
+    if writer is not None:
+        writer.close()
+    if quantization != "int8":
+        os.remove(os.path.join(directory, SCALES_FILE))
+
+    manifest = {
+        "num_rows": num_rows,
+        "dimensions": dimensions or 0,
+        "quantization": quantization,
+        "dtype": QUANTIZATIONS[quantization],
+        "embedding_column": embedding_column,
+    }
+    with open(os.path.join(directory, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def load_binary_export(
+    directory: str, columns: Sequence[str] | None = None
+) -> BinaryExport:
+    """Open a binary export without copying its embeddings.
+
+    Args:
+        directory: Directory written by `write_binary_export`
+        columns: Metadata columns to read, all by default
+
+    Returns:
+        A read-only memory map of the embeddings of shape (rows, dimensions),
+        the metadata table, the manifest and, for int8, a memory map of the
+        per-row scales
+    """
+    with open(os.path.join(directory, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    shape = (manifest["num_rows"], manifest["dimensions"])
+    if manifest["num_rows"] == 0:
+        return BinaryExport(
+            np.empty(shape, dtype=manifest["dtype"]), pa.table({}), manifest
+        )
+
+    embeddings = np.memmap(
+        os.path.join(directory, EMBEDDINGS_FILE),
+        dtype=manifest["dtype"],
+        mode="r",
+        shape=shape,
+    )
+    metadata = pq.read_table(
+        os.path.join(directory, METADATA_FILE), columns=columns, memory_map=True
+    )
+    scales = None
+    if manifest.get("quantization") == "int8":
+        scales = np.memmap(
+            os.path.join(directory, SCALES_FILE),
+            dtype="<f4",
+            mode="r",
+            shape=(manifest["num_rows"],),
+        )
+    return BinaryExport(embeddings, metadata, manifest, scales)
@@ -0,0 +1,68 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Streaming chunk generation.
+
+Instead of building a list column of chunks for the whole frame and exploding
+it (which copies every row's metadata once per chunk), documents are split one
+at a time and emitted as narrow `ChunkRecord`s in bounded-size batches. Parent
+metadata is joined back by `question_id` downstream.
+"""
+
+from collections.abc import Callable, Iterable, Iterator
+from typing import NamedTuple
+
+
+class ChunkRecord(NamedTuple):
+    """A single chunk of a question's markdown."""
+
+    question_id: int
+    chunk_idx: int
+    text_chunk: str
+
+    @property
+    def chunk_id(self) -> str:
+        return f"{self.question_id}__{self.chunk_idx}"
+
+
+def iter_chunks(
+    documents: Iterable[tuple[int, str]], split: Callable[[str], list[str]]
+) -> Iterator[ChunkRecord]:
+    """Yield the chunks of each `(question_id, text)` document, in order."""
+    for question_id, text in documents:
+        for chunk_idx, text_chunk in enumerate(split(text)):
+            yield ChunkRecord(question_id, chunk_idx, text_chunk)
+
+
+def iter_chunk_batches(
+    documents: Iterable[tuple[int, str]],
+    split: Callable[[str], list[str]],
+    batch_size: int = 50_000,
+) -> Iterator[list[ChunkRecord]]:
+    """Yield the chunks of `documents` in batches of at most `batch_size` records.
+
+    Only one batch is held in memory at a time, so peak memory does not depend
+    on the number of documents.
+    """
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be positive, got {batch_size}")
+
+    batch: list[ChunkRecord] = []
+    for record in iter_chunks(documents, split):
+        batch.append(record)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,87 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Incremental upkeep of the deduplicated chunks table.
+
+Rather than rebuilding the deduplicated table from the whole history of the
+incremental table, the rows of one run are merged into it: chunks of the
+questions touched by the run are updated or inserted, and their chunks that no
+longer exist (e.g. after a question was re-chunked) are deleted.
+"""
+
+from collections.abc import Sequence
+
+
+def _stale_chunks_condition(source_table: str) -> str:
+    return f"""question_id IN (SELECT DISTINCT question_id FROM `{source_table}`)
+    AND chunk_id NOT IN (
+        SELECT chunk_id FROM `{source_table}` WHERE chunk_id IS NOT NULL
+    )"""
+
+
+def stale_chunks_query(target_table: str, source_table: str) -> str:
+    """Return a query for the chunk ids that merging `source_table` will delete."""
+    return f"""
+SELECT chunk_id
+FROM `{target_table}`
+WHERE {_stale_chunks_condition(source_table)}
+"""
+
+
+def merge_dedup_script(
+    target_table: str,
+    source_table: str,
+    columns: Sequence[str],
+) -> str:
+    """Return a BigQuery script merging a run's chunks into the deduped table.
+
+    Rows are keyed on `question_id` and `chunk_id`. The delete and the merge
+    run in one transaction, so readers never see a half-updated question.
+
+    Args:
+        target_table: Fully qualified deduplicated table
+        source_table: Fully qualified table holding every chunk of the
+            questions touched by the run
+        columns: Columns to write, all present in both tables
+
+    Returns:
+        The multi-statement SQL script
+    """
+    keys = ("question_id", "chunk_id")
+    missing_keys = [key for key in keys if key not in columns]
+    if missing_keys:
+        raise ValueError(f"columns must include the key columns {missing_keys}")
+
+    quoted = [f"`{column}`" for column in columns]
+    updates = ",\n        ".join(
+        f"{column} = source.{column}" for column in quoted if column[1:-1] not in keys
+    )
+    return f"""
+BEGIN TRANSACTION;
+
+DELETE FROM `{target_table}`
+WHERE {_stale_chunks_condition(source_table)};
+
+MERGE `{target_table}` AS target
+USING `{source_table}` AS source
+ON target.question_id = source.question_id AND target.chunk_id = source.chunk_id
+WHEN MATCHED THEN
+    UPDATE SET
+        {updates}
+WHEN NOT MATCHED BY TARGET THEN
+    INSERT ({", ".join(quoted)})
+    VALUES ({", ".join(f"source.{column}" for column in quoted)});
+
+COMMIT TRANSACTION;
+"""
@@ -0,0 +1,133 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Chunk embedding cache keyed by (model_name, sha256(chunk text)).
+
+`embed_chunks` keeps its cache in a BigQuery side table. `SQLiteEmbeddingCache`
+is the local equivalent for runs outside of BigQuery. In both cases only cache
+misses are sent to the embedding model.
+"""
+
+import hashlib
+import json
+import sqlite3
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+
+
+def text_hash(text: str) -> str:
+    """Return the hex SHA-256 of a chunk's text, the cache key within a model."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    """Hit and miss counts of one run."""
+
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __str__(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses ({self.hit_rate:.1%} hit rate)"
+
+
+class SQLiteEmbeddingCache:
+    """Embedding cache stored in a local SQLite database."""
+
+    def __init__(self, path: str = ":memory:") -> None:
+        self._connection = sqlite3.connect(path)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                model_name TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                embedding TEXT NOT NULL,
+                PRIMARY KEY (model_name, text_hash)
+            )
+            """
+        )
+
+    def get_many(
+        self, model_name: str, hashes: Sequence[str]
+    ) -> dict[str, list[float]]:
+        """Return the cached embeddings of `hashes`, keyed by hash."""
+        found: dict[str, list[float]] = {}
+        unique_hashes = list(dict.fromkeys(hashes))
+        # Stay below SQLite's default limit on bound parameters.
+        for start in range(0, len(unique_hashes), 500):
+            batch = unique_hashes[start : start + 500]
+            rows = self._connection.execute(
+                f"""
+                SELECT text_hash, embedding FROM embedding_cache
+                WHERE model_name = ? AND text_hash IN ({", ".join("?" * len(batch))})
+                """,
+                [model_name, *batch],
+            )
+            found.update((key, json.loads(embedding)) for key, embedding in rows)
+        return found
+
+    def put_many(self, model_name: str, embeddings: dict[str, list[float]]) -> None:
+        """Store embeddings keyed by text hash."""
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embedding_cache VALUES (?, ?, ?)",
+                [
+                    (model_name, key, json.dumps(embedding))
+                    for key, embedding in embeddings.items()
+                ],
+            )
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+def embed_with_cache(
+    texts: Sequence[str],
+    embed: Callable[[list[str]], list[list[float]]],
+    cache: SQLiteEmbeddingCache,
+    model_name: str,
+) -> tuple[list[list[float]], CacheStats]:
+    """Embed `texts`, calling `embed` only for texts missing from the cache.
+
+    Identical texts within `texts` are embedded once.
+
+    Args:
+        texts: Chunk texts to embed
+        embed: Embeds a list of texts, returning one vector per text
+        cache: Cache to read from and write new embeddings to
+        model_name: Embedding model, part of the cache key
+
+    Returns:
+        One vector per text in input order, and the run's hit and miss counts
+    """
+    hashes = [text_hash(text) for text in texts]
+    cached = cache.get_many(model_name, hashes)
+
+    missing = {
+        key: text for key, text in zip(hashes, texts, strict=True) if key not in cached
+    }
+    if missing:
+        vectors = embed(list(missing.values()))
+        new_embeddings = dict(zip(missing.keys(), vectors, strict=True))
+        cache.put_many(model_name, new_embeddings)
+        cached.update(new_embeddings)
+
+    misses = sum(1 for key in hashes if key in missing)
+    stats = CacheStats(hits=len(hashes) - misses, misses=misses)
+    return [cached[key] for key in hashes], stats
@@ -0,0 +1,116 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Re-embedding of rows whose embedding failed.
+
+`EmbeddingScheduler` gives the rows of a batch that keeps failing an empty
+embedding and a non-empty `embedding_status`, and the export leaves them out.
+`EmbeddingRepairer` waits out the failure, e.g. an exhausted quota, and then
+re-embeds only those rows, over a few rounds of growing backoff.
+"""
+
+import logging
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+
+from data_ingestion_pipeline.utils.embedding_scheduler import (
+    EmbeddingRun,
+    EmbeddingScheduler,
+)
+
+
+def failed_indices(statuses: Sequence[str | None]) -> list[int]:
+    """Positions of the rows with a non-empty `embedding_status`."""
+    return [index for index, status in enumerate(statuses) if status]
+
+
+@dataclass
+class RepairReport:
+    """Outcome of an `EmbeddingRepairer.repair` call."""
+
+    failed: int = 0
+    repaired: int = 0
+    rounds: int = 0
+
+    @property
+    def still_failed(self) -> int:
+        return self.failed - self.repaired
+
+    def __str__(self) -> str:
+        return (
+            f"{self.repaired} of {self.failed} failed rows repaired in "
+            f"{self.rounds} rounds, {self.still_failed} still failed"
+        )
+
+
+class EmbeddingRepairer:
+    """Re-embeds failed rows, waiting longer before each round."""
+
+    def __init__(
+        self,
+        scheduler: EmbeddingScheduler,
+        max_rounds: int = 2,
+        initial_backoff: float = 30.0,
+        max_backoff: float = 300.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Create a repairer.
+
+        Args:
+            scheduler: Scheduler re-embedding the failed rows, with its own
+                per-batch retries
+            max_rounds: Rounds of re-embedding, 0 disables repairs
+            initial_backoff: Seconds waited before the first round, doubled
+                before each following round
+            max_backoff: Maximum seconds waited before a round
+            sleep: Waits before each round, replaceable in tests
+        """
+        self._scheduler = scheduler
+        self._max_rounds = max_rounds
+        self._initial_backoff = initial_backoff
+        self._max_backoff = max_backoff
+        self._sleep = sleep
+
+    def repair(self, texts: Sequence[str], run: EmbeddingRun) -> RepairReport:
+        """Re-embed the failed rows of `run`, updating it in place.
+
+        Args:
+            texts: The texts embedded by `run`, in the same order
+            run: Embeddings and statuses to repair
+
+        Returns:
+            How many of the failed rows were repaired
+        """
+        pending = failed_indices(run.statuses)
+        report = RepairReport(failed=len(pending))
+        for round_number in range(self._max_rounds):
+            if not pending:
+                break
+            backoff = min(self._max_backoff, self._initial_backoff * 2**round_number)
+            logging.info(
+                f"Re-embedding {len(pending)} failed rows in {backoff:.0f}s "
+                f"(round {round_number + 1} of {self._max_rounds})..."
+            )
+            self._sleep(backoff)
+            retry = self._scheduler.embed([texts[index] for index in pending])
+            report.rounds += 1
+            for index, embedding, status in zip(
+                pending, retry.embeddings, retry.statuses, strict=True
+            ):
+                run.embeddings[index] = embedding
+                run.statuses[index] = status
+            pending = [index for index in pending if run.statuses[index]]
+        report.repaired = report.failed - len(pending)
+        return report
@@ -0,0 +1,283 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Concurrent, budgeted embedding requests with per-batch retries.
+
+`EmbeddingScheduler` packs texts into request batches that stay within a token
+(or character) budget, sends a bounded number of batches concurrently, and
+retries failed batches with jittered exponential backoff. A batch that still
+fails does not fail the run: its rows get an empty embedding and a non-empty
+`embedding_status`, like rows that `ML.GENERATE_EMBEDDING` could not embed.
+
+The model is reached through an `EmbeddingClient`, so the scheduler can be
+pointed at Vertex AI, at a local fake server for load tests, or at a
+deterministic local embedder for offline runs.
+"""
+
+import hashlib
+import json
+import logging
+import random
+import time
+import urllib.request
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import NamedTuple, Protocol
+
+from data_ingestion_pipeline.utils.tokens import estimate_tokens
+
+# Token budget of a request, below the 20,000 token limit of Vertex AI text
+# embedding requests since `estimate_tokens` only approximates the model's
+# tokenizer
+DEFAULT_BATCH_TOKENS = 15_000
+
+
+class EmbeddingClient(Protocol):
+    """Embeds a batch of texts, returning one vector per text."""
+
+    def embed(self, texts: list[str]) -> list[list[float]]: ...
+
+
+class VertexAIEmbeddingClient:
+    """Embeds texts with a Vertex AI text embedding model."""
+
+    def __init__(
+        self,
+        model_name: str,
+        project: str,
+        location: str,
+        task_type: str = "RETRIEVAL_DOCUMENT",
+    ) -> None:
+        import vertexai
+        from vertexai.language_models import TextEmbeddingModel
+
+        vertexai.init(project=project, location=location)
+        self._model = TextEmbeddingModel.from_pretrained(model_name)
+        self._task_type = task_type
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        from vertexai.language_models import TextEmbeddingInput
+
+        inputs = [TextEmbeddingInput(text, self._task_type) for text in texts]
+        embeddings = self._model.get_embeddings(inputs, auto_truncate=True)
+        return [embedding.values for embedding in embeddings]
+
+
+class HTTPEmbeddingClient:
+    """Embeds texts with a JSON endpoint taking `{"texts": [...]}`.
+
+    The endpoint responds with `{"embeddings": [[...], ...]}`, e.g. the fake
+    server in `benchmarks/fake_embedding_server.py`.
+    """
+
+    def __init__(self, url: str, timeout: float = 60.0) -> None:
+        self._url = url
+        self._timeout = timeout
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        request = urllib.request.Request(
+            self._url,
+            data=json.dumps({"texts": texts}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=self._timeout) as response:
+            return json.load(response)["embeddings"]
+
+
+def deterministic_embedding(text: str, dimensions: int) -> list[float]:
+    """Vector with values in [-1, 1] derived from the text's SHAKE-256 digest."""
+    digest = hashlib.shake_256(text.encode("utf-8")).digest(dimensions)
+    return [byte / 127.5 - 1 for byte in digest]
+
+
+class DeterministicEmbeddingClient:
+    """Embeds texts locally with `deterministic_embedding`, for offline runs."""
+
+    def __init__(self, dimensions: int = 768) -> None:
+        self._dimensions = dimensions
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        return [deterministic_embedding(text, self._dimensions) for text in texts]
+
+
+def pack_batches(
+    texts: Sequence[str],
+    max_batch_tokens: int,
+    max_batch_size: int,
+    length_function: Callable[[str], int] = estimate_tokens,
+) -> list[list[int]]:
+    """Group text indices into batches within a token and size budget.
+
+    Texts are packed in input order. A text longer than `max_batch_tokens` is
+    sent on its own and left to the model to truncate.
+
+    Args:
+        texts: Texts to embed
+        max_batch_tokens: Maximum summed `length_function` of a batch
+        max_batch_size: Maximum number of texts in a batch
+        length_function: Measures a text, in tokens or characters
+
+    Returns:
+        The indices into `texts` of each batch
+    """
+    if max_batch_tokens < 1 or max_batch_size < 1:
+        raise ValueError("max_batch_tokens and max_batch_size must be positive")
+
+    batches: list[list[int]] = []
+    batch: list[int] = []
+    batch_tokens = 0
+    for index, text in enumerate(texts):
+        tokens = length_function(text)
+        if batch and (
+            batch_tokens + tokens > max_batch_tokens or len(batch) == max_batch_size
+        ):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(index)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+@dataclass
+class EmbeddingRun:
+    """Embeddings of one `EmbeddingScheduler.embed` call, in input order.
+
+    Rows of failed batches have an empty embedding and the error as status.
+    """
+
+    embeddings: list[list[float]]
+    statuses: list[str]
+    batches: int = 0
+    retries: int = 0
+    failed_batches: int = 0
+
+    @property
+    def failed_rows(self) -> int:
+        return sum(1 for status in self.statuses if status)
+
+    def __str__(self) -> str:
+        return (
+            f"{len(self.statuses)} texts in {self.batches} batches, "
+            f"{self.retries} retries, {self.failed_batches} failed batches "
+            f"({self.failed_rows} rows)"
+        )
+
+
+class _BatchResult(NamedTuple):
+    vectors: list[list[float]] | None
+    status: str
+    retries: int
+
+
+class EmbeddingScheduler:
+    """Embeds texts in budgeted batches, concurrently, retrying failed batches."""
+
+    def __init__(
+        self,
+        client: EmbeddingClient,
+        max_concurrency: int = 8,
+        max_batch_tokens: int = DEFAULT_BATCH_TOKENS,
+        max_batch_size: int = 250,
+        length_function: Callable[[str], int] = estimate_tokens,
+        max_retries: int = 5,
+        initial_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        retry_on: tuple[type[BaseException], ...] = (Exception,),
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Create a scheduler.
+
+        Args:
+            client: Client sending one batch to the embedding model
+            max_concurrency: Maximum number of batches in flight
+            max_batch_tokens: Token budget of a batch, measured by `length_function`
+            max_batch_size: Maximum number of texts in a batch
+            length_function: Measures a text, in tokens or characters
+            max_retries: Retries of a failed batch before its rows are marked failed
+            initial_backoff: Upper bound in seconds of the first retry delay
+            max_backoff: Upper bound in seconds of any retry delay
+            retry_on: Errors worth retrying, e.g. quota errors. Other errors
+                mark the batch failed right away.
+            sleep: Waits between retries, replaceable in tests
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be positive, got {max_concurrency}")
+        self._client = client
+        self._max_concurrency = max_concurrency
+        self._max_batch_tokens = max_batch_tokens
+        self._max_batch_size = max_batch_size
+        self._length_function = length_function
+        self._max_retries = max_retries
+        self._initial_backoff = initial_backoff
+        self._max_backoff = max_backoff
+        self._retry_on = retry_on
+        self._sleep = sleep
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: spread retries of concurrent batches over the whole window
+        ceiling = min(self._max_backoff, self._initial_backoff * 2**attempt)
+        return random.uniform(0, ceiling)
+
+    def _run_batch(self, batch: list[str]) -> _BatchResult:
+        attempt = 0
+        while True:
+            try:
+                vectors = self._client.embed(batch)
+                if len(vectors) != len(batch):
+                    raise ValueError(
+                        f"Expected {len(batch)} embeddings, got {len(vectors)}"
+                    )
+                return _BatchResult(vectors, "", attempt)
+            except Exception as e:
+                if not isinstance(e, self._retry_on) or attempt >= self._max_retries:
+                    logging.warning(
+                        f"Embedding batch of {len(batch)} texts failed "
+                        f"after {attempt + 1} attempts: {e!r}"
+                    )
+                    return _BatchResult(None, f"{type(e).__name__}: {e}", attempt)
+                self._sleep(self._backoff(attempt))
+                attempt += 1
+
+    def embed(self, texts: Sequence[str]) -> EmbeddingRun:
+        """Embed `texts`, returning embeddings and statuses in input order."""
+        batches = pack_batches(
+            texts,
+            max_batch_tokens=self._max_batch_tokens,
+            max_batch_size=self._max_batch_size,
+            length_function=self._length_function,
+        )
+        run = EmbeddingRun(
+            embeddings=[[] for _ in texts],
+            statuses=["" for _ in texts],
+            batches=len(batches),
+        )
+        with ThreadPoolExecutor(max_workers=self._max_concurrency) as executor:
+            futures = [
+                executor.submit(self._run_batch, [texts[i] for i in indices])
+                for indices in batches
+            ]
+            for indices, future in zip(batches, futures, strict=True):
+                result = future.result()
+                run.retries += result.retries
+                if result.vectors is None:
+                    run.failed_batches += 1
+                    for index in indices:
+                        run.statuses[index] = result.status
+                else:
+                    for index, vector in zip(indices, result.vectors, strict=True):
+                        run.embeddings[index] = vector
+        return run
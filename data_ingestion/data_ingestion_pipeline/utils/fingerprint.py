@@ -0,0 +1,55 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Content fingerprints used to detect questions whose text did not change."""
+
+import hashlib
+
+
+def content_fingerprint(text: str, salt: str = "") -> str:
+    """Return a hex SHA-256 fingerprint of `text`.
+
+    Args:
+        text: Content to fingerprint, e.g. a question's full markdown
+        salt: Processing settings the derived data depends on (chunking
+            parameters, embedding model). Changing them changes every
+            fingerprint, so stale chunks are never reused.
+
+    Returns:
+        64 character hex digest
+    """
+    digest = hashlib.sha256(salt.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def fingerprint_salt(
+    chunk_size: int,
+    chunk_overlap: int,
+    embedding_model: str,
+    chunking_strategy: str = "recursive",
+    chunk_length_unit: str = "characters",
+) -> str:
+    """Return the salt of the content fingerprints for these processing settings.
+
+    Settings left at their original defaults are not part of the salt, so
+    adding a setting does not invalidate the fingerprints already stored.
+    """
+    salt = f"{chunk_size}:{chunk_overlap}:{embedding_model}"
+    if chunking_strategy != "recursive":
+        salt += f":{chunking_strategy}"
+    if chunk_length_unit != "characters":
+        salt += f":{chunk_length_unit}"
+    return salt
@@ -0,0 +1,269 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Concurrent ImportDocuments operations over the shards of an export.
+
+`ShardedImporter` submits one import operation per group of shards, keeps at
+most `max_concurrency` of them running, logs the documents imported so far
+from the operations' metadata and resubmits only the groups whose operation
+failed or reported failed documents, after a backoff that doubles with each
+attempt. `expand_wildcard` lists the files behind the wildcard URI of a plain
+BigQuery extract, so they can be split across requests like shards.
+"""
+
+import fnmatch
+import logging
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass, field
+from typing import Any, Protocol
+
+# Error samples kept per group
+MAX_ERROR_SAMPLES = 5
+
+
+class ImportOperation(Protocol):
+    """What the importer needs of a `google.api_core.operation.Operation`."""
+
+    @property
+    def metadata(self) -> Any: ...
+
+    def done(self) -> bool: ...
+
+    def exception(self) -> BaseException | None: ...
+
+    def result(self) -> Any: ...
+
+
+@dataclass
+class ImportGroup:
+    """Shards imported by one operation, and the outcome of its last attempt."""
+
+    uris: list[str]
+    attempts: int = 0
+    success_count: int = 0
+    failure_count: int = 0
+    error: str = ""
+    error_samples: list[str] = field(default_factory=list)
+    succeeded: bool = False
+
+
+@dataclass
+class ImportReport:
+    """Outcome of every group of a `ShardedImporter.run`."""
+
+    groups: list[ImportGroup]
+
+    @property
+    def failed(self) -> list[ImportGroup]:
+        return [group for group in self.groups if not group.succeeded]
+
+    @property
+    def success_count(self) -> int:
+        return sum(group.success_count for group in self.groups)
+
+    def __str__(self) -> str:
+        return (
+            f"{len(self.groups) - len(self.failed)} of {len(self.groups)} import "
+            f"requests succeeded, {self.success_count} documents imported, "
+            f"{sum(group.attempts for group in self.groups)} attempts"
+        )
+
+
+def _metadata_counts(operation: ImportOperation) -> tuple[int, int, int]:
+    """Return the success, failure and total counts of the operation so far."""
+    metadata = operation.metadata
+    if metadata is None:
+        return 0, 0, 0
+    return (
+        int(getattr(metadata, "success_count", 0)),
+        int(getattr(metadata, "failure_count", 0)),
+        int(getattr(metadata, "total_count", 0)),
+    )
+
+
+def expand_wildcard(
+    uri: str, list_names: Callable[[str, str], Iterable[str]]
+) -> list[str]:
+    """Return the URIs of the objects matching `gs://bucket/prefix*suffix`.
+
+    Args:
+        uri: URI with at most one `*`, as written by a BigQuery extract
+        list_names: Lists the object names of a bucket under a prefix
+
+    Returns:
+        The sorted URIs of the matching objects, or `[uri]` if it has no
+        wildcard or matches nothing
+    """
+    bucket_name, _, pattern = uri.removeprefix("gs://").partition("/")
+    if "*" not in pattern:
+        return [uri]
+    prefix = pattern.split("*", 1)[0]
+    names = sorted(
+        name
+        for name in list_names(bucket_name, prefix)
+        if fnmatch.fnmatchcase(name, pattern)
+    )
+    return [f"gs://{bucket_name}/{name}" for name in names] or [uri]
+
+
+class ShardedImporter:
+    """Runs import operations over groups of shards with bounded concurrency."""
+
+    def __init__(
+        self,
+        submit: Callable[[list[str]], ImportOperation],
+        max_concurrency: int = 4,
+        shards_per_request: int = 1,
+        max_attempts: int = 3,
+        poll_interval: float = 10.0,
+        initial_backoff: float = 30.0,
+        max_backoff: float = 600.0,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Create an importer.
+
+        Args:
+            submit: Starts an import of the given URIs and returns its operation
+            max_concurrency: Maximum number of operations running at once
+            shards_per_request: Shards imported by one operation
+            max_attempts: Attempts per group before giving up on it
+            poll_interval: Seconds between checks of the running operations
+            initial_backoff: Seconds before a failed group is resubmitted the
+                first time, doubled before each following attempt
+            max_backoff: Maximum seconds before a failed group is resubmitted
+            sleep: Sleep function, replaced in tests
+            clock: Monotonic clock, replaced in tests
+        """
+        if max_concurrency < 1 or shards_per_request < 1 or max_attempts < 1:
+            raise ValueError(
+                "max_concurrency, shards_per_request and max_attempts must be positive"
+            )
+        self._submit = submit
+        self._max_concurrency = max_concurrency
+        self._shards_per_request = shards_per_request
+        self._max_attempts = max_attempts
+        self._poll_interval = poll_interval
+        self._initial_backoff = initial_backoff
+        self._max_backoff = max_backoff
+        self._sleep = sleep
+        self._clock = clock
+
+    def _retry_delay(self, attempts: int) -> float:
+        """Seconds to wait before resubmitting a group after `attempts` attempts."""
+        return min(self._max_backoff, self._initial_backoff * 2 ** (attempts - 1))
+
+    def _finish(self, group: ImportGroup, operation: ImportOperation) -> None:
+        """Record the outcome of a finished operation on its group."""
+        group.success_count, group.failure_count, _ = _metadata_counts(operation)
+        error = operation.exception()
+        if error is not None:
+            group.error = f"{type(error).__name__}: {error}"
+            group.error_samples = []
+            return
+
+        response = operation.result()
+        group.error_samples = [
+            sample.message
+            for sample in list(getattr(response, "error_samples", []))[
+                :MAX_ERROR_SAMPLES
+            ]
+        ]
+        if group.failure_count or group.error_samples:
+            group.error = f"{group.failure_count} documents failed to import"
+        else:
+            group.error = ""
+            group.succeeded = True
+
+    def run(self, uris: Sequence[str]) -> ImportReport:
+        """Import every URI, resubmitting failed groups up to `max_attempts` times."""
+        groups = [
+            ImportGroup(uris=list(uris[start : start + self._shards_per_request]))
+            for start in range(0, len(uris), self._shards_per_request)
+        ]
+        queue = deque(groups)
+        # Failed groups and the time from which they may be resubmitted
+        waiting: list[tuple[float, ImportGroup]] = []
+        running: list[tuple[ImportGroup, ImportOperation]] = []
+
+        def retry(group: ImportGroup) -> None:
+            if group.attempts < self._max_attempts:
+                delay = self._retry_delay(group.attempts)
+                logging.info(f"Resubmitting the import of {group.uris} in {delay:.0f}s")
+                waiting.append((self._clock() + delay, group))
+
+        while queue or waiting or running:
+            now = self._clock()
+            queue.extend(group for ready_at, group in waiting if ready_at <= now)
+            waiting = [
+                (ready_at, group) for ready_at, group in waiting if ready_at > now
+            ]
+
+            while queue and len(running) < self._max_concurrency:
+                group = queue.popleft()
+                group.attempts += 1
+                try:
+                    running.append((group, self._submit(group.uris)))
+                except Exception as e:
+                    group.error = f"{type(e).__name__}: {e}"
+                    logging.warning(
+                        f"Import of {group.uris} could not be submitted "
+                        f"(attempt {group.attempts}): {group.error}"
+                    )
+                    retry(group)
+
+            still_running = []
+            for group, operation in running:
+                if not operation.done():
+                    still_running.append((group, operation))
+                    continue
+                self._finish(group, operation)
+                if not group.succeeded:
+                    logging.warning(
+                        f"Import of {group.uris} failed (attempt {group.attempts}): "
+                        f"{group.error} {group.error_samples}"
+                    )
+                    retry(group)
+            running = still_running
+
+            self._log_progress(groups, running)
+            if running:
+                self._sleep(self._poll_interval)
+            elif waiting and not queue:
+                # Nothing to poll, wait for the next group's backoff to end
+                next_ready = min(ready_at for ready_at, _ in waiting)
+                self._sleep(max(0.0, next_ready - self._clock()))
+        return ImportReport(groups)
+
+    def _log_progress(
+        self,
+        groups: list[ImportGroup],
+        running: list[tuple[ImportGroup, ImportOperation]],
+    ) -> None:
+        finished = [group for group in groups if group.succeeded]
+        imported = sum(group.success_count for group in finished)
+        failed = 0
+        total = 0
+        for _, operation in running:
+            success, failure, operation_total = _metadata_counts(operation)
+            imported += success
+            failed += failure
+            total += operation_total
+        logging.info(
+            f"Import progress: {len(finished)} of {len(groups)} requests done, "
+            f"{len(running)} running, {imported} documents imported "
+            f"({failed} failed in running requests, {total} in their files)"
+        )
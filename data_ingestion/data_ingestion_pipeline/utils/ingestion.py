@@ -0,0 +1,342 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""The ingestion steps of the processing components over pluggable backends.
+
+`run_ingestion` converts questions to markdown, skips unchanged questions,
+chunks and embeds the rest, merges them into a sink and exports the documents,
+using the same helpers as the components. Sources, sinks and embedding clients
+are pluggable, so the whole flow runs locally without a GCP project.
+"""
+
+import logging
+import os
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+from data_ingestion_pipeline.utils.chunking import iter_chunks
+from data_ingestion_pipeline.utils.embedding_cache import (
+    CacheStats,
+    SQLiteEmbeddingCache,
+    text_hash,
+)
+from data_ingestion_pipeline.utils.embedding_scheduler import EmbeddingScheduler
+from data_ingestion_pipeline.utils.fingerprint import (
+    content_fingerprint,
+    fingerprint_salt,
+)
+from data_ingestion_pipeline.utils.instrumentation import StageRecorder
+from data_ingestion_pipeline.utils.markdown import convert_questions
+from data_ingestion_pipeline.utils.near_duplicates import (
+    NearDuplicateFilter,
+    NearDuplicateStats,
+)
+from data_ingestion_pipeline.utils.sinks import ChunkSink, ExportResult
+from data_ingestion_pipeline.utils.sources import QuestionSource
+from data_ingestion_pipeline.utils.text_splitter import make_text_splitter
+
+
+@dataclass
+class IngestionStats:
+    """Counts and stage timings of one `run_ingestion` call."""
+
+    questions: int = 0
+    unchanged_questions: int = 0
+    chunks: int = 0
+    embedded_chunks: int = 0
+    failed_chunks: int = 0
+    deleted_chunks: int = 0
+    cache: CacheStats = field(default_factory=CacheStats)
+    near_duplicates: NearDuplicateStats = field(default_factory=NearDuplicateStats)
+    stages: StageRecorder = field(default_factory=StageRecorder)
+    export: ExportResult | None = None
+
+    def __str__(self) -> str:
+        return (
+            f"{self.questions} questions ({self.unchanged_questions} unchanged), "
+            f"{self.chunks} chunks, {self.embedded_chunks} embedded "
+            f"({self.failed_chunks} failed), {self.deleted_chunks} deleted. "
+            f"Embedding cache: {self.cache}. Near-duplicates: {self.near_duplicates}. "
+            f"Stages: {self.stages}"
+        )
+
+
+def _to_string(value: Any) -> str | None:
+    if value is None or isinstance(value, str):
+        return value
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+def _latest_per_question(records: Sequence[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Keep the most recently edited record of each question."""
+
+    def edit_order(record: dict[str, Any]) -> tuple[bool, Any]:
+        # Records never edited sort first
+        return record["last_edit_date"] is not None, record["last_edit_date"]
+
+    latest: dict[int, dict[str, Any]] = {}
+    for record in records:
+        current = latest.get(record["question_id"])
+        if current is None or edit_order(record) > edit_order(current):
+            latest[record["question_id"]] = record
+    return list(latest.values())
+
+
+def _embed(
+    texts: Sequence[str],
+    scheduler: EmbeddingScheduler,
+    cache: SQLiteEmbeddingCache | None,
+    model_name: str,
+    stats: IngestionStats,
+) -> list[tuple[list[float], str]]:
+    """Embed texts, sending only unique cache misses to the model."""
+    hashes = [text_hash(text) for text in texts]
+    cached = cache.get_many(model_name, hashes) if cache else {}
+    results: dict[str, tuple[list[float], str]] = {
+        key: (vector, "") for key, vector in cached.items()
+    }
+    missing = {
+        key: text for key, text in zip(hashes, texts, strict=True) if key not in results
+    }
+    if missing:
+        run = scheduler.embed(list(missing.values()))
+        results.update(
+            zip(missing, zip(run.embeddings, run.statuses, strict=True), strict=True)
+        )
+        stats.embedded_chunks += len(missing)
+        stats.failed_chunks += run.failed_rows
+        if cache:
+            cache.put_many(
+                model_name,
+                {
+                    key: vector
+                    for key, (vector, status) in results.items()
+                    if key in missing and not status
+                },
+            )
+
+    misses = sum(1 for key in hashes if key in missing)
+    stats.cache.hits += len(hashes) - misses
+    stats.cache.misses += misses
+    return [results[key] for key in hashes]
+
+
+def run_ingestion(
+    source: QuestionSource,
+    sink: ChunkSink,
+    scheduler: EmbeddingScheduler,
+    model_name: str,
+    chunk_size: int = 1500,
+    chunk_overlap: int = 20,
+    chunking_strategy: str = "recursive",
+    chunk_length_unit: str = "characters",
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+    batch_size: int = 10_000,
+    markdown_workers: int = 0,
+    reuse_unchanged: bool = True,
+    cache: SQLiteEmbeddingCache | None = None,
+    full_export: bool = False,
+    normalized_export: bool = False,
+    near_duplicate_threshold: float = 0.0,
+    near_duplicate_action: str = "collapse",
+    recorder: StageRecorder | None = None,
+) -> IngestionStats:
+    """Ingest the questions of `source` into `sink` and export the documents.
+
+    Questions are processed `batch_size` at a time. Within a batch the most
+    recently edited record of a question wins; across batches the later batch
+    wins.
+
+    Args:
+        source: Source of question records
+        sink: Sink holding the chunks of previous runs
+        scheduler: Sends chunks to the embedding client
+        model_name: Embedding model, part of the fingerprint and cache key
+        chunk_size: Size of text chunks
+        chunk_overlap: Overlap between chunks
+        chunking_strategy: "recursive" to split on paragraphs, lines and
+            words, "sections" to split on the question and answer headings
+            first
+        chunk_length_unit: Unit of chunk_size and chunk_overlap,
+            "characters" or approximate "tokens"
+        start_date: Only ingest questions created at or after this date
+        end_date: Only ingest questions created at or before this date
+        batch_size: Number of questions held in memory at once
+        markdown_workers: Processes used for HTML to markdown conversion (0 uses all cores)
+        reuse_unchanged: Reuse the stored chunks and embeddings of questions
+            whose content fingerprint did not change
+        cache: Embedding cache keyed by model and chunk text hash
+        full_export: Export every stored chunk, even when the sink had state
+        normalized_export: Export the question text once per question
+            instead of in every chunk document
+        near_duplicate_threshold: Estimated Jaccard similarity from which a
+            chunk is a near-duplicate of an earlier chunk of its batch (0
+            disables the detection)
+        near_duplicate_action: "collapse" to give near-duplicates the
+            embedding of their canonical chunk, "drop" to leave them out
+        recorder: Records the metrics of each stage, a new one by default
+
+    Returns:
+        The run's counts and stage timings
+    """
+    text_splitter = make_text_splitter(
+        chunking_strategy, chunk_size, chunk_overlap, chunk_length_unit
+    )
+    near_duplicate_filter = NearDuplicateFilter(
+        near_duplicate_threshold, near_duplicate_action
+    )
+    salt = fingerprint_salt(
+        chunk_size, chunk_overlap, model_name, chunking_strategy, chunk_length_unit
+    )
+    stats = IngestionStats(
+        near_duplicates=near_duplicate_filter.stats,
+        stages=recorder or StageRecorder(run_name="run_ingestion"),
+    )
+    stage = stats.stages.stage
+    full_export = full_export or sink.is_empty()
+    creation_timestamp = datetime.now().isoformat()
+
+    batches = source.iter_batches(start_date, end_date, batch_size=batch_size)
+    while True:
+        with stage("fetch") as metrics:
+            batch = next(batches, None)
+            if batch is not None:
+                records = _latest_per_question(batch)
+                metrics.rows_out = len(records)
+        if batch is None:
+            break
+        stats.questions += len(records)
+
+        with stage("markdown") as metrics:
+            metrics.rows_in = len(records)
+            documents = dict(
+                zip(
+                    [record["question_id"] for record in records],
+                    convert_questions(
+                        [record["question_title"] for record in records],
+                        [record["question_text"] for record in records],
+                        [record["answers"] for record in records],
+                        max_workers=markdown_workers,
+                    ),
+                    strict=True,
+                )
+            )
+            content_hashes = {
+                question_id: content_fingerprint(text, salt=salt)
+                for question_id, text in documents.items()
+            }
+            metrics.rows_out = len(documents)
+
+        with stage("fingerprint") as metrics:
+            metrics.rows_in = len(documents)
+            previous = sink.fingerprints(list(documents)) if reuse_unchanged else {}
+            unchanged = [
+                question_id
+                for question_id, content_hash in content_hashes.items()
+                if previous.get(question_id) == content_hash
+            ]
+            stats.unchanged_questions += len(unchanged)
+            metrics.rows_out = len(documents) - len(unchanged)
+
+        with stage("chunk") as metrics:
+            metrics.rows_in = len(documents) - len(unchanged)
+            unchanged_set = set(unchanged)
+            chunk_records = list(
+                iter_chunks(
+                    (
+                        (question_id, text)
+                        for question_id, text in documents.items()
+                        if question_id not in unchanged_set
+                    ),
+                    text_splitter.split_text,
+                )
+            )
+            stats.chunks += len(chunk_records)
+            metrics.chunks = metrics.rows_out = len(chunk_records)
+
+        with stage("near_duplicates") as metrics:
+            metrics.rows_in = len(chunk_records)
+            texts = [record.text_chunk for record in chunk_records]
+            kept = near_duplicate_filter.apply(texts)
+            chunk_records = [chunk_records[i] for i, _ in kept]
+            canonical = [j for _, j in kept]
+            canonical_positions = {
+                i: position for position, i in enumerate(sorted(set(canonical)))
+            }
+            metrics.rows_out = len(canonical_positions)
+
+        with stage("embed") as metrics:
+            metrics.rows_in = len(canonical_positions)
+            canonical_embeddings = _embed(
+                [texts[i] for i in canonical_positions],
+                scheduler,
+                cache,
+                model_name,
+                stats,
+            )
+            # Near-duplicates get the embedding of their canonical chunk
+            embeddings = [
+                canonical_embeddings[canonical_positions[i]] for i in canonical
+            ]
+            metrics.rows_out = len(embeddings)
+
+        with stage("store") as metrics:
+            chunks = [
+                {
+                    "chunk_id": record.chunk_id,
+                    "question_id": record.question_id,
+                    "text_chunk": record.text_chunk,
+                    "embedding": embedding,
+                    "embedding_status": status,
+                }
+                for record, (embedding, status) in zip(
+                    chunk_records, embeddings, strict=True
+                )
+            ]
+            # Unchanged questions carry over their chunks with updated metadata
+            chunks.extend(sink.chunks(unchanged))
+            metadata = {
+                record["question_id"]: {
+                    "last_edit_date": _to_string(record["last_edit_date"]),
+                    "question_text": record["question_text"],
+                    "full_text_md": documents[record["question_id"]],
+                    "content_hash": content_hashes[record["question_id"]],
+                    "creation_timestamp": creation_timestamp,
+                }
+                for record in records
+            }
+            rows = [chunk | metadata[chunk["question_id"]] for chunk in chunks]
+            metrics.rows_in = len(rows)
+            stats.deleted_chunks += len(sink.merge(rows))
+            metrics.rows_out = len(rows)
+
+        logging.info(f"Ingested {stats.questions} questions...")
+
+    with stage("export") as metrics:
+        stats.export = sink.export(full=full_export, normalized=normalized_export)
+        paths = [
+            stats.export.documents_path,
+            stats.export.deleted_chunks_path,
+            stats.export.questions_path,
+        ]
+        metrics.rows_out = (
+            stats.export.num_documents
+            + stats.export.num_deleted
+            + stats.export.num_questions
+        )
+        metrics.bytes_written = sum(os.path.getsize(path) for path in paths if path)
+    return stats
@@ -0,0 +1,154 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-stage timing and memory instrumentation.
+
+`StageRecorder.stage` wraps a step of the pipeline and records its wall time
+and peak RSS. The step fills in rows in/out, chunks produced and bytes written.
+Entering a stage again (e.g. once per batch) adds to its totals. Each stage is
+logged as a JSON message, and `log_to` writes the totals to a KFP
+`Metrics` artifact so stage cost can be charted across scheduled runs.
+"""
+
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Protocol
+
+
+class MetricsLogger(Protocol):
+    """What `StageRecorder.log_to` needs of `kfp.dsl.Metrics`."""
+
+    def log_metric(self, metric: str, value: float) -> None: ...
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process, or its peak where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+@dataclass
+class StageMetrics:
+    """Totals of one stage."""
+
+    stage: str
+    calls: int = 0
+    seconds: float = 0.0
+    rows_in: int = 0
+    rows_out: int = 0
+    chunks: int = 0
+    bytes_written: int = 0
+    peak_rss_bytes: int = 0
+
+
+class _RSSSampler:
+    """Samples RSS on a background thread while a stage runs."""
+
+    def __init__(self, interval: float) -> None:
+        self._interval = interval
+        self._stop = threading.Event()
+        self.peak = current_rss_bytes()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            self.peak = max(self.peak, current_rss_bytes())
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_bytes())
+
+
+class StageRecorder:
+    """Records the metrics of each stage of a run."""
+
+    def __init__(self, run_name: str = "", sample_interval: float = 0.05) -> None:
+        """Create a recorder.
+
+        Args:
+            run_name: Included in every structured log line, e.g. the component
+            sample_interval: Seconds between RSS samples while a stage runs
+        """
+        self._run_name = run_name
+        self._sample_interval = sample_interval
+        self.stages: dict[str, StageMetrics] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageMetrics]:
+        """Time a stage, yielding a `StageMetrics` for the step to add counts to.
+
+        The yielded counts only cover this call; they are added to the stage's
+        totals on exit, also when the step raises.
+        """
+        current = StageMetrics(stage=name, calls=1)
+        sampler = _RSSSampler(self._sample_interval)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            yield current
+        finally:
+            current.seconds = time.perf_counter() - start
+            sampler.stop()
+            current.peak_rss_bytes = sampler.peak
+            self._add(current)
+            self._log(current)
+
+    def _add(self, current: StageMetrics) -> None:
+        total = self.stages.setdefault(current.stage, StageMetrics(stage=current.stage))
+        total.calls += current.calls
+        total.seconds += current.seconds
+        total.rows_in += current.rows_in
+        total.rows_out += current.rows_out
+        total.chunks += current.chunks
+        total.bytes_written += current.bytes_written
+        total.peak_rss_bytes = max(total.peak_rss_bytes, current.peak_rss_bytes)
+
+    def _log(self, current: StageMetrics) -> None:
+        # One JSON message per stage, so the fields can be queried in Cloud Logging
+        record = {"message": "stage_metrics", "run": self._run_name, **asdict(current)}
+        logging.info(json.dumps(record))
+
+    def log_to(self, metrics: MetricsLogger) -> None:
+        """Write every stage's totals as `<stage>_<metric>` KFP metrics."""
+        for stage in self.stages.values():
+            metrics.log_metric(f"{stage.stage}_seconds", round(stage.seconds, 3))
+            metrics.log_metric(f"{stage.stage}_rows_in", stage.rows_in)
+            metrics.log_metric(f"{stage.stage}_rows_out", stage.rows_out)
+            metrics.log_metric(f"{stage.stage}_chunks", stage.chunks)
+            metrics.log_metric(f"{stage.stage}_bytes_written", stage.bytes_written)
+            metrics.log_metric(
+                f"{stage.stage}_peak_rss_mb", round(stage.peak_rss_bytes / 2**20, 1)
+            )
+
+    def __str__(self) -> str:
+        return ", ".join(
+            f"{stage.stage} {stage.seconds:.2f}s" for stage in self.stages.values()
+        )
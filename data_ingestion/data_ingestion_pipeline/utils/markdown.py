@@ -0,0 +1,112 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""HTML to Markdown conversion for StackOverflow questions and answers.
+
+markdownify is pure Python, so converting a large window row by row keeps a
+single core busy. `convert_in_batches` splits the input into batches and maps
+them over a process pool, returning the results in input order.
+"""
+
+import os
+from collections.abc import Callable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+def convert_html_to_markdown(html: str) -> str:
+    """Convert HTML into Markdown for easier parsing and rendering after LLM response."""
+    from markdownify import markdownify
+
+    return markdownify(html).strip()
+
+
+def create_answers_markdown(answers: Sequence[dict[str, Any]]) -> str:
+    """Convert each answer's HTML to markdown and concatenate into a single markdown text."""
+    answers_md = ""
+    for index, answer_record in enumerate(answers):
+        answers_md += (
+            f"\n\n## Answer {index + 1}:\n"  # Answer number is H2 heading size
+        )
+        answers_md += convert_html_to_markdown(answer_record["body"])
+    return answers_md
+
+
+def convert_questions(
+    titles: Sequence[str],
+    questions_html: Sequence[str],
+    answers: Sequence[Sequence[dict[str, Any]] | None],
+    max_workers: int | None = None,
+) -> list[str]:
+    """Convert each question and its answers to one markdown document.
+
+    The title is the H1 heading, followed by the question and by each answer
+    under its H2 heading. The HTML is converted in a process pool.
+    """
+    questions_md = convert_in_batches(
+        list(questions_html), convert_html_to_markdown, max_workers=max_workers
+    )
+    answers_md = convert_in_batches(
+        [
+            [] if question_answers is None else question_answers
+            for question_answers in answers
+        ],
+        create_answers_markdown,
+        max_workers=max_workers,
+    )
+    return [
+        "# " + title + "\n" + question_md + "\n" + answer_md
+        for title, question_md, answer_md in zip(
+            titles, questions_md, answers_md, strict=True
+        )
+    ]
+
+
+def _convert_batch(func: Callable[[Any], T], batch: Sequence[Any]) -> list[T]:
+    return [func(value) for value in batch]
+
+
+def convert_in_batches(
+    values: Sequence[Any],
+    func: Callable[[Any], T],
+    max_workers: int | None = None,
+    batch_size: int = 256,
+) -> list[T]:
+    """Apply `func` to every value in a process pool, preserving input order.
+
+    Args:
+        values: Values to convert, e.g. question bodies or answer lists
+        func: Picklable (module level) conversion function
+        max_workers: Number of worker processes. None or 0 uses all cores,
+            1 converts in the calling process
+        batch_size: Number of values sent to a worker per task
+
+    Returns:
+        Converted values, in the same order as `values`
+    """
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be positive, got {batch_size}")
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(values) <= batch_size:
+        return _convert_batch(func, values)
+
+    batches = [values[i : i + batch_size] for i in range(0, len(values), batch_size)]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        # Executor.map yields batch results in submission order.
+        converted = executor.map(partial(_convert_batch, func), batches)
+        return [value for batch in converted for value in batch]
@@ -0,0 +1,231 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Near-duplicate chunk detection with MinHash and LSH banding.
+
+Answers often quote the question, and duplicate questions share most of their
+text, so many chunks are near-identical without being byte-identical. Each
+chunk gets a MinHash signature over its word shingles; signatures are bucketed
+by bands so only likely near-duplicates are compared. A chunk whose estimated
+Jaccard similarity to an earlier canonical chunk reaches the threshold is
+mapped onto that chunk, which then either lends it its embedding (collapse) or
+replaces it in the index (drop).
+"""
+
+import zlib
+from collections import defaultdict
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+NEAR_DUPLICATE_ACTIONS = ("collapse", "drop")
+
+_MAX_HASH = 2**32
+
+
+def _band_layout(num_perm: int, threshold: float) -> tuple[int, int]:
+    """Return the (bands, rows) split of a signature used for LSH.
+
+    More rows per band mean fewer candidate pairs to verify. This picks the
+    most rows for which a pair exactly at `threshold` still becomes a
+    candidate with a probability of at least 95%.
+    """
+    layouts = [
+        (num_perm // rows, rows)
+        for rows in range(1, num_perm + 1)
+        if num_perm % rows == 0
+    ]
+    return max(
+        (
+            (bands, rows)
+            for bands, rows in layouts
+            if 1 - (1 - threshold**rows) ** bands >= 0.95
+        ),
+        key=lambda layout: layout[1],
+        default=layouts[0],
+    )
+
+
+@dataclass
+class NearDuplicateStats:
+    """Savings of near-duplicate detection over one run."""
+
+    chunks: int = 0
+    near_duplicates: int = 0
+    embeddings_saved: int = 0
+    index_entries_saved: int = 0
+
+    def add(self, texts: Sequence[str], canonical: Sequence[int], action: str) -> None:
+        """Count the savings of mapping `texts` onto their `canonical` indices."""
+        self.chunks += len(texts)
+        near_duplicates = [
+            i for i, j in enumerate(canonical) if i != j and texts[i] != texts[j]
+        ]
+        self.near_duplicates += len(near_duplicates)
+        # Identical texts are embedded once anyway
+        self.embeddings_saved += len(
+            {texts[i] for i in near_duplicates} - {texts[j] for j in set(canonical)}
+        )
+        if action == "drop":
+            self.index_entries_saved += sum(
+                1 for i, j in enumerate(canonical) if i != j
+            )
+
+    def __str__(self) -> str:
+        return (
+            f"{self.near_duplicates} of {self.chunks} chunks are near-duplicates, "
+            f"{self.embeddings_saved} embeddings and "
+            f"{self.index_entries_saved} index entries saved"
+        )
+
+
+class NearDuplicateDetector:
+    """Maps chunks onto earlier chunks with a similar text."""
+
+    def __init__(
+        self, threshold: float = 0.9, num_perm: int = 64, shingle_size: int = 5
+    ) -> None:
+        """Create a detector.
+
+        Args:
+            threshold: Minimum estimated Jaccard similarity of the word
+                shingles of two near-duplicate chunks, in (0, 1]
+            num_perm: Length of the MinHash signatures
+            shingle_size: Number of words per shingle
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError(f"threshold must be in (0, 1], got {threshold}")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = _band_layout(num_perm, threshold)
+
+    def _shingle_hashes(self, text: str) -> set[int]:
+        words = text.lower().split()
+        size = self.shingle_size
+        shingles = (
+            [" ".join(words[i : i + size]) for i in range(len(words) - size + 1)]
+            if len(words) > size
+            else [" ".join(words)]
+        )
+        return {zlib.crc32(shingle.encode("utf-8")) for shingle in shingles}
+
+    def signature(self, text: str) -> tuple[int, ...]:
+        """Return the MinHash signature of `text`.
+
+        Uses one-permutation hashing: each shingle hash is assigned to one of
+        `num_perm` bins by its low bits and each bin keeps its minimum. Empty
+        bins borrow the value of the next non-empty bin, offset by the
+        distance, so short texts still get comparable signatures.
+        """
+        num_perm = self.num_perm
+        bins: list[int | None] = [None] * num_perm
+        for value in self._shingle_hashes(text):
+            index = value % num_perm
+            current = bins[index]
+            if current is None or value < current:
+                bins[index] = value
+        filled = [(i, value) for i, value in enumerate(bins) if value is not None]
+        if len(filled) == num_perm:
+            return tuple(value for _, value in filled)
+
+        signature = []
+        next_filled, next_value = filled[0][0] + num_perm, filled[0][1]
+        for i in reversed(range(num_perm)):
+            current = bins[i]
+            if current is not None:
+                next_filled, next_value = i, current
+            distance = next_filled - i
+            signature.append(next_value + distance * _MAX_HASH)
+        return tuple(reversed(signature))
+
+    def similarity(self, a: tuple[int, ...], b: tuple[int, ...]) -> float:
+        """Estimated Jaccard similarity of two signatures."""
+        return sum(1 for x, y in zip(a, b, strict=True) if x == y) / self.num_perm
+
+    def canonical_indices(self, texts: Sequence[str]) -> list[int]:
+        """Return, for each text, the index of its canonical text.
+
+        The canonical text is the first earlier text it is a near-duplicate
+        (or exact duplicate) of, or the text itself. Only canonical texts are
+        indexed, so near-duplicates never chain onto each other.
+        """
+        rows = self.rows
+        first_by_text: dict[str, int] = {}
+        buckets: defaultdict[tuple[int, tuple[int, ...]], list[int]] = defaultdict(list)
+        signatures: dict[int, tuple[int, ...]] = {}
+        canonical: list[int] = []
+        for i, text in enumerate(texts):
+            if text in first_by_text:
+                canonical.append(canonical[first_by_text[text]])
+                continue
+            first_by_text[text] = i
+
+            signature = self.signature(text)
+            keys = [
+                (band, signature[band * rows : (band + 1) * rows])
+                for band in range(self.bands)
+            ]
+            candidates = {j for key in keys for j in buckets.get(key, ())}
+            best, best_similarity = i, 0.0
+            for j in sorted(candidates):
+                similarity = self.similarity(signature, signatures[j])
+                if similarity >= self.threshold and similarity > best_similarity:
+                    best, best_similarity = j, similarity
+            canonical.append(best)
+            if best == i:
+                signatures[i] = signature
+                for key in keys:
+                    buckets[key].append(i)
+        return canonical
+
+
+class NearDuplicateFilter:
+    """Applies near-duplicate detection and its action to batches of chunks."""
+
+    def __init__(self, threshold: float = 0.0, action: str = "collapse") -> None:
+        """Create a filter.
+
+        Args:
+            threshold: Estimated Jaccard similarity from which a chunk is a
+                near-duplicate of an earlier chunk of its batch (0 disables
+                the detection)
+            action: "collapse" to give near-duplicates the embedding of their
+                canonical chunk, "drop" to leave them out
+        """
+        if action not in NEAR_DUPLICATE_ACTIONS:
+            raise ValueError(
+                f"near_duplicate_action must be one of {NEAR_DUPLICATE_ACTIONS}, "
+                f"got {action!r}"
+            )
+        self.action = action
+        self.detector = NearDuplicateDetector(threshold) if threshold > 0 else None
+        self.stats = NearDuplicateStats()
+
+    def apply(self, texts: Sequence[str]) -> list[tuple[int, int]]:
+        """Return the `(index, canonical index)` of each text to keep, in order.
+
+        A text is its own canonical text unless it is a near-duplicate. Dropped
+        near-duplicates are left out.
+        """
+        canonical = (
+            self.detector.canonical_indices(texts)
+            if self.detector
+            else list(range(len(texts)))
+        )
+        self.stats.add(texts, canonical, self.action)
+        return [
+            (i, j)
+            for i, j in enumerate(canonical)
+            if i == j or self.action == "collapse"
+        ]
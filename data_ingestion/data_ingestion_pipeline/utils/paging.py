@@ -0,0 +1,70 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Out-of-core processing of BigQuery rows, one page at a time.
+
+With a `page_size` set, the processing components stream their input from
+BigQuery in pages of rows, process each page and append its results to a
+staging table before reading the next one. Memory use is then bounded by the
+page size instead of the size of the processing window.
+"""
+
+from collections.abc import Callable, Iterable, Sized
+from dataclasses import dataclass
+from typing import TypeVar
+
+PageIn = TypeVar("PageIn", bound=Sized)
+PageOut = TypeVar("PageOut", bound=Sized)
+
+
+@dataclass
+class PageStats:
+    """Pages and rows processed by `process_pages`."""
+
+    pages: int = 0
+    rows_in: int = 0
+    rows_out: int = 0
+    max_page_rows: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.rows_in} rows in, {self.rows_out} rows out in {self.pages} "
+            f"pages of at most {self.max_page_rows} rows"
+        )
+
+
+def process_pages(
+    pages: Iterable[PageIn],
+    transform: Callable[[PageIn], PageOut],
+    write: Callable[[PageOut], None],
+) -> PageStats:
+    """Transform and write each page before reading the next one.
+
+    Args:
+        pages: Pages of input rows, e.g. from `to_pandas_batches`
+        transform: Computes the output rows of a page
+        write: Appends the output rows of a page, e.g. to a BigQuery table
+
+    Returns:
+        The pages and rows processed
+    """
+    stats = PageStats()
+    for page in pages:
+        result = transform(page)
+        write(result)
+        stats.pages += 1
+        stats.rows_in += len(page)
+        stats.rows_out += len(result)
+        stats.max_page_rows = max(stats.max_page_rows, len(page))
+    return stats
@@ -0,0 +1,90 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Processing window of a run and its split into date partitions.
+
+A backfill over a long window can be split into partitions of a few days,
+each fetched, chunked and embedded by its own tasks, before one task stores
+the chunks of every partition in the incremental and deduplicated tables.
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+
+
+def processing_window(
+    schedule_time: str, look_back_days: int, now: datetime | None = None
+) -> tuple[datetime, datetime]:
+    """Return the start and end of the window processed by a run.
+
+    Both ends are inclusive days. An unset schedule time (the Unix epoch, for
+    runs that were not scheduled) stands for now.
+
+    Args:
+        schedule_time: ISO 8601 schedule time of the pipeline job
+        look_back_days: Number of days to look back from the schedule time
+        now: Current time, replaced in tests
+    """
+    schedule_time_dt = datetime.fromisoformat(schedule_time.replace("Z", "+00:00"))
+    if schedule_time_dt.year == 1970:
+        logging.warning(
+            "Pipeline schedule not set. Setting schedule_time to current date."
+        )
+        schedule_time_dt = now or datetime.now()
+
+    # Note: The following line sets the schedule time 5 years back to allow sample data to be present.
+    # For your use case, please comment out the following line to use the actual schedule time.
+    schedule_time_dt = schedule_time_dt - timedelta(days=5 * 365)
+
+    return schedule_time_dt - timedelta(days=look_back_days), schedule_time_dt
+
+
+def date_partitions(
+    start: date, end: date, partition_days: int
+) -> list[tuple[date, date]]:
+    """Split the days from `start` to `end`, both inclusive, into partitions.
+
+    Partitions are inclusive, do not overlap and hold `partition_days` days,
+    except the last one which may be shorter.
+    """
+    if partition_days < 1:
+        raise ValueError(f"partition_days must be positive, got {partition_days}")
+    partitions = []
+    while start <= end:
+        partition_end = min(start + timedelta(days=partition_days - 1), end)
+        partitions.append((start, partition_end))
+        start = partition_end + timedelta(days=1)
+    return partitions
+
+
+def plan_partitions(
+    start: date, end: date, partition_days: int = 0
+) -> list[dict[str, str]]:
+    """Return the first and last day of each partition of a window.
+
+    Args:
+        start: First day of the window
+        end: Last day of the window
+        partition_days: Days per partition, 0 for a single partition
+    """
+    partition_days = partition_days or (end - start).days + 1
+    return [
+        {
+            "window_start": partition_start.isoformat(),
+            "window_end": partition_end.isoformat(),
+        }
+        for partition_start, partition_end in date_partitions(
+            start, end, partition_days
+        )
+    ]
@@ -0,0 +1,139 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Readiness probe for documents imported into Vertex AI Search.
+
+Instead of sleeping for a fixed time after an import, `wait_until_visible`
+polls a sample of the imported document ids with exponential backoff until
+they can all be looked up or a deadline passes, and reports how long that took.
+"""
+
+import logging
+import time
+from collections.abc import Callable, Sequence
+from typing import Any, NamedTuple, Protocol
+
+
+class DocumentLookup(Protocol):
+    """Tells whether a document can be looked up yet."""
+
+    def is_visible(self, document_id: str) -> bool: ...
+
+
+class DiscoveryEngineDocumentLookup:
+    """Looks documents up with a `discoveryengine.DocumentServiceClient`."""
+
+    def __init__(
+        self,
+        client: Any,
+        project_id: str,
+        location: str,
+        data_store_id: str,
+        not_found: type[Exception] | tuple[type[Exception], ...] = (),
+    ) -> None:
+        """Create a lookup.
+
+        Args:
+            client: Document service client, or a stand-in with the same
+                `document_path` and `get_document` methods
+            project_id: Google Cloud project ID
+            location: Google Cloud location
+            data_store_id: Datastore the documents were imported into
+            not_found: Exceptions meaning the document is not visible yet,
+                `google.api_core.exceptions.NotFound` by default
+        """
+        if not not_found:
+            import google.api_core.exceptions
+
+            not_found = google.api_core.exceptions.NotFound
+        self._client = client
+        self._project_id = project_id
+        self._location = location
+        self._data_store_id = data_store_id
+        self._not_found = not_found
+
+    def is_visible(self, document_id: str) -> bool:
+        name = self._client.document_path(
+            project=self._project_id,
+            location=self._location,
+            data_store=self._data_store_id,
+            branch="default_branch",
+            document=document_id,
+        )
+        try:
+            self._client.get_document(name=name)
+        except self._not_found:
+            return False
+        return True
+
+
+class ReadinessResult(NamedTuple):
+    """Outcome of `wait_until_visible`."""
+
+    ready: bool
+    seconds: float
+    polls: int
+    missing: list[str]
+
+
+def wait_until_visible(
+    document_ids: Sequence[str],
+    lookup: DocumentLookup,
+    timeout: float = 900.0,
+    initial_delay: float = 2.0,
+    max_delay: float = 60.0,
+    sleep: Callable[[float], None] = time.sleep,
+    clock: Callable[[], float] = time.monotonic,
+) -> ReadinessResult:
+    """Poll until every document can be looked up or `timeout` passes.
+
+    Each poll only looks up the documents not seen yet. The delay between
+    polls doubles from `initial_delay` up to `max_delay` and never runs past
+    the deadline.
+
+    Args:
+        document_ids: Sample of newly imported document ids
+        lookup: Tells whether a document is visible
+        timeout: Seconds after which to give up
+        initial_delay: Seconds before the second poll
+        max_delay: Maximum seconds between polls
+        sleep: Sleep function, replaced in tests
+        clock: Monotonic clock, replaced in tests
+
+    Returns:
+        Whether all documents became visible, the seconds it took, the number
+        of polls and the ids still missing
+    """
+    start = clock()
+    deadline = start + timeout
+    missing = list(document_ids)
+    delay = initial_delay
+    polls = 0
+    while True:
+        polls += 1
+        missing = [
+            document_id for document_id in missing if not lookup.is_visible(document_id)
+        ]
+        elapsed = clock() - start
+        if not missing:
+            return ReadinessResult(True, elapsed, polls, [])
+        remaining = deadline - clock()
+        if remaining <= 0:
+            return ReadinessResult(False, elapsed, polls, missing)
+        logging.info(
+            f"{len(missing)} of {len(document_ids)} documents not visible after "
+            f"{elapsed:.0f}s, polling again in {min(delay, remaining):.0f}s..."
+        )
+        sleep(min(delay, remaining))
+        delay = min(delay * 2, max_delay)
@@ -0,0 +1,152 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Lazy rehydration of parent question text for normalized exports.
+
+With the normalized export layout, chunk documents only carry their
+`question_id`. The pipeline's questions stay in the deduplicated table
+(`bigquery_question_fetcher`); `run_local.py` exports them once per question
+to `questions.jsonl` (`JSONLQuestionIndex`). `ParentTextStore` looks up the
+questions of retrieved chunks only when their text is needed, through a
+pluggable fetch function, and keeps recently used questions in memory.
+"""
+
+import json
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Sequence
+from typing import Any
+
+# Fetches the records of the given question ids, skipping unknown ones
+QuestionFetcher = Callable[[Sequence[int]], dict[int, dict[str, Any]]]
+
+PARENT_FIELDS = ("question_text", "full_text_md")
+
+
+class JSONLQuestionIndex:
+    """Reads question records from normalized-export JSONL files on demand.
+
+    Opening the index scans the files once for the byte offset of each
+    question; records are only parsed when fetched.
+    """
+
+    def __init__(self, paths: Iterable[str]) -> None:
+        self._offsets: dict[int, tuple[str, int]] = {}
+        for path in paths:
+            with open(path, "rb") as f:
+                offset = 0
+                for line in f:
+                    if line.strip():
+                        question_id = json.loads(line)["question_id"]
+                        # Later files hold later versions of a question
+                        self._offsets[int(question_id)] = (path, offset)
+                    offset += len(line)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __call__(self, question_ids: Sequence[int]) -> dict[int, dict[str, Any]]:
+        found: dict[int, dict[str, Any]] = {}
+        for question_id in question_ids:
+            location = self._offsets.get(int(question_id))
+            if location is None:
+                continue
+            path, offset = location
+            with open(path, "rb") as f:
+                f.seek(offset)
+                found[question_id] = json.loads(f.readline())
+        return found
+
+
+def bigquery_question_fetcher(client: Any, table_ref: str) -> QuestionFetcher:
+    """Fetch question records from the deduplicated table of `store_chunks`.
+
+    Args:
+        client: A `google.cloud.bigquery.Client`
+        table_ref: `project.dataset.table` of the deduplicated table
+    """
+    from google.cloud import bigquery
+
+    def fetch(question_ids: Sequence[int]) -> dict[int, dict[str, Any]]:
+        job = client.query(
+            f"""
+            SELECT
+                question_id,
+                ANY_VALUE(question_text) AS question_text,
+                ANY_VALUE(full_text_md) AS full_text_md
+            FROM `{table_ref}`
+            WHERE question_id IN UNNEST(@question_ids)
+            GROUP BY question_id
+            """,
+            job_config=bigquery.QueryJobConfig(
+                query_parameters=[
+                    bigquery.ArrayQueryParameter(
+                        "question_ids", "INT64", list(question_ids)
+                    )
+                ]
+            ),
+        )
+        return {row["question_id"]: dict(row.items()) for row in job.result()}
+
+    return fetch
+
+
+class ParentTextStore:
+    """Looks up the parent question of chunks on demand, caching recent ones."""
+
+    def __init__(self, fetch: QuestionFetcher, cache_size: int = 10_000) -> None:
+        """Create a store.
+
+        Args:
+            fetch: Fetches question records by id, e.g. a `JSONLQuestionIndex`
+            cache_size: Number of questions kept in memory
+        """
+        self._fetch = fetch
+        self._cache_size = cache_size
+        self._cache: OrderedDict[int, dict[str, Any]] = OrderedDict()
+        self.fetched = 0
+
+    def get_many(self, question_ids: Iterable[int]) -> dict[int, dict[str, Any]]:
+        """Return the records of the questions, fetching only uncached ones."""
+        question_ids = list(dict.fromkeys(question_ids))
+        missing = [
+            question_id
+            for question_id in question_ids
+            if question_id not in self._cache
+        ]
+        if missing:
+            fetched = self._fetch(missing)
+            self.fetched += len(fetched)
+            self._cache.update(fetched)
+
+        found = {}
+        for question_id in question_ids:
+            if question_id in self._cache:
+                self._cache.move_to_end(question_id)
+                found[question_id] = self._cache[question_id]
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return found
+
+    def rehydrate(
+        self,
+        chunks: Sequence[dict[str, Any]],
+        fields: Sequence[str] = PARENT_FIELDS,
+    ) -> list[dict[str, Any]]:
+        """Return copies of the chunks with the `fields` of their question."""
+        questions = self.get_many(chunk["question_id"] for chunk in chunks)
+        rehydrated = []
+        for chunk in chunks:
+            question = questions.get(chunk["question_id"], {})
+            rehydrated.append(chunk | {field: question.get(field) for field in fields})
+        return rehydrated
@@ -0,0 +1,148 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Skip-if-unchanged management of the datastore's embedding field.
+
+`SchemaReconciler` only updates the datastore schema when the embedding field
+is missing or differs from the desired one. The hash of the last field it
+applied or found is cached, e.g. in a blob under the pipeline root, so runs
+whose desired field has not changed skip the schema calls altogether.
+"""
+
+import copy
+import hashlib
+import json
+from collections.abc import Callable
+from typing import Any, NamedTuple, Protocol
+
+
+class HashCache(Protocol):
+    """Stores the hash of the last applied schema."""
+
+    def read(self) -> str | None: ...
+
+    def write(self, value: str) -> None: ...
+
+
+class BlobHashCache:
+    """Keeps the hash in a `google.cloud.storage.Blob`, or any object with the
+    same `exists`, `download_as_text` and `upload_from_string` methods."""
+
+    def __init__(self, blob: Any) -> None:
+        self._blob = blob
+
+    def read(self) -> str | None:
+        if not self._blob.exists():
+            return None
+        return self._blob.download_as_text().strip() or None
+
+    def write(self, value: str) -> None:
+        self._blob.upload_from_string(value, content_type="text/plain")
+
+
+def embedding_field_schema(dimension: int) -> dict[str, Any]:
+    """Return the schema of an embedding vector field."""
+    return {
+        "type": "array",
+        "keyPropertyMapping": "embedding_vector",
+        "dimension": dimension,
+        "items": {"type": "number"},
+    }
+
+
+def schema_with_field(
+    schema: dict[str, Any], field_name: str, field_schema: dict[str, Any]
+) -> dict[str, Any]:
+    """Return a copy of the schema with the field set."""
+    schema = copy.deepcopy(schema)
+    if schema.get("properties") is None:
+        schema["properties"] = {}
+    schema["properties"][field_name] = field_schema
+    return schema
+
+
+def has_field(
+    schema: dict[str, Any], field_name: str, field_schema: dict[str, Any]
+) -> bool:
+    """Whether the schema already has the field.
+
+    Only the keys of `field_schema` are compared, since the service may add
+    its own defaults to a field.
+    """
+    current = (schema.get("properties") or {}).get(field_name)
+    return isinstance(current, dict) and all(
+        current.get(key) == value for key, value in field_schema.items()
+    )
+
+
+def field_hash(schema_name: str, field_name: str, field_schema: dict[str, Any]) -> str:
+    """Hash of a field of a schema, stable across key order."""
+    payload = json.dumps(
+        {"schema": schema_name, "field": field_name, "field_schema": field_schema},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ReconcileResult(NamedTuple):
+    """Outcome of `SchemaReconciler.reconcile`.
+
+    `action` is "cached" when the cached hash matched and the schema was not
+    read, "unchanged" when the schema already had the field and "updated"
+    when it was updated.
+    """
+
+    action: str
+    schema_hash: str
+
+
+class SchemaReconciler:
+    """Adds a field to a schema only when it is missing or differs."""
+
+    def __init__(
+        self,
+        get_schema: Callable[[], str],
+        update_schema: Callable[[str], None],
+        cache: HashCache | None = None,
+    ) -> None:
+        """Create a reconciler.
+
+        Args:
+            get_schema: Returns the current `json_schema` of the schema
+            update_schema: Applies a new `json_schema` and waits for it
+            cache: Cache of the last applied hash, none to always read the schema
+        """
+        self._get_schema = get_schema
+        self._update_schema = update_schema
+        self._cache = cache
+
+    def reconcile(
+        self, schema_name: str, field_name: str, field_schema: dict[str, Any]
+    ) -> ReconcileResult:
+        """Make sure the schema has the field, updating it only on change."""
+        desired_hash = field_hash(schema_name, field_name, field_schema)
+        if self._cache is not None and self._cache.read() == desired_hash:
+            return ReconcileResult("cached", desired_hash)
+
+        current = json.loads(self._get_schema() or "{}")
+        if has_field(current, field_name, field_schema):
+            action = "unchanged"
+        else:
+            desired = schema_with_field(current, field_name, field_schema)
+            self._update_schema(json.dumps(desired))
+            action = "updated"
+
+        if self._cache is not None:
+            self._cache.write(desired_hash)
+        return ReconcileResult(action, desired_hash)
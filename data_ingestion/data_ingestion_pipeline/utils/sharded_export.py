@@ -0,0 +1,151 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Sharded, gzip-compressed JSONL export with a manifest.
+
+Lines are cut into shards of about `target_shard_bytes` of uncompressed JSONL,
+which are compressed and written by a pool of writer threads (zlib releases the
+GIL). `manifest.json` lists every shard with its row count, compressed size
+and base64 MD5, the same digest Cloud Storage reports for an object, so a
+reader can check that every shard is present and complete without
+downloading it.
+"""
+
+import base64
+import gzip
+import hashlib
+import json
+import os
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, NamedTuple
+
+MANIFEST_FILE = "manifest.json"
+SHARDED_FORMAT = "jsonl.gz"
+
+
+class Shard(NamedTuple):
+    """A shard listed in the manifest."""
+
+    name: str
+    rows: int
+    bytes: int
+    md5: str
+
+
+def _write_shard(directory: str, name: str, lines: list[str]) -> Shard:
+    data = gzip.compress("".join(lines).encode("utf-8"), compresslevel=6)
+    with open(os.path.join(directory, name), "wb") as f:
+        f.write(data)
+    digest = hashlib.md5(data, usedforsecurity=False).digest()
+    md5 = base64.b64encode(digest).decode("ascii")
+    return Shard(name=name, rows=len(lines), bytes=len(data), md5=md5)
+
+
+def write_sharded_jsonl(
+    lines: Iterable[str],
+    directory: str,
+    prefix: str = "documents",
+    target_shard_bytes: int = 64 * 2**20,
+    max_workers: int = 4,
+) -> dict[str, Any]:
+    """Write JSONL lines as gzip-compressed shards and a manifest.
+
+    At most `max_workers` shards are compressed at once and one more is being
+    filled, which bounds memory.
+
+    Args:
+        lines: JSON documents, one per line, without the trailing newline
+        directory: Directory to write the shards and manifest to
+        prefix: File name prefix of the shards
+        target_shard_bytes: Uncompressed size after which a shard is closed
+        max_workers: Shards compressed and written in parallel
+
+    Returns:
+        The manifest
+    """
+    os.makedirs(directory, exist_ok=True)
+    shards: list[Shard] = []
+    pending: set[Future[Shard]] = set()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+        def submit(shard_lines: list[str]) -> None:
+            nonlocal pending
+            if len(pending) >= max_workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                shards.extend(future.result() for future in done)
+            name = f"{prefix}-{len(shards) + len(pending):05d}.{SHARDED_FORMAT}"
+            pending.add(executor.submit(_write_shard, directory, name, shard_lines))
+
+        shard_lines: list[str] = []
+        shard_bytes = 0
+        for line in lines:
+            shard_lines.append(line + "\n")
+            shard_bytes += len(line) + 1
+            if shard_bytes >= target_shard_bytes:
+                submit(shard_lines)
+                shard_lines, shard_bytes = [], 0
+        if shard_lines:
+            submit(shard_lines)
+        shards.extend(future.result() for future in pending)
+
+    shards.sort(key=lambda shard: shard.name)
+    manifest = {
+        "format": SHARDED_FORMAT,
+        "num_rows": sum(shard.rows for shard in shards),
+        "shards": [shard._asdict() for shard in shards],
+    }
+    with open(os.path.join(directory, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def manifest_shards(manifest: Mapping[str, Any]) -> list[Shard]:
+    """Return the shards listed in a manifest."""
+    return [Shard(**shard) for shard in manifest["shards"]]
+
+
+def verify_shards(
+    manifest: Mapping[str, Any], found: Mapping[str, tuple[int, str]]
+) -> list[str]:
+    """Check that every shard of the manifest was written completely.
+
+    Args:
+        manifest: Manifest written by `write_sharded_jsonl`
+        found: Size and base64 MD5 of each shard found, by name
+
+    Returns:
+        A description of each missing or mismatched shard, empty if the
+        export is complete
+    """
+    problems = []
+    for shard in manifest_shards(manifest):
+        if shard.name not in found:
+            problems.append(f"{shard.name} is missing")
+        elif found[shard.name] != (shard.bytes, shard.md5):
+            problems.append(
+                f"{shard.name} has size and MD5 {found[shard.name]}, "
+                f"expected {(shard.bytes, shard.md5)}"
+            )
+    return problems
+
+
+def iter_sharded_jsonl(directory: str) -> Iterator[dict[str, Any]]:
+    """Yield the documents of a local sharded export, in shard order."""
+    with open(os.path.join(directory, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    for shard in manifest_shards(manifest):
+        with gzip.open(os.path.join(directory, shard.name), "rt") as f:
+            for line in f:
+                yield json.loads(line)
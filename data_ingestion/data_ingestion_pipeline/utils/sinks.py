@@ -0,0 +1,363 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Chunk sinks for running the ingestion logic outside of BigQuery.
+
+A sink plays the part of the deduplicated table and the JSONL export of
+`store_chunks` and `export_chunks`: it keeps the latest chunks of every question, merges each run
+into them and exports the documents for Vertex AI Search.
+
+The normalized export layout leaves the parent question's text out of the
+chunk documents and writes it once per question to `questions.jsonl`, where a
+`ParentTextStore` looks it up when needed.
+"""
+
+import json
+import os
+import sqlite3
+from array import array
+from collections.abc import Iterator, Sequence
+from typing import Any, NamedTuple, Protocol
+
+# Rows exchanged with a sink have the columns of the deduplicated table
+QUESTION_FIELDS = [
+    "question_id",
+    "content_hash",
+    "last_edit_date",
+    "question_text",
+    "full_text_md",
+    "creation_timestamp",
+]
+CHUNK_FIELDS = [
+    "chunk_id",
+    "question_id",
+    "text_chunk",
+    "embedding",
+    "embedding_status",
+]
+
+_SQLITE_MAX_PARAMETERS = 500
+
+
+class ExportResult(NamedTuple):
+    """Files written by `ChunkSink.export`."""
+
+    documents_path: str
+    deleted_chunks_path: str
+    num_documents: int
+    num_deleted: int
+    reconciliation_mode: str
+    questions_path: str | None = None
+    num_questions: int = 0
+
+
+class ChunkSink(Protocol):
+    """Stores the latest chunks of each question and exports them."""
+
+    def is_empty(self) -> bool: ...
+
+    def fingerprints(self, question_ids: Sequence[int]) -> dict[int, str]: ...
+
+    def chunks(self, question_ids: Sequence[int]) -> list[dict[str, Any]]: ...
+
+    def merge(self, rows: Sequence[dict[str, Any]]) -> list[str]: ...
+
+    def documents(
+        self, full: bool, normalized: bool = False
+    ) -> Iterator[dict[str, Any]]: ...
+
+    def export(self, full: bool, normalized: bool = False) -> ExportResult: ...
+
+
+def _placeholders(values: Sequence[Any]) -> str:
+    return ", ".join("?" * len(values))
+
+
+def _batched(values: Sequence[Any]) -> Iterator[Sequence[Any]]:
+    for start in range(0, len(values), _SQLITE_MAX_PARAMETERS):
+        yield values[start : start + _SQLITE_MAX_PARAMETERS]
+
+
+class SQLiteChunkSink:
+    """Sink keeping its state in SQLite and exporting JSONL files."""
+
+    def __init__(
+        self,
+        state_path: str,
+        output_dir: str,
+        embedding_column: str = "embedding",
+    ) -> None:
+        """Open (or create) the sink's state.
+
+        Args:
+            state_path: SQLite database holding the chunks of previous runs
+            output_dir: Directory the JSONL files are exported to
+            embedding_column: Name of the embedding field in exported documents
+        """
+        self._connection = sqlite3.connect(state_path)
+        self._output_dir = output_dir
+        self._embedding_column = embedding_column
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS questions (
+                question_id INTEGER PRIMARY KEY,
+                content_hash TEXT,
+                last_edit_date TEXT,
+                question_text TEXT,
+                full_text_md TEXT,
+                creation_timestamp TEXT
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                chunk_id TEXT PRIMARY KEY,
+                question_id INTEGER NOT NULL,
+                text_chunk TEXT,
+                embedding BLOB,
+                embedding_status TEXT
+            );
+            CREATE INDEX IF NOT EXISTS chunks_question_id ON chunks (question_id);
+            -- Questions merged and chunks deleted by the current run
+            CREATE TEMP TABLE run_questions (question_id INTEGER PRIMARY KEY);
+            CREATE TEMP TABLE run_deleted_chunks (chunk_id TEXT PRIMARY KEY);
+            """
+        )
+
+    def is_empty(self) -> bool:
+        return (
+            self._connection.execute("SELECT 1 FROM questions LIMIT 1").fetchone()
+            is None
+        )
+
+    def fingerprints(self, question_ids: Sequence[int]) -> dict[int, str]:
+        """Return the stored content hash of each known question."""
+        found: dict[int, str] = {}
+        for batch in _batched(question_ids):
+            found.update(
+                self._connection.execute(
+                    f"""
+                    SELECT question_id, content_hash FROM questions
+                    WHERE question_id IN ({_placeholders(batch)})
+                    """,
+                    batch,
+                )
+            )
+        return found
+
+    def chunks(self, question_ids: Sequence[int]) -> list[dict[str, Any]]:
+        """Return the stored chunks of the questions."""
+        rows: list[dict[str, Any]] = []
+        for batch in _batched(question_ids):
+            cursor = self._connection.execute(
+                f"""
+                SELECT {", ".join(CHUNK_FIELDS)} FROM chunks
+                WHERE question_id IN ({_placeholders(batch)})
+                ORDER BY question_id, rowid
+                """,
+                batch,
+            )
+            for row in cursor:
+                chunk = dict(zip(CHUNK_FIELDS, row, strict=True))
+                chunk["embedding"] = array("d", chunk["embedding"]).tolist()
+                rows.append(chunk)
+        return rows
+
+    def merge(self, rows: Sequence[dict[str, Any]]) -> list[str]:
+        """Upsert the chunks of the questions in `rows`, deleting their stale chunks.
+
+        Returns:
+            Ids of the deleted chunks
+        """
+        question_rows = {
+            row["question_id"]: [row[field] for field in QUESTION_FIELDS]
+            for row in rows
+        }
+        chunk_rows = [
+            [
+                row["chunk_id"],
+                row["question_id"],
+                row["text_chunk"],
+                array("d", row["embedding"]).tobytes(),
+                row["embedding_status"],
+            ]
+            for row in rows
+        ]
+        with self._connection as connection:
+            # Not executescript, which would commit the open transaction
+            connection.execute(
+                "CREATE TEMP TABLE merged_questions (question_id INTEGER PRIMARY KEY)"
+            )
+            connection.execute(
+                "CREATE TEMP TABLE merged_chunks (chunk_id TEXT PRIMARY KEY)"
+            )
+            connection.executemany(
+                "INSERT INTO merged_questions VALUES (?)",
+                [[question_id] for question_id in question_rows],
+            )
+            connection.executemany(
+                "INSERT INTO merged_chunks VALUES (?)", [[row[0]] for row in chunk_rows]
+            )
+            deleted = [
+                chunk_id
+                for (chunk_id,) in connection.execute(
+                    """
+                    SELECT chunk_id FROM chunks
+                    WHERE question_id IN (SELECT question_id FROM merged_questions)
+                        AND chunk_id NOT IN (SELECT chunk_id FROM merged_chunks)
+                    """
+                )
+            ]
+            connection.execute(
+                """
+                DELETE FROM chunks
+                WHERE question_id IN (SELECT question_id FROM merged_questions)
+                    AND chunk_id NOT IN (SELECT chunk_id FROM merged_chunks)
+                """
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO run_deleted_chunks VALUES (?)",
+                [[chunk_id] for chunk_id in deleted],
+            )
+            connection.execute(
+                "INSERT OR IGNORE INTO run_questions SELECT * FROM merged_questions"
+            )
+            connection.execute("DROP TABLE merged_questions")
+            connection.execute("DROP TABLE merged_chunks")
+            connection.executemany(
+                f"INSERT OR REPLACE INTO questions VALUES ({_placeholders(QUESTION_FIELDS)})",
+                question_rows.values(),
+            )
+            connection.executemany(
+                f"INSERT OR REPLACE INTO chunks VALUES ({_placeholders(CHUNK_FIELDS)})",
+                chunk_rows,
+            )
+        return deleted
+
+    def documents(
+        self, full: bool, normalized: bool = False
+    ) -> Iterator[dict[str, Any]]:
+        """Yield the documents exported for Vertex AI Search.
+
+        Chunks whose embedding failed are left out, like in `export_chunks`,
+        until they are repaired.
+
+        Args:
+            full: Every stored chunk, or only the chunks of questions merged
+                by this run
+            normalized: Leave out the question text, exported per question
+        """
+        query = """
+            SELECT c.chunk_id, c.embedding, c.text_chunk, q.question_id,
+                q.creation_timestamp, q.last_edit_date, q.question_text,
+                q.full_text_md
+            FROM chunks AS c JOIN questions AS q USING (question_id)
+            WHERE length(c.embedding) > 0 AND IFNULL(c.embedding_status, '') = ''
+        """
+        if not full:
+            query += " AND q.question_id IN (SELECT question_id FROM run_questions)"
+
+        for row in self._connection.execute(query):
+            chunk_id, embedding, *fields = row
+            document = {
+                "id": chunk_id,
+                self._embedding_column: array("d", embedding).tolist(),
+                "content": fields[0],
+                "question_id": fields[1],
+                "creation_timestamp": fields[2],
+                "last_edit_date": fields[3],
+            }
+            if not normalized:
+                document["question_text"] = fields[4]
+                document["full_text_md"] = fields[5]
+            yield document
+
+    def _export_questions(self, path: str, full: bool) -> int:
+        query = """
+            SELECT question_id, question_text, full_text_md, last_edit_date
+            FROM questions
+        """
+        if not full:
+            query += " WHERE question_id IN (SELECT question_id FROM run_questions)"
+
+        num_questions = 0
+        with open(path, "w", encoding="utf-8") as f:
+            for (
+                question_id,
+                question_text,
+                full_text_md,
+                last_edit_date,
+            ) in self._connection.execute(query):
+                question = {
+                    "question_id": question_id,
+                    "question_text": question_text,
+                    "full_text_md": full_text_md,
+                    "last_edit_date": last_edit_date,
+                }
+                f.write(json.dumps(question) + "\n")
+                num_questions += 1
+        return num_questions
+
+    def export(self, full: bool, normalized: bool = False) -> ExportResult:
+        """Export documents for Vertex AI Search to `output_dir`.
+
+        Args:
+            full: Export every stored chunk for FULL reconciliation. Otherwise
+                only the chunks of questions merged by this run are exported,
+                for INCREMENTAL reconciliation.
+            normalized: Export the question text once per question to
+                `questions.jsonl` instead of in every chunk document
+
+        Returns:
+            The written files and their row counts
+        """
+        os.makedirs(self._output_dir, exist_ok=True)
+        documents_path = os.path.join(self._output_dir, "documents.jsonl")
+        deleted_chunks_path = os.path.join(self._output_dir, "deleted_chunks.jsonl")
+
+        num_documents = 0
+        with open(documents_path, "w", encoding="utf-8") as f:
+            for document in self.documents(full, normalized=normalized):
+                f.write(
+                    json.dumps(
+                        {"id": document["id"], "json_data": json.dumps(document)}
+                    )
+                )
+                f.write("\n")
+                num_documents += 1
+
+        num_deleted = 0
+        with open(deleted_chunks_path, "w", encoding="utf-8") as f:
+            if not full:
+                for (chunk_id,) in self._connection.execute(
+                    "SELECT chunk_id FROM run_deleted_chunks"
+                ):
+                    f.write(json.dumps({"id": chunk_id}) + "\n")
+                    num_deleted += 1
+
+        questions_path = None
+        num_questions = 0
+        if normalized:
+            questions_path = os.path.join(self._output_dir, "questions.jsonl")
+            num_questions = self._export_questions(questions_path, full)
+
+        return ExportResult(
+            documents_path=documents_path,
+            deleted_chunks_path=deleted_chunks_path,
+            num_documents=num_documents,
+            num_deleted=num_deleted,
+            reconciliation_mode="FULL" if full else "INCREMENTAL",
+            questions_path=questions_path,
+            num_questions=num_questions,
+        )
+
+    def close(self) -> None:
+        self._connection.close()
@@ -0,0 +1,133 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Question sources for running the ingestion logic outside of BigQuery.
+
+A source yields batches of question records with the columns `fetch_questions`
+selects from `stackoverflow_python_questions_and_answers`: creation_date,
+last_edit_date, question_id, question_title, question_text and answers (a list
+of `{"body": html}`).
+"""
+
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from itertools import islice
+from typing import Any, Protocol
+
+QUESTION_COLUMNS = [
+    "creation_date",
+    "last_edit_date",
+    "question_id",
+    "question_title",
+    "question_text",
+    "answers",
+]
+
+
+class QuestionSource(Protocol):
+    """Yields question records created between two dates, in batches."""
+
+    def iter_batches(
+        self,
+        start_date: datetime | None = None,
+        end_date: datetime | None = None,
+        batch_size: int = 10_000,
+    ) -> Iterator[list[dict[str, Any]]]: ...
+
+
+def _in_window(
+    record: dict[str, Any], start_date: datetime | None, end_date: datetime | None
+) -> bool:
+    created = record["creation_date"]
+    return (start_date is None or created >= start_date) and (
+        end_date is None or created <= end_date
+    )
+
+
+class IterableQuestionSource:
+    """Source over an iterable of records, e.g. generated benchmark data."""
+
+    def __init__(self, records: Iterable[dict[str, Any]]) -> None:
+        self._records = records
+
+    def iter_batches(
+        self,
+        start_date: datetime | None = None,
+        end_date: datetime | None = None,
+        batch_size: int = 10_000,
+    ) -> Iterator[list[dict[str, Any]]]:
+        records = (
+            record
+            for record in self._records
+            if _in_window(record, start_date, end_date)
+        )
+        while batch := list(islice(records, batch_size)):
+            yield batch
+
+
+class ParquetQuestionSource:
+    """Source reading a Parquet file or directory of Parquet files."""
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+
+    def iter_batches(
+        self,
+        start_date: datetime | None = None,
+        end_date: datetime | None = None,
+        batch_size: int = 10_000,
+    ) -> Iterator[list[dict[str, Any]]]:
+        import pyarrow.dataset as ds
+
+        dataset = ds.dataset(self._path, format="parquet")
+        condition = None
+        if start_date is not None:
+            condition = ds.field("creation_date") >= start_date
+        if end_date is not None:
+            before_end = ds.field("creation_date") <= end_date
+            condition = before_end if condition is None else condition & before_end
+        for batch in dataset.to_batches(
+            columns=QUESTION_COLUMNS, filter=condition, batch_size=batch_size
+        ):
+            if batch.num_rows:
+                yield batch.to_pylist()
+
+
+class DuckDBQuestionSource:
+    """Source reading a table of a DuckDB database."""
+
+    def __init__(self, path: str, table: str = "questions") -> None:
+        self._path = path
+        self._table = table
+
+    def iter_batches(
+        self,
+        start_date: datetime | None = None,
+        end_date: datetime | None = None,
+        batch_size: int = 10_000,
+    ) -> Iterator[list[dict[str, Any]]]:
+        import duckdb
+
+        with duckdb.connect(self._path, read_only=True) as connection:
+            cursor = connection.execute(
+                f"""
+                SELECT {", ".join(QUESTION_COLUMNS)}
+                FROM {self._table}
+                WHERE ($1 IS NULL OR creation_date >= $1)
+                    AND ($2 IS NULL OR creation_date <= $2)
+                """,
+                [start_date, end_date],
+            )
+            while rows := cursor.fetchmany(batch_size):
+                yield [dict(zip(QUESTION_COLUMNS, row, strict=True)) for row in rows]
@@ -0,0 +1,366 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Offset based recursive character text splitter.
+
+`OffsetTextSplitter` produces the same chunks as LangChain's
+`RecursiveCharacterTextSplitter` (with its default `keep_separator=True`), but
+works on `(start, end)` offsets into the original text. Splits, recursion and
+merging never copy substrings; each chunk is sliced once when it is emitted.
+
+`SectionTextSplitter` first splits on the markdown heading hierarchy (the
+question under `#`, each `## Answer N:`), packs whole sections into chunks and
+only splits recursively the sections larger than a chunk.
+
+Chunk sizes are counted in characters, or in approximate tokens with a
+memoizing `TokenCounter` as the length function.
+"""
+
+import re
+from collections.abc import Callable, Sequence
+from itertools import pairwise
+
+from data_ingestion_pipeline.utils.markdown import convert_in_batches
+from data_ingestion_pipeline.utils.tokens import TokenCounter
+
+DEFAULT_SEPARATORS = ["\n\n", "\n", " ", ""]
+
+CHUNKING_STRATEGIES = ("recursive", "sections")
+
+# Units of chunk_size and chunk_overlap
+LENGTH_UNITS = ("characters", "tokens")
+
+# Markdown headings, `#` to `######`, captured to measure their level
+_HEADING = re.compile(r"^(#{1,6}) ", re.MULTILINE)
+
+# Code fence lines, ``` or ~~~, with the info string of an opening fence
+_FENCE = re.compile(r"^ {0,3}(`{3,}|~{3,})(.*)$", re.MULTILINE)
+
+Span = tuple[int, int]
+
+
+class OffsetTextSplitter:
+    """Drop-in replacement for `RecursiveCharacterTextSplitter.split_text`."""
+
+    def __init__(
+        self,
+        chunk_size: int = 4000,
+        chunk_overlap: int = 200,
+        separators: Sequence[str] | None = None,
+        is_separator_regex: bool = False,
+        length_function: Callable[[str], int] = len,
+        strip_whitespace: bool = True,
+    ) -> None:
+        """Create a new splitter.
+
+        Args:
+            chunk_size: Maximum size of chunks to return
+            chunk_overlap: Overlap between chunks
+            separators: Separators tried in order, defaults to paragraphs,
+                lines, words and characters
+            is_separator_regex: Whether separators are regular expressions
+            length_function: Function that measures the length of a chunk.
+                With the default `len`, lengths come from offsets alone.
+            strip_whitespace: Strip whitespace from the start and end of chunks
+        """
+        if chunk_overlap > chunk_size:
+            raise ValueError(
+                f"Got a larger chunk overlap ({chunk_overlap}) than chunk size "
+                f"({chunk_size}), should be smaller."
+            )
+        self._chunk_size = chunk_size
+        self._chunk_overlap = chunk_overlap
+        self._separators = list(separators or DEFAULT_SEPARATORS)
+        self._length_function = length_function
+        self._strip_whitespace = strip_whitespace
+        self._separator_len = length_function("")
+        self._patterns = {
+            separator: re.compile(
+                separator if is_separator_regex else re.escape(separator)
+            )
+            for separator in self._separators
+            if separator
+        }
+
+    def _split_bounds(
+        self, text: str, start: int, end: int, separator: str
+    ) -> list[int]:
+        """Split text[start:end], keeping each separator at the start of its split.
+
+        Returns the increasing boundaries of the non-empty splits, so split `i`
+        is text[bounds[i]:bounds[i + 1]].
+        """
+        if not separator:
+            return list(range(start, end + 1))
+        finditer = self._patterns[separator].finditer
+        bounds = [start, *[match.start() for match in finditer(text, start, end)]]
+        if len(bounds) > 1 and bounds[1] == start:
+            del bounds[1]
+        if bounds[-1] < end:
+            bounds.append(end)
+        return bounds
+
+    def _lengths(self, text: str, bounds: list[int]) -> list[int]:
+        if self._length_function is len:
+            return [b - a for a, b in pairwise(bounds)]
+        return [self._length_function(text[a:b]) for a, b in pairwise(bounds)]
+
+    def _emit(self, text: str, start: int, end: int, chunks: list[Span]) -> None:
+        if self._strip_whitespace:
+            while start < end and text[start].isspace():
+                start += 1
+            while end > start and text[end - 1].isspace():
+                end -= 1
+        if end > start:
+            chunks.append((start, end))
+
+    def _merge(
+        self,
+        text: str,
+        bounds: list[int],
+        lengths: list[int],
+        first: int,
+        last: int,
+        chunks: list[Span],
+    ) -> None:
+        """Merge splits `first` to `last - 1` into chunks of at most `chunk_size`."""
+        separator_len = self._separator_len
+        chunk_size = self._chunk_size
+        head = first  # First split of the current chunk
+        total = 0
+        for index in range(first, last):
+            length = lengths[index]
+            if total + length + (separator_len if index > head else 0) > chunk_size:
+                if index > head:
+                    self._emit(text, bounds[head], bounds[index], chunks)
+                    # Drop splits from the front until only the overlap is left
+                    while total > self._chunk_overlap or (
+                        total + length + (separator_len if index > head else 0)
+                        > chunk_size
+                        and total > 0
+                    ):
+                        total -= lengths[head] + (
+                            separator_len if index - head > 1 else 0
+                        )
+                        head += 1
+            total += length + (separator_len if index > head else 0)
+        if head < last:
+            self._emit(text, bounds[head], bounds[last], chunks)
+
+    def _split(
+        self,
+        text: str,
+        start: int,
+        end: int,
+        separators: list[str],
+        chunks: list[Span],
+    ) -> None:
+        # Use the first separator present in the text, recursing with the rest
+        separator = separators[-1]
+        new_separators: list[str] = []
+        for i, candidate in enumerate(separators):
+            if not candidate:
+                separator = candidate
+                break
+            if self._patterns[candidate].search(text, start, end):
+                separator = candidate
+                new_separators = separators[i + 1 :]
+                break
+
+        bounds = self._split_bounds(text, start, end, separator)
+        lengths = self._lengths(text, bounds)
+        first_good = 0  # First split of the current run of splits below chunk_size
+        for index, length in enumerate(lengths):
+            if length < self._chunk_size:
+                continue
+            if first_good < index:
+                self._merge(text, bounds, lengths, first_good, index, chunks)
+            if new_separators:
+                self._split(
+                    text, bounds[index], bounds[index + 1], new_separators, chunks
+                )
+            else:
+                chunks.append((bounds[index], bounds[index + 1]))
+            first_good = index + 1
+        if first_good < len(lengths):
+            self._merge(text, bounds, lengths, first_good, len(lengths), chunks)
+
+    def split_offsets(self, text: str) -> list[Span]:
+        """Return the `(start, end)` offsets of each chunk of `text`."""
+        chunks: list[Span] = []
+        if self._length_function is len and len(text) < self._chunk_size:
+            # Every split fits, so merging yields the whole (stripped) text
+            self._emit(text, 0, len(text), chunks)
+        else:
+            self._split(text, 0, len(text), self._separators, chunks)
+        return chunks
+
+    def split_text(self, text: str) -> list[str]:
+        """Split `text` into chunks."""
+        return [text[start:end] for start, end in self.split_offsets(text)]
+
+    def split_texts(
+        self, texts: Sequence[str], max_workers: int = 1, batch_size: int = 256
+    ) -> list[list[str]]:
+        """Split many documents, optionally across a process pool.
+
+        Args:
+            texts: Documents to split
+            max_workers: Number of worker processes (1 splits in-process)
+            batch_size: Number of documents sent to a worker per task
+
+        Returns:
+            The chunks of each document, in input order
+        """
+        return convert_in_batches(
+            texts, self.split_text, max_workers=max_workers, batch_size=batch_size
+        )
+
+
+class SectionTextSplitter(OffsetTextSplitter):
+    """Splits markdown on its headings first, keeping sections whole.
+
+    Headings inside fenced code blocks are ignored.
+
+    Consecutive sections are packed into a chunk while they fit in
+    `chunk_size`. A section that does not fit is split on its subheadings, and
+    a section without subheadings is split recursively like
+    `OffsetTextSplitter`, with the chunk overlap. Chunks never straddle two
+    sections unless both are whole.
+    """
+
+    def _span_length(self, text: str, start: int, end: int) -> int:
+        if self._length_function is len:
+            return end - start
+        return self._length_function(text[start:end])
+
+    def _split_sections(
+        self,
+        text: str,
+        start: int,
+        end: int,
+        headings: list[tuple[int, int]],
+        chunks: list[Span],
+    ) -> None:
+        """Split text[start:end] on the highest level of the headings inside it.
+
+        `headings` holds the `(position, level)` of the headings after `start`.
+        """
+        if not headings:
+            self._split(text, start, end, self._separators, chunks)
+            return
+        level = min(heading_level for _, heading_level in headings)
+        bounds = [
+            start,
+            *[
+                position
+                for position, heading_level in headings
+                if heading_level == level
+            ],
+            end,
+        ]
+        head = start  # Start of the sections packed into the current chunk
+        for section_start, section_end in pairwise(bounds):
+            if self._span_length(text, head, section_end) <= self._chunk_size:
+                continue
+            if head < section_start:
+                self._emit(text, head, section_start, chunks)
+            if self._span_length(text, section_start, section_end) <= self._chunk_size:
+                head = section_start
+            else:
+                subheadings = [
+                    heading
+                    for heading in headings
+                    if section_start < heading[0] < section_end
+                ]
+                self._split_sections(
+                    text, section_start, section_end, subheadings, chunks
+                )
+                head = section_end
+        if head < end:
+            self._emit(text, head, end, chunks)
+
+    def split_offsets(self, text: str) -> list[Span]:
+        """Return the `(start, end)` offsets of each chunk of `text`."""
+        chunks: list[Span] = []
+        if self._length_function is len and len(text) <= self._chunk_size:
+            self._emit(text, 0, len(text), chunks)
+        else:
+            self._split_sections(text, 0, len(text), _headings(text), chunks)
+        return chunks
+
+
+def _headings(text: str) -> list[tuple[int, int]]:
+    """Return the `(position, level)` of the headings after the start of `text`.
+
+    Lines inside fenced code blocks are skipped, so comments such as
+    `# load the data` in a code sample are not taken for headings.
+    """
+    code_blocks: list[Span] = []
+    opening: re.Match[str] | None = None
+    for fence in _FENCE.finditer(text):
+        if opening is None:
+            opening = fence
+        elif (
+            fence.group(1)[0] == opening.group(1)[0]
+            and len(fence.group(1)) >= len(opening.group(1))
+            and not fence.group(2).strip()
+        ):
+            code_blocks.append((opening.start(), fence.end()))
+            opening = None
+    if opening is not None:
+        # An unclosed fence runs to the end of the text
+        code_blocks.append((opening.start(), len(text)))
+
+    headings = []
+    blocks = iter(code_blocks)
+    block = next(blocks, None)
+    for match in _HEADING.finditer(text):
+        position = match.start()
+        while block is not None and block[1] <= position:
+            block = next(blocks, None)
+        if position > 0 and (block is None or position < block[0]):
+            headings.append((position, len(match.group(1))))
+    return headings
+
+
+def make_text_splitter(
+    strategy: str, chunk_size: int, chunk_overlap: int, length_unit: str = "characters"
+) -> OffsetTextSplitter:
+    """Create the splitter of a chunking strategy.
+
+    Args:
+        strategy: "recursive" for `OffsetTextSplitter`, "sections" for
+            `SectionTextSplitter`
+        chunk_size: Maximum size of chunks
+        chunk_overlap: Overlap between chunks split within a section
+        length_unit: "characters", or "tokens" to measure chunks with a
+            `TokenCounter`
+    """
+    if strategy not in CHUNKING_STRATEGIES:
+        raise ValueError(
+            f"chunking strategy must be one of {CHUNKING_STRATEGIES}, got {strategy!r}"
+        )
+    if length_unit not in LENGTH_UNITS:
+        raise ValueError(
+            f"length unit must be one of {LENGTH_UNITS}, got {length_unit!r}"
+        )
+    splitter_class = (
+        SectionTextSplitter if strategy == "sections" else OffsetTextSplitter
+    )
+    return splitter_class(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=TokenCounter() if length_unit == "tokens" else len,
+    )
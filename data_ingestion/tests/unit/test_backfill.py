@@ -0,0 +1,67 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from pathlib import Path
+
+import pytest
+from data_ingestion_pipeline.utils.backfill import (
+    JSONFileCheckpoint,
+    id_ranges,
+    run_backfill,
+)
+
+
+def test_ranges_cover_present_ids_in_fixed_size_batches() -> None:
+    assert id_ranges(range(1, 11), 4) == [(1, 5), (5, 9), (9, 11)]
+    assert id_ranges([7], 100) == [(7, 8)]
+    # Sparse ids do not produce empty ranges
+    assert id_ranges([3, 1000, 1001, 50000, 90000], 2) == [
+        (3, 1001),
+        (1001, 50001),
+        (90000, 90001),
+    ]
+    assert id_ranges([], 10) == []
+    with pytest.raises(ValueError):
+        id_ranges([1], 0)
+
+
+def test_backfill_resumes_after_last_completed_range(tmp_path: Path) -> None:
+    ranges = id_ranges(range(40), 10)
+    path = str(tmp_path / "checkpoint.json")
+    checkpoint = JSONFileCheckpoint(path, "run-1")
+    processed: list[int] = []
+
+    def crash_on_third_range(start: int, end: int) -> int:
+        if len(processed) == 2:
+            raise RuntimeError("preempted")
+        processed.append(start)
+        return end - start
+
+    with pytest.raises(RuntimeError):
+        run_backfill(ranges, crash_on_third_range, checkpoint)
+
+    def process(start: int, end: int) -> int:
+        processed.append(start)
+        return end - start
+
+    ticks = iter(range(100))
+    stats = run_backfill(ranges, process, checkpoint, clock=lambda: next(ticks))
+
+    assert processed == [0, 10, 20, 30]
+    assert stats.resumed_ranges == 2
+    assert stats.processed_ranges == 2
+    assert stats.rows_per_second == 10
+    assert stats.eta_seconds == 0
+    # Other runs keep their own checkpoints
+    assert JSONFileCheckpoint(path, "run-2").completed() == set()
@@ -0,0 +1,45 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from data_ingestion_pipeline.utils.bigquery_artifacts import (
+    loaded_table_name,
+    parquet_uri,
+    staging_table_name,
+    union_query,
+)
+
+
+def test_each_artifact_loads_into_its_own_table() -> None:
+    first = "gs://root/123/run-1/chunk-questions/chunks"
+    second = "gs://root/123/run-2/chunk-questions/chunks"
+
+    assert parquet_uri(first + "/") == f"{first}/part-*.parquet"
+    assert loaded_table_name(first) == loaded_table_name(first)
+    assert loaded_table_name(first) != loaded_table_name(second)
+    assert loaded_table_name(first).startswith("artifact_")
+    assert staging_table_name(first) != staging_table_name(second)
+    assert staging_table_name(first).startswith("staging_")
+
+
+def test_union_selects_columns_in_the_same_order() -> None:
+    query = union_query(["p.d.a", "p.d.b"], ["question_id", "chunk_id"])
+
+    assert query == (
+        "SELECT `question_id`, `chunk_id` FROM `p.d.a`\n"
+        "UNION ALL\n"
+        "SELECT `question_id`, `chunk_id` FROM `p.d.b`"
+    )
+    with pytest.raises(ValueError):
+        union_query([], ["question_id"])
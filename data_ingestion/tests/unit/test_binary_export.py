@@ -0,0 +1,106 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pytest
+
+if TYPE_CHECKING:
+    import pyarrow
+
+np = pytest.importorskip("numpy")
+pa = pytest.importorskip("pyarrow")
+
+from data_ingestion_pipeline.utils.binary_export import (  # noqa: E402
+    QUANTIZATIONS,
+    load_binary_export,
+    write_binary_export,
+)
+
+
+def chunk_batch(ids: list[str], embeddings: list[list[float]]) -> "pyarrow.RecordBatch":
+    return pa.RecordBatch.from_pylist(
+        [
+            {"id": id_, "embedding": embedding, "content": f"text of {id_}"}
+            for id_, embedding in zip(ids, embeddings, strict=True)
+        ]
+    )
+
+
+def test_round_trip_memory_maps_the_embeddings(tmp_path: Path) -> None:
+    batches = [
+        chunk_batch(["1__0", "1__1"], [[0.5, -1.0, 2.0], [0.0, 0.25, 1.0]]),
+        chunk_batch([], []),
+        chunk_batch(["2__0"], [[3.0, 4.0, 5.0]]),
+    ]
+    manifest = write_binary_export(batches, str(tmp_path))
+    assert (manifest["num_rows"], manifest["dimensions"]) == (3, 3)
+
+    export = load_binary_export(str(tmp_path), columns=["id"])
+    assert isinstance(export.embeddings, np.memmap)
+    assert export.embeddings.dtype == np.float32
+    np.testing.assert_array_equal(export.embeddings[2], [3.0, 4.0, 5.0])
+    assert export.metadata.column("id").to_pylist() == ["1__0", "1__1", "2__0"]
+    assert export.metadata.column_names == ["id"]
+
+
+def test_empty_export(tmp_path: Path) -> None:
+    write_binary_export([], str(tmp_path))
+    assert load_binary_export(str(tmp_path)).embeddings.shape == (0, 0)
+
+
+def test_embeddings_must_have_one_length(tmp_path: Path) -> None:
+    batch = chunk_batch(["1__0", "1__1"], [[0.5, 1.0], [0.5]])
+    with pytest.raises(ValueError):
+        write_binary_export([batch], str(tmp_path))
+
+
+@pytest.mark.parametrize(
+    ("quantization", "tolerance"), [("float16", 1e-3), ("int8", 1e-2)]
+)
+def test_quantized_export_stays_close_to_full_precision(
+    tmp_path: Path, quantization: str, tolerance: float
+) -> None:
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((50, 16)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    batch = chunk_batch([f"{i}__0" for i in range(50)], vectors.tolist())
+    write_binary_export([batch], str(tmp_path), quantization=quantization)
+
+    export = load_binary_export(str(tmp_path))
+    assert export.manifest["quantization"] == quantization
+    np.testing.assert_allclose(export.vectors(), vectors, atol=tolerance)
+    _, rows = export.search(vectors[:5], k=1, block_rows=16)
+    assert rows[:, 0].tolist() == [0, 1, 2, 3, 4]
+
+
+def test_search_returns_best_first(tmp_path: Path) -> None:
+    batch = chunk_batch(["a", "b", "c"], [[1.0, 0.0], [0.6, 0.8], [0.0, 1.0]])
+    write_binary_export([batch], str(tmp_path), quantization="int8")
+    scores, rows = load_binary_export(str(tmp_path)).search([[0.0, 1.0]], k=2)
+    assert rows.tolist() == [[2, 1]]
+    np.testing.assert_allclose(scores, [[1.0, 0.8]], atol=1e-2)
+
+
+def test_unknown_quantization(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        write_binary_export([], str(tmp_path), quantization="int4")
+
+
+def test_pipeline_accepts_every_quantization() -> None:
+    pytest.importorskip("kfp")
+    from data_ingestion_pipeline.pipeline import BINARY_EXPORT_QUANTIZATIONS
+
+    assert BINARY_EXPORT_QUANTIZATIONS == tuple(QUANTIZATIONS)
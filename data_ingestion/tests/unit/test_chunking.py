@@ -0,0 +1,42 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections.abc import Iterator
+
+from data_ingestion_pipeline.utils.chunking import ChunkRecord, iter_chunk_batches
+
+
+def test_iter_chunk_batches_bounds_batch_size() -> None:
+    documents = [(1, "a b c"), (2, "d e"), (3, "")]
+    batches = list(iter_chunk_batches(documents, str.split, batch_size=2))
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    records = [record for batch in batches for record in batch]
+    assert records == [
+        ChunkRecord(1, 0, "a"),
+        ChunkRecord(1, 1, "b"),
+        ChunkRecord(1, 2, "c"),
+        ChunkRecord(2, 0, "d"),
+        ChunkRecord(2, 1, "e"),
+    ]
+    assert records[4].chunk_id == "2__1"
+
+
+def test_iter_chunk_batches_is_lazy() -> None:
+    def documents() -> Iterator[tuple[int, str]]:
+        yield 1, "a b"
+        raise AssertionError("read past the first batch")
+
+    batches = iter_chunk_batches(documents(), str.split, batch_size=2)
+    assert next(batches) == [ChunkRecord(1, 0, "a"), ChunkRecord(1, 1, "b")]
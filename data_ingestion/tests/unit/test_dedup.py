@@ -0,0 +1,85 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sqlite3
+
+import pytest
+from data_ingestion_pipeline.utils.dedup import merge_dedup_script, stale_chunks_query
+
+
+def make_tables() -> sqlite3.Connection:
+    connection = sqlite3.connect(":memory:")
+    connection.executescript(
+        """
+        CREATE TABLE target (question_id INT, chunk_id TEXT, text_chunk TEXT,
+            PRIMARY KEY (question_id, chunk_id));
+        CREATE TABLE source (question_id INT, chunk_id TEXT, text_chunk TEXT);
+        INSERT INTO target VALUES (1, '1__0', 'old'), (1, '1__1', 'old'),
+            (1, '1__2', 'old'), (2, '2__0', 'untouched');
+        INSERT INTO source VALUES (1, '1__0', 'new'), (1, '1__1', 'new'),
+            (3, '3__0', 'inserted');
+        """
+    )
+    return connection
+
+
+def to_sqlite(sql: str) -> str:
+    return sql.replace("`project.dataset.deduped`", "target").replace(
+        "`project.dataset.run`", "source"
+    )
+
+
+def run_in_sqlite(script: str) -> list[tuple]:
+    """Run the script's DELETE against SQLite, then the MERGE as an UPSERT.
+
+    SQLite has no MERGE, so its semantics are replayed with the equivalent UPSERT.
+    """
+    connection = make_tables()
+    delete = script.split("DELETE FROM", 1)[1].split(";", 1)[0]
+    connection.execute(f"DELETE FROM {to_sqlite(delete)}")
+    connection.execute(
+        """
+        INSERT INTO target SELECT * FROM source WHERE TRUE
+        ON CONFLICT (question_id, chunk_id) DO UPDATE SET text_chunk = excluded.text_chunk
+        """
+    )
+    return connection.execute("SELECT * FROM target ORDER BY chunk_id").fetchall()
+
+
+def test_merge_dedup_script_upserts_and_deletes_stale_chunks() -> None:
+    script = merge_dedup_script(
+        "project.dataset.deduped",
+        "project.dataset.run",
+        ["question_id", "chunk_id", "text_chunk"],
+    )
+    assert "BEGIN TRANSACTION;" in script and "COMMIT TRANSACTION;" in script
+    assert "`text_chunk` = source.`text_chunk`" in script
+    assert "`chunk_id` = source" not in script
+    assert run_in_sqlite(script) == [
+        (1, "1__0", "new"),
+        (1, "1__1", "new"),
+        (2, "2__0", "untouched"),
+        (3, "3__0", "inserted"),
+    ]
+
+
+def test_merge_dedup_script_requires_key_columns() -> None:
+    with pytest.raises(ValueError):
+        merge_dedup_script("t", "s", ["question_id", "text_chunk"])
+
+
+def test_stale_chunks_query_selects_chunks_the_merge_deletes() -> None:
+    query = stale_chunks_query("project.dataset.deduped", "project.dataset.run")
+    rows = make_tables().execute(to_sqlite(query)).fetchall()
+    assert rows == [("1__2",)]
@@ -0,0 +1,44 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from data_ingestion_pipeline.utils.embedding_cache import (
+    SQLiteEmbeddingCache,
+    embed_with_cache,
+)
+
+
+def test_embed_with_cache_only_embeds_misses() -> None:
+    calls: list[list[str]] = []
+
+    def embed(texts: list[str]) -> list[list[float]]:
+        calls.append(texts)
+        return [[float(len(text))] for text in texts]
+
+    cache = SQLiteEmbeddingCache()
+    vectors, stats = embed_with_cache(["a", "bb", "a"], embed, cache, "model")
+    assert vectors == [[1.0], [2.0], [1.0]]
+    assert calls == [["a", "bb"]]
+    assert (stats.hits, stats.misses) == (0, 3)
+
+    vectors, stats = embed_with_cache(["bb", "ccc"], embed, cache, "model")
+    assert vectors == [[2.0], [3.0]]
+    assert calls[-1] == ["ccc"]
+    assert (stats.hits, stats.misses) == (1, 1)
+
+
+def test_cache_is_keyed_by_model() -> None:
+    cache = SQLiteEmbeddingCache()
+    cache.put_many("model-a", {"key": [1.0]})
+    assert cache.get_many("model-a", ["key"]) == {"key": [1.0]}
+    assert cache.get_many("model-b", ["key"]) == {}
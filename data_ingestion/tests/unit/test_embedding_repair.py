@@ -0,0 +1,89 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from data_ingestion_pipeline.utils.embedding_repair import (
+    EmbeddingRepairer,
+    failed_indices,
+)
+from data_ingestion_pipeline.utils.embedding_scheduler import EmbeddingScheduler
+
+
+class QuotaError(Exception):
+    pass
+
+
+class FlakyClient:
+    """Fails the first `failures` calls embedding a given text."""
+
+    def __init__(self, failures: dict[str, int]) -> None:
+        self.failures = dict(failures)
+        self.calls: list[list[str]] = []
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        self.calls.append(texts)
+        if self.failures.get(texts[0], 0) > 0:
+            self.failures[texts[0]] -= 1
+            raise QuotaError("Quota exceeded")
+        return [[float(len(text))] for text in texts]
+
+
+def make_scheduler(client: FlakyClient) -> EmbeddingScheduler:
+    return EmbeddingScheduler(
+        client,
+        max_concurrency=1,
+        max_batch_size=1,
+        max_retries=0,
+        retry_on=(QuotaError,),
+        sleep=lambda seconds: None,
+    )
+
+
+def test_failed_indices_ignore_empty_statuses() -> None:
+    assert failed_indices(["", "QuotaError", None, "Error"]) == [1, 3]
+
+
+def test_repair_re_embeds_only_failed_rows_with_backoff() -> None:
+    client = FlakyClient({"b": 2, "dd": 1})
+    scheduler = make_scheduler(client)
+    texts = ["a", "b", "cc", "dd"]
+    run = scheduler.embed(texts)
+    assert failed_indices(run.statuses) == [1, 3]
+    client.calls.clear()
+    waits: list[float] = []
+
+    report = EmbeddingRepairer(
+        scheduler, max_rounds=3, initial_backoff=10, max_backoff=15, sleep=waits.append
+    ).repair(texts, run)
+
+    assert client.calls == [["b"], ["dd"], ["b"]]
+    assert waits == [10, 15]
+    assert run.embeddings == [[1.0], [1.0], [2.0], [2.0]]
+    assert run.statuses == ["", "", "", ""]
+    assert (report.failed, report.repaired, report.rounds) == (2, 2, 2)
+
+
+def test_rows_failing_every_round_keep_their_status() -> None:
+    client = FlakyClient({"b": 10})
+    scheduler = make_scheduler(client)
+    texts = ["a", "b"]
+    run = scheduler.embed(texts)
+
+    report = EmbeddingRepairer(scheduler, max_rounds=2, sleep=lambda s: None).repair(
+        texts, run
+    )
+
+    assert run.statuses == ["", "QuotaError: Quota exceeded"]
+    assert run.embeddings == [[1.0], []]
+    assert report.still_failed == 1
+    assert str(report) == "0 of 1 failed rows repaired in 2 rounds, 1 still failed"
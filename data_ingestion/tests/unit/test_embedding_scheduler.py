@@ -0,0 +1,114 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import urllib.error
+
+from benchmarks.fake_embedding_server import running_server
+from data_ingestion_pipeline.utils.embedding_scheduler import (
+    EmbeddingScheduler,
+    HTTPEmbeddingClient,
+    deterministic_embedding,
+    pack_batches,
+)
+
+
+class QuotaError(Exception):
+    pass
+
+
+class FlakyClient:
+    """Fails the first `failures` calls for each batch starting with a given text."""
+
+    def __init__(self, failures: dict[str, int]) -> None:
+        self.failures = dict(failures)
+        self.calls: list[list[str]] = []
+        self._lock = threading.Lock()
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        with self._lock:
+            self.calls.append(texts)
+            if self.failures.get(texts[0], 0) > 0:
+                self.failures[texts[0]] -= 1
+                raise QuotaError("Quota exceeded")
+        return [[float(len(text))] for text in texts]
+
+
+def test_pack_batches_respects_token_and_size_budget() -> None:
+    texts = ["aaaa", "bb", "cccccc", "d", "e", "ffffffffff"]
+    batches = pack_batches(
+        texts, max_batch_tokens=6, max_batch_size=2, length_function=len
+    )
+    assert batches == [[0, 1], [2], [3, 4], [5]]
+
+
+def test_pack_batches_counts_code_by_estimated_tokens() -> None:
+    prose = "how do I sort a list of rows " * 40
+    code = "df[(df['a'] > 1) & (df.b == 2)].sort_values('c');" * 20
+    assert len(code) < len(prose)
+
+    assert pack_batches([prose, prose], max_batch_tokens=700, max_batch_size=10) == [
+        [0, 1]
+    ]
+    assert pack_batches([code, code], max_batch_tokens=700, max_batch_size=10) == [
+        [0],
+        [1],
+    ]
+
+
+def test_scheduler_retries_only_failed_batches() -> None:
+    client = FlakyClient({"b": 2})
+    scheduler = EmbeddingScheduler(
+        client,
+        max_concurrency=3,
+        max_batch_size=1,
+        retry_on=(QuotaError,),
+        sleep=lambda seconds: None,
+    )
+    run = scheduler.embed(["a", "b", "cc"])
+    assert run.embeddings == [[1.0], [1.0], [2.0]]
+    assert run.statuses == ["", "", ""]
+    assert run.retries == 2
+    assert sorted(texts[0] for texts in client.calls) == ["a", "b", "b", "b", "cc"]
+
+
+def test_scheduler_marks_rows_of_exhausted_batches() -> None:
+    client = FlakyClient({"b": 10})
+    scheduler = EmbeddingScheduler(
+        client,
+        max_batch_size=1,
+        max_retries=2,
+        retry_on=(QuotaError,),
+        sleep=lambda seconds: None,
+    )
+    run = scheduler.embed(["a", "b"])
+    assert run.embeddings == [[1.0], []]
+    assert run.statuses == ["", "QuotaError: Quota exceeded"]
+    assert (run.failed_batches, run.failed_rows) == (1, 1)
+
+
+def test_scheduler_against_fake_server() -> None:
+    texts = [f"chunk {i}" for i in range(50)]
+    with running_server(latency=0, error_rate=0.3, max_texts=8, dimensions=4) as url:
+        scheduler = EmbeddingScheduler(
+            HTTPEmbeddingClient(url),
+            max_concurrency=4,
+            max_batch_size=8,
+            max_retries=20,
+            initial_backoff=0.001,
+            retry_on=(urllib.error.HTTPError,),
+        )
+        run = scheduler.embed(texts)
+    assert run.statuses == [""] * len(texts)
+    assert run.embeddings == [deterministic_embedding(text, 4) for text in texts]
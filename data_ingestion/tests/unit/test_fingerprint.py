@@ -0,0 +1,38 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from data_ingestion_pipeline.utils.fingerprint import (
+    content_fingerprint,
+    fingerprint_salt,
+)
+
+
+def test_content_fingerprint_is_stable() -> None:
+    text = "# Title\nBody\n\n## Answer 1:\nAnswer"
+    assert content_fingerprint(text) == content_fingerprint(text)
+    assert content_fingerprint(text) != content_fingerprint(text + " ")
+
+
+def test_content_fingerprint_depends_on_salt() -> None:
+    text = "# Title\nBody"
+    assert content_fingerprint(text, salt="1500:20") != content_fingerprint(
+        text, salt="1000:20"
+    )
+
+
+def test_fingerprint_salt_keeps_default_settings_out() -> None:
+    assert fingerprint_salt(1500, 20, "model") == "1500:20:model"
+    assert fingerprint_salt(1500, 20, "model", "sections", "tokens") == (
+        "1500:20:model:sections:tokens"
+    )
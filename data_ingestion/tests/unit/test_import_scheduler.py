@@ -0,0 +1,202 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections.abc import Callable
+from types import SimpleNamespace
+from typing import Any
+
+from data_ingestion_pipeline.utils.import_scheduler import (
+    ShardedImporter,
+    expand_wildcard,
+)
+
+
+class FakeOperation:
+    """Stand-in for an import operation finishing after a number of polls."""
+
+    def __init__(
+        self,
+        rows: int,
+        polls: int,
+        failed: int = 0,
+        error: BaseException | None = None,
+        on_done: Callable[[], None] = lambda: None,
+    ) -> None:
+        self._polls = polls
+        self._rows = rows
+        self._failed = failed
+        self._error = error
+        self._on_done = on_done
+        self.metadata = SimpleNamespace(success_count=0, failure_count=0)
+
+    def done(self) -> bool:
+        self._polls -= 1
+        if self._polls == 0:
+            self.metadata = SimpleNamespace(
+                success_count=self._rows - self._failed,
+                failure_count=self._failed,
+                total_count=self._rows,
+            )
+            self._on_done()
+        return self._polls <= 0
+
+    def exception(self) -> BaseException | None:
+        return self._error
+
+    def result(self) -> SimpleNamespace:
+        samples = [SimpleNamespace(message="bad document")] * self._failed
+        return SimpleNamespace(error_samples=samples)
+
+
+class FakeClock:
+    """Clock advanced by the importer's sleeps."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def time(self) -> float:
+        return self.now
+
+
+class FakeImportClient:
+    def __init__(
+        self,
+        outcomes: dict[str, list[dict[str, Any] | Exception]],
+        clock: FakeClock | None = None,
+    ) -> None:
+        self._outcomes = outcomes
+        self._clock = clock
+        self.submitted: list[list[str]] = []
+        self.submitted_at: list[float] = []
+        self.running = 0
+        self.max_running = 0
+
+    def _finished(self) -> None:
+        self.running -= 1
+
+    def submit(self, uris: list[str]) -> FakeOperation:
+        self.submitted.append(uris)
+        self.submitted_at.append(self._clock.now if self._clock else 0.0)
+        outcomes = self._outcomes.get(uris[0], [])
+        outcome = outcomes.pop(0) if outcomes else {}
+        if isinstance(outcome, Exception):
+            raise outcome
+        operation = FakeOperation(
+            rows=10 * len(uris), polls=2, on_done=self._finished, **outcome
+        )
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        return operation
+
+
+def test_imports_groups_with_bounded_concurrency() -> None:
+    client = FakeImportClient({})
+    sleeps: list[float] = []
+    importer = ShardedImporter(
+        client.submit, max_concurrency=2, shards_per_request=2, sleep=sleeps.append
+    )
+
+    report = importer.run([f"gs://b/s{i}" for i in range(7)])
+
+    assert client.submitted[0] == ["gs://b/s0", "gs://b/s1"]
+    assert len(client.submitted) == 4
+    assert client.max_running == 2
+    assert not report.failed
+    assert report.success_count == 70
+    assert sleeps
+
+
+def test_resubmits_only_failed_groups() -> None:
+    client = FakeImportClient(
+        {
+            "gs://b/s1": [{"error": RuntimeError("quota")}],
+            "gs://b/s2": [{"failed": 3}, {"failed": 3}, {"failed": 3}],
+        }
+    )
+    clock = FakeClock()
+    importer = ShardedImporter(
+        client.submit, max_attempts=3, sleep=clock.sleep, clock=clock.time
+    )
+
+    report = importer.run(["gs://b/s0", "gs://b/s1", "gs://b/s2"])
+
+    submitted = [uris[0] for uris in client.submitted]
+    assert submitted.count("gs://b/s0") == 1
+    assert submitted.count("gs://b/s1") == 2
+    assert submitted.count("gs://b/s2") == 3
+    assert [group.uris for group in report.failed] == [["gs://b/s2"]]
+    assert report.failed[0].failure_count == 3
+    assert report.failed[0].error_samples == ["bad document"] * 3
+
+
+def test_backs_off_before_resubmitting() -> None:
+    clock = FakeClock()
+    client = FakeImportClient(
+        {"gs://b/s0": [RuntimeError("throttled"), {"failed": 1}, {}]}, clock
+    )
+    importer = ShardedImporter(
+        client.submit,
+        max_attempts=3,
+        poll_interval=1,
+        initial_backoff=30,
+        sleep=clock.sleep,
+        clock=clock.time,
+    )
+
+    report = importer.run(["gs://b/s0"])
+
+    assert not report.failed
+    assert report.groups[0].attempts == 3
+    # 30s after the failed submit, 60s after the import failing a poll later
+    assert client.submitted_at == [0, 30, 91]
+
+
+def test_splits_a_bigquery_extract_across_requests() -> None:
+    blobs = {
+        "run/output_files000000000001.jsonl",
+        "run/output_files000000000000.jsonl",
+        "run/output_files000000000002.jsonl",
+        "run/deleted_chunks000000000000.jsonl",
+        "run/output_files.json",
+    }
+    listed: list[tuple[str, str]] = []
+
+    def list_names(bucket: str, prefix: str) -> list[str]:
+        listed.append((bucket, prefix))
+        return [name for name in blobs if name.startswith(prefix)]
+
+    uris = expand_wildcard("gs://b/run/output_files*.jsonl", list_names)
+    client = FakeImportClient({})
+    importer = ShardedImporter(
+        client.submit, max_concurrency=2, shards_per_request=2, sleep=lambda _: None
+    )
+    report = importer.run(uris)
+
+    assert listed == [("b", "run/output_files")]
+    assert client.submitted == [
+        [
+            "gs://b/run/output_files000000000000.jsonl",
+            "gs://b/run/output_files000000000001.jsonl",
+        ],
+        ["gs://b/run/output_files000000000002.jsonl"],
+    ]
+    assert report.success_count == 30
+    assert expand_wildcard("gs://b/run/missing*.jsonl", list_names) == [
+        "gs://b/run/missing*.jsonl"
+    ]
@@ -0,0 +1,157 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+from pathlib import Path
+
+import pytest
+from benchmarks.synthetic import make_questions
+from data_ingestion_pipeline.utils.embedding_scheduler import (
+    DeterministicEmbeddingClient,
+    EmbeddingScheduler,
+)
+from data_ingestion_pipeline.utils.rehydration import (
+    JSONLQuestionIndex,
+    ParentTextStore,
+)
+from data_ingestion_pipeline.utils.sinks import SQLiteChunkSink
+from data_ingestion_pipeline.utils.sources import IterableQuestionSource
+
+
+def chunk(question_id: int, chunk_idx: int, text: str) -> dict:
+    return {
+        "chunk_id": f"{question_id}__{chunk_idx}",
+        "question_id": question_id,
+        "text_chunk": text,
+        "embedding": [0.5, -1.0],
+        "embedding_status": "",
+        "content_hash": f"hash {question_id}",
+        "last_edit_date": None,
+        "question_text": "question",
+        "full_text_md": "markdown",
+        "creation_timestamp": "2025-01-01T00:00:00",
+    }
+
+
+def read_ids(path: str) -> list[str]:
+    return sorted(
+        json.loads(line)["id"] for line in Path(path).read_text().splitlines()
+    )
+
+
+def test_sqlite_sink_merges_and_exports_delta(tmp_path: Path) -> None:
+    state = str(tmp_path / "state.sqlite")
+    sink = SQLiteChunkSink(state, str(tmp_path / "first"))
+    assert sink.is_empty()
+    sink.merge([chunk(1, 0, "a"), chunk(1, 1, "b"), chunk(2, 0, "c")])
+    sink.close()
+
+    sink = SQLiteChunkSink(state, str(tmp_path / "second"))
+    assert sink.fingerprints([1, 3]) == {1: "hash 1"}
+    assert sink.merge([chunk(1, 0, "a2")]) == ["1__1"]
+    assert [row["text_chunk"] for row in sink.chunks([1, 2])] == ["a2", "c"]
+
+    result = sink.export(full=False)
+    assert (result.num_documents, result.num_deleted) == (1, 1)
+    assert read_ids(result.documents_path) == ["1__0"]
+    assert read_ids(result.deleted_chunks_path) == ["1__1"]
+    document = json.loads(Path(result.documents_path).read_text())
+    assert json.loads(document["json_data"])["embedding"] == [0.5, -1.0]
+
+    assert read_ids(sink.export(full=True).documents_path) == ["1__0", "2__0"]
+
+
+def bigquery_exported_ids(rows: list[dict]) -> list[str]:
+    """Chunk ids kept by the WHERE clause of `export_chunks`: chunk_id IS NOT
+    NULL AND ARRAY_LENGTH(embedding) > 0 AND IFNULL(embedding_status, "") = ""."""
+    return sorted(
+        row["chunk_id"]
+        for row in rows
+        if row["chunk_id"] is not None
+        and len(row["embedding"]) > 0
+        and not row["embedding_status"]
+    )
+
+
+def test_sqlite_export_matches_bigquery_export(tmp_path: Path) -> None:
+    failed = {**chunk(1, 1, "b"), "embedding": [], "embedding_status": "Timeout"}
+    rows = [chunk(1, 0, "a"), failed, chunk(2, 0, "c")]
+    sink = SQLiteChunkSink(str(tmp_path / "state.sqlite"), str(tmp_path / "out"))
+    sink.merge(rows)
+
+    for full in (True, False):
+        documents = sink.documents(full=full)
+        assert sorted(document["id"] for document in documents) == (
+            bigquery_exported_ids(rows)
+        )
+    assert bigquery_exported_ids(rows) == ["1__0", "2__0"]
+    assert sink.export(full=True).num_documents == 2
+
+
+def test_normalized_export_rehydrates_parent_text(tmp_path: Path) -> None:
+    sink = SQLiteChunkSink(str(tmp_path / "state.sqlite"), str(tmp_path / "out"))
+    sink.merge([chunk(1, 0, "a"), chunk(1, 1, "b"), chunk(2, 0, "c")])
+    result = sink.export(full=True, normalized=True)
+    assert result.num_questions == 2
+
+    documents = [
+        json.loads(json.loads(line)["json_data"])
+        for line in Path(result.documents_path).read_text().splitlines()
+    ]
+    assert all("full_text_md" not in document for document in documents)
+
+    store = ParentTextStore(JSONLQuestionIndex([result.questions_path]))
+    rehydrated = store.rehydrate(documents)
+    assert [document["full_text_md"] for document in rehydrated] == ["markdown"] * 3
+    assert rehydrated[0]["content"] == "a"
+    store.rehydrate(documents)
+    assert store.fetched == 2
+
+
+def test_run_ingestion_skips_unchanged_questions(tmp_path: Path) -> None:
+    pytest.importorskip("markdownify")
+    from data_ingestion_pipeline.utils.ingestion import IngestionStats, run_ingestion
+
+    questions = make_questions(30)
+    scheduler = EmbeddingScheduler(DeterministicEmbeddingClient(dimensions=8))
+
+    def ingest(records: list[dict]) -> IngestionStats:
+        sink = SQLiteChunkSink(str(tmp_path / "state.sqlite"), str(tmp_path / "out"))
+        stats = run_ingestion(
+            IterableQuestionSource(records),
+            sink,
+            scheduler,
+            model_name="test",
+            chunk_size=200,
+            batch_size=7,
+            markdown_workers=1,
+        )
+        sink.close()
+        return stats
+
+    first = ingest(questions)
+    assert first.export is not None
+    assert first.export.reconciliation_mode == "FULL"
+    assert first.export.num_documents == first.chunks > 30
+    assert first.unchanged_questions == 0
+
+    questions[0]["question_title"] = "Changed title"
+    second = ingest(questions[:5])
+    assert second.unchanged_questions == 4
+    assert second.export is not None
+    assert second.export.reconciliation_mode == "INCREMENTAL"
+    assert second.export.num_documents == sum(
+        1 for line in Path(second.export.documents_path).read_text().splitlines()
+    )
+    assert read_ids(second.export.documents_path)[0].startswith("1__")
@@ -0,0 +1,58 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+
+import pytest
+from data_ingestion_pipeline.utils.instrumentation import StageRecorder
+
+
+class FakeMetrics:
+    def __init__(self) -> None:
+        self.logged: dict[str, float] = {}
+
+    def log_metric(self, metric: str, value: float) -> None:
+        self.logged[metric] = value
+
+
+def test_stage_totals_accumulate_across_calls(caplog: pytest.LogCaptureFixture) -> None:
+    caplog.set_level(logging.INFO)
+    recorder = StageRecorder(run_name="test")
+    for rows in (3, 4):
+        with recorder.stage("chunk") as metrics:
+            metrics.rows_in = rows
+            metrics.chunks = rows * 2
+
+    chunk = recorder.stages["chunk"]
+    assert (chunk.calls, chunk.rows_in, chunk.chunks) == (2, 7, 14)
+    assert chunk.seconds > 0 and chunk.peak_rss_bytes > 0
+
+    lines = [json.loads(message) for message in caplog.messages]
+    assert [line["rows_in"] for line in lines] == [3, 4]
+    assert lines[0]["message"] == "stage_metrics" and lines[0]["run"] == "test"
+
+    metrics = FakeMetrics()
+    recorder.log_to(metrics)
+    assert metrics.logged["chunk_chunks"] == 14
+    assert "chunk_peak_rss_mb" in metrics.logged
+
+
+def test_stage_is_recorded_when_the_step_raises() -> None:
+    recorder = StageRecorder()
+    with pytest.raises(RuntimeError):
+        with recorder.stage("embed") as metrics:
+            metrics.rows_in = 1
+            raise RuntimeError("quota")
+    assert recorder.stages["embed"].rows_in == 1
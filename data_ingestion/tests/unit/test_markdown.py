@@ -0,0 +1,57 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from data_ingestion_pipeline.utils.markdown import convert_in_batches
+
+
+def test_convert_in_batches_preserves_order() -> None:
+    values = [f"value {i}" for i in range(1000)]
+    result = convert_in_batches(values, str.upper, max_workers=4, batch_size=64)
+    assert result == [value.upper() for value in values]
+
+
+def test_convert_in_batches_single_worker() -> None:
+    assert convert_in_batches(["a", "b"], str.upper, max_workers=1) == ["A", "B"]
+
+
+def test_convert_in_batches_rejects_empty_batches() -> None:
+    with pytest.raises(ValueError):
+        convert_in_batches(["a"], str.upper, batch_size=0)
+
+
+def test_create_answers_markdown() -> None:
+    pytest.importorskip("markdownify")
+    from data_ingestion_pipeline.utils.markdown import create_answers_markdown
+
+    answers = [{"body": "<p>First</p>"}, {"body": "<p><b>Second</b></p>"}]
+    assert create_answers_markdown(answers) == (
+        "\n\n## Answer 1:\nFirst\n\n## Answer 2:\n**Second**"
+    )
+
+
+def test_convert_questions() -> None:
+    pytest.importorskip("markdownify")
+    from data_ingestion_pipeline.utils.markdown import convert_questions
+
+    documents = convert_questions(
+        ["Title", "Unanswered"],
+        ["<p>Body</p>", "<p>Other</p>"],
+        [[{"body": "<p>Answer</p>"}], None],
+        max_workers=1,
+    )
+    assert documents == [
+        "# Title\nBody\n\n\n## Answer 1:\nAnswer",
+        "# Unanswered\nOther\n",
+    ]
@@ -0,0 +1,74 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from data_ingestion_pipeline.utils.near_duplicates import (
+    NearDuplicateDetector,
+    NearDuplicateFilter,
+    NearDuplicateStats,
+)
+
+QUOTED = " ".join(f"word{i}" for i in range(200))
+EDITED = QUOTED.replace("word100", "changed")
+OTHER = " ".join(f"other{i}" for i in range(200))
+
+
+def test_near_duplicates_map_onto_the_first_similar_text() -> None:
+    detector = NearDuplicateDetector(threshold=0.9)
+    texts = [QUOTED, OTHER, EDITED, QUOTED, "short text", "short text"]
+    assert detector.canonical_indices(texts) == [0, 1, 0, 0, 4, 4]
+
+
+def test_threshold_controls_what_is_a_near_duplicate() -> None:
+    # Half of the shingles differ
+    half = " ".join(QUOTED.split()[:100] + OTHER.split()[:100])
+    strict = NearDuplicateDetector(threshold=0.9)
+    loose = NearDuplicateDetector(threshold=0.2)
+    assert strict.canonical_indices([QUOTED, half]) == [0, 1]
+    assert loose.canonical_indices([QUOTED, half]) == [0, 0]
+
+
+def test_stats_count_savings_per_action() -> None:
+    texts = [QUOTED, EDITED, QUOTED, OTHER]
+    canonical = [0, 0, 0, 3]
+
+    collapse = NearDuplicateStats()
+    collapse.add(texts, canonical, "collapse")
+    assert (collapse.near_duplicates, collapse.embeddings_saved) == (1, 1)
+    assert collapse.index_entries_saved == 0
+
+    drop = NearDuplicateStats()
+    drop.add(texts, canonical, "drop")
+    assert drop.index_entries_saved == 2
+
+
+def test_filter_keeps_canonical_texts_per_action() -> None:
+    texts = [QUOTED, OTHER, EDITED]
+
+    assert NearDuplicateFilter().apply(texts) == [(0, 0), (1, 1), (2, 2)]
+    assert NearDuplicateFilter(0.9, "collapse").apply(texts) == [
+        (0, 0),
+        (1, 1),
+        (2, 0),
+    ]
+    drop = NearDuplicateFilter(0.9, "drop")
+    assert drop.apply(texts) == [(0, 0), (1, 1)]
+    assert drop.stats.index_entries_saved == 1
+    with pytest.raises(ValueError):
+        NearDuplicateFilter(0.9, "merge")
+
+
+def test_invalid_threshold() -> None:
+    with pytest.raises(ValueError):
+        NearDuplicateDetector(threshold=0)
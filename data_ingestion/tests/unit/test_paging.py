@@ -0,0 +1,37 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections.abc import Iterator
+
+from data_ingestion_pipeline.utils.paging import process_pages
+
+
+def test_each_page_is_written_before_the_next_is_read() -> None:
+    events = []
+
+    def pages() -> Iterator[list[int]]:
+        for start in range(0, 10, 4):
+            events.append(f"read {start}")
+            yield list(range(start, min(start + 4, 10)))
+
+    def write(page: list[str]) -> None:
+        events.append(f"write {len(page)}")
+
+    stats = process_pages(
+        pages(), lambda page: [str(n) for n in page if n % 2 == 0], write
+    )
+
+    assert events == ["read 0", "write 2", "read 4", "write 2", "read 8", "write 1"]
+    assert (stats.pages, stats.rows_in, stats.rows_out) == (3, 10, 5)
+    assert stats.max_page_rows == 4
@@ -0,0 +1,60 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from datetime import date, datetime, timedelta
+
+import pytest
+from data_ingestion_pipeline.utils.partitions import (
+    date_partitions,
+    plan_partitions,
+    processing_window,
+)
+
+
+def test_partitions_cover_window_without_overlap() -> None:
+    start, end = date(2020, 1, 1), date(2020, 1, 31)
+
+    partitions = date_partitions(start, end, partition_days=7)
+
+    assert partitions[0] == (date(2020, 1, 1), date(2020, 1, 7))
+    assert partitions[-1] == (date(2020, 1, 29), date(2020, 1, 31))
+    days = [
+        first + timedelta(days=offset)
+        for first, last in partitions
+        for offset in range((last - first).days + 1)
+    ]
+    assert days == [start + timedelta(days=offset) for offset in range(31)]
+    with pytest.raises(ValueError):
+        date_partitions(start, end, partition_days=0)
+
+
+def test_plan_has_a_single_partition_by_default() -> None:
+    start, end = date(2020, 1, 1), date(2020, 1, 10)
+
+    assert plan_partitions(start, end) == [
+        {"window_start": "2020-01-01", "window_end": "2020-01-10"}
+    ]
+    assert plan_partitions(start, end, partition_days=5) == [
+        {"window_start": "2020-01-01", "window_end": "2020-01-05"},
+        {"window_start": "2020-01-06", "window_end": "2020-01-10"},
+    ]
+
+
+def test_unscheduled_window_ends_five_years_before_now() -> None:
+    now = datetime(2025, 6, 1)
+
+    start, end = processing_window("1970-01-01T00:00:00Z", 30, now=now)
+
+    assert end == now - timedelta(days=5 * 365)
+    assert end - start == timedelta(days=30)
@@ -0,0 +1,89 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from data_ingestion_pipeline.utils.readiness import (
+    DiscoveryEngineDocumentLookup,
+    wait_until_visible,
+)
+
+
+class NotFound(Exception):
+    pass
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeDocumentClient:
+    """Stand-in for DocumentServiceClient indexing each document after a delay."""
+
+    def __init__(self, clock: FakeClock, visible_after: dict[str, float]) -> None:
+        self._clock = clock
+        self._visible_after = visible_after
+        self.lookups = 0
+
+    def document_path(self, **parts: str) -> str:
+        return parts["document"]
+
+    def get_document(self, name: str) -> dict:
+        self.lookups += 1
+        if self._clock() < self._visible_after.get(name, float("inf")):
+            raise NotFound(name)
+        return {"id": name}
+
+
+def make_lookup(client: FakeDocumentClient) -> DiscoveryEngineDocumentLookup:
+    return DiscoveryEngineDocumentLookup(
+        client, "project", "us", "store", not_found=NotFound
+    )
+
+
+def test_polls_with_backoff_until_all_visible() -> None:
+    clock = FakeClock()
+    client = FakeDocumentClient(clock, {"a": 0.0, "b": 5.0, "c": 12.0})
+    result = wait_until_visible(
+        ["a", "b", "c"], make_lookup(client), sleep=clock.sleep, clock=clock
+    )
+    assert result.ready and result.missing == []
+    assert clock.sleeps == [2.0, 4.0, 8.0]
+    assert (result.seconds, result.polls) == (14.0, 4)
+    # Visible documents are not looked up again
+    assert client.lookups == 3 + 2 + 2 + 1
+
+
+def test_gives_up_at_the_deadline() -> None:
+    clock = FakeClock()
+    client = FakeDocumentClient(clock, {"a": 0.0})
+    result = wait_until_visible(
+        ["a", "b"],
+        make_lookup(client),
+        timeout=20,
+        max_delay=8,
+        sleep=clock.sleep,
+        clock=clock,
+    )
+    assert not result.ready
+    assert result.missing == ["b"]
+    assert clock.sleeps == [2.0, 4.0, 8.0, 6.0]
+    assert clock.now == 20
@@ -0,0 +1,92 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+
+from data_ingestion_pipeline.utils.schema_reconciler import (
+    BlobHashCache,
+    SchemaReconciler,
+    embedding_field_schema,
+)
+
+
+class FakeBlob:
+    def __init__(self) -> None:
+        self.text: str | None = None
+
+    def exists(self) -> bool:
+        return self.text is not None
+
+    def download_as_text(self) -> str:
+        return self.text or ""
+
+    def upload_from_string(self, data: str, content_type: str) -> None:
+        self.text = data
+
+
+class FakeSchemaService:
+    def __init__(self, schema: dict) -> None:
+        self.json_schema = json.dumps(schema)
+        self.gets = 0
+        self.updates = 0
+
+    def get_schema(self) -> str:
+        self.gets += 1
+        return self.json_schema
+
+    def update_schema(self, json_schema: str) -> None:
+        self.updates += 1
+        self.json_schema = json_schema
+
+
+def make_reconciler(
+    service: FakeSchemaService, blob: FakeBlob | None
+) -> SchemaReconciler:
+    cache = BlobHashCache(blob) if blob is not None else None
+    return SchemaReconciler(service.get_schema, service.update_schema, cache)
+
+
+def test_updates_only_on_change() -> None:
+    service = FakeSchemaService({"type": "object", "properties": {"title": {}}})
+    reconciler = make_reconciler(service, blob=None)
+
+    first = reconciler.reconcile("schema", "embedding", embedding_field_schema(768))
+    second = reconciler.reconcile("schema", "embedding", embedding_field_schema(768))
+    resized = reconciler.reconcile("schema", "embedding", embedding_field_schema(256))
+
+    assert [first.action, second.action, resized.action] == [
+        "updated",
+        "unchanged",
+        "updated",
+    ]
+    assert service.updates == 2
+    schema = json.loads(service.json_schema)
+    assert schema["properties"]["embedding"]["dimension"] == 256
+    assert "title" in schema["properties"]
+
+
+def test_cached_hash_skips_schema_calls() -> None:
+    field = embedding_field_schema(768)
+    field_with_defaults = field | {"retrievable": False}
+    service = FakeSchemaService({"properties": {"embedding": field_with_defaults}})
+    blob = FakeBlob()
+
+    first = make_reconciler(service, blob).reconcile("schema", "embedding", field)
+    second = make_reconciler(service, blob).reconcile("schema", "embedding", field)
+
+    assert first.action == "unchanged"
+    assert second.action == "cached"
+    assert blob.text == first.schema_hash
+    assert service.gets == 1
+    assert service.updates == 0
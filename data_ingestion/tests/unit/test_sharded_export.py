@@ -0,0 +1,74 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import hashlib
+import json
+from pathlib import Path
+
+from data_ingestion_pipeline.utils.sharded_export import (
+    iter_sharded_jsonl,
+    manifest_shards,
+    verify_shards,
+    write_sharded_jsonl,
+)
+
+
+def found_shards(directory: Path) -> dict[str, tuple[int, str]]:
+    """Size and base64 MD5 of each shard, as Cloud Storage reports them."""
+    return {
+        path.name: (
+            path.stat().st_size,
+            base64.b64encode(hashlib.md5(path.read_bytes()).digest()).decode(),
+        )
+        for path in directory.glob("*.jsonl.gz")
+    }
+
+
+def test_shards_round_trip_in_order(tmp_path: Path) -> None:
+    documents = [{"id": f"{i}__0", "json_data": "x" * 50} for i in range(100)]
+    manifest = write_sharded_jsonl(
+        (json.dumps(document) for document in documents),
+        str(tmp_path),
+        target_shard_bytes=1000,
+        max_workers=3,
+    )
+    shards = manifest_shards(manifest)
+    assert manifest["num_rows"] == 100 == sum(shard.rows for shard in shards)
+    assert len(shards) > 5
+    assert [shard.name for shard in shards][:2] == [
+        "documents-00000.jsonl.gz",
+        "documents-00001.jsonl.gz",
+    ]
+    assert list(iter_sharded_jsonl(str(tmp_path))) == documents
+    assert verify_shards(manifest, found_shards(tmp_path)) == []
+
+
+def test_verify_reports_missing_and_truncated_shards(tmp_path: Path) -> None:
+    lines = (json.dumps({"id": str(i)}) for i in range(50))
+    manifest = write_sharded_jsonl(lines, str(tmp_path), target_shard_bytes=200)
+    first, second, *_ = manifest_shards(manifest)
+    (tmp_path / first.name).unlink()
+    data = (tmp_path / second.name).read_bytes()
+    (tmp_path / second.name).write_bytes(data[:-4])
+
+    problems = verify_shards(manifest, found_shards(tmp_path))
+    assert len(problems) == 2
+    assert problems[0] == f"{first.name} is missing"
+
+
+def test_empty_export(tmp_path: Path) -> None:
+    manifest = write_sharded_jsonl([], str(tmp_path))
+    assert manifest["num_rows"] == 0
+    assert manifest["shards"] == []
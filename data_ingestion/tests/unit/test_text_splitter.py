@@ -0,0 +1,133 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+
+import pytest
+from data_ingestion_pipeline.utils.text_splitter import (
+    OffsetTextSplitter,
+    SectionTextSplitter,
+    make_text_splitter,
+)
+
+
+def _documents() -> list[str]:
+    rng = random.Random(0)
+    words = ["pandas", "df", "x", "import", "", "  ", "\t", "a" * 40, "code()"]
+    separators = ["\n\n", "\n", " ", "  ", "\n\n\n", ""]
+    documents = ["", " ", "\n\n", "short", "  padded  \n\n"]
+    for _ in range(200):
+        documents.append(
+            "".join(
+                rng.choice(words) + rng.choice(separators)
+                for _ in range(rng.randint(1, 400))
+            )
+        )
+    return documents
+
+
+@pytest.mark.parametrize(
+    ("chunk_size", "chunk_overlap"), [(1500, 20), (100, 20), (50, 0), (10, 5), (1, 0)]
+)
+def test_matches_langchain_chunk_for_chunk(chunk_size: int, chunk_overlap: int) -> None:
+    text_splitters = pytest.importorskip("langchain_text_splitters")
+    reference = text_splitters.RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, length_function=len
+    )
+    splitter = OffsetTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+    for document in _documents():
+        assert splitter.split_text(document) == reference.split_text(document)
+
+
+def test_offsets_slice_the_original_text() -> None:
+    text = "# Title\nQuestion body\n\n## Answer 1:\nFirst answer text"
+    splitter = OffsetTextSplitter(chunk_size=20, chunk_overlap=5)
+
+    offsets = splitter.split_offsets(text)
+    assert [text[start:end] for start, end in offsets] == splitter.split_text(text)
+    assert splitter.split_text(text) == [
+        "# Title",
+        "Question body",
+        "## Answer 1:",
+        "First answer text",
+    ]
+
+
+def test_split_texts_preserves_order() -> None:
+    splitter = OffsetTextSplitter(chunk_size=10, chunk_overlap=0)
+    texts = [f"document number {i}" for i in range(50)]
+    assert splitter.split_texts(texts, max_workers=2, batch_size=8) == [
+        splitter.split_text(text) for text in texts
+    ]
+
+
+def test_rejects_overlap_larger_than_chunk_size() -> None:
+    with pytest.raises(ValueError):
+        OffsetTextSplitter(chunk_size=10, chunk_overlap=20)
+
+
+def test_sections_keep_whole_answers_together() -> None:
+    question = "# Title\nQuestion body"
+    first_answer = "## Answer 1:\n" + "word " * 8 + "\n\nSecond paragraph of answer one"
+    second_answer = "## Answer 2:\nShort answer"
+    text = "\n\n".join([question, first_answer, second_answer])
+
+    # Recursive splitting packs the end of an answer with the next answer
+    assert (
+        OffsetTextSplitter(chunk_size=100, chunk_overlap=10).split_text(text)[-1]
+        == f"Second paragraph of answer one\n\n{second_answer}"
+    )
+    assert SectionTextSplitter(chunk_size=100, chunk_overlap=10).split_text(text) == [
+        question,
+        first_answer,
+        second_answer,
+    ]
+
+
+def test_sections_split_oversized_sections_recursively() -> None:
+    long_answer = "## Answer 1:\n" + "word " * 40
+    text = f"# Title\nQuestion\n\n{long_answer}\n\n## Answer 2:\nShort"
+    splitter = SectionTextSplitter(chunk_size=50, chunk_overlap=10)
+
+    chunks = splitter.split_text(text)
+
+    assert chunks[0] == "# Title\nQuestion"
+    assert chunks[-1] == "## Answer 2:\nShort"
+    assert chunks[1:-1] == OffsetTextSplitter(
+        chunk_size=50, chunk_overlap=10
+    ).split_text(long_answer)
+    assert all(len(chunk) <= 50 for chunk in chunks)
+
+
+def test_sections_ignore_comments_in_code_blocks() -> None:
+    question = "# Title\nHow do I load a CSV?"
+    first_answer = (
+        "## Answer 1:\nUse pandas:\n\n```python\n# load the data\n"
+        "df = pd.read_csv('data.csv')\n```\n\nThen inspect it"
+    )
+    second_answer = "## Answer 2:\n~~~\n# comment\n~~~"
+    text = "\n\n".join([question, first_answer, second_answer])
+
+    assert SectionTextSplitter(chunk_size=120, chunk_overlap=10).split_text(text) == [
+        question,
+        first_answer,
+        second_answer,
+    ]
+
+
+def test_unknown_chunking_strategy_is_rejected() -> None:
+    assert isinstance(make_text_splitter("sections", 100, 10), SectionTextSplitter)
+    with pytest.raises(ValueError):
+        make_text_splitter("semantic", 100, 10)
@@ -0,0 +1,61 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pickle
+
+import pytest
+from data_ingestion_pipeline.utils.text_splitter import make_text_splitter
+from data_ingestion_pipeline.utils.tokens import TokenCounter, estimate_tokens
+
+
+def test_estimate_tokens_counts_symbols_and_long_words() -> None:
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("how do I sort a list") == 6
+    assert estimate_tokens("df.sort_values(by='a')") == 12
+    assert estimate_tokens("internationalization") == 4
+
+    prose = "You can sort the rows of a data frame by one of its columns. " * 20
+    code = "df = df.sort_values(by=['a', 'b'], ascending=[True, False])\n" * 20
+    assert estimate_tokens(code) / len(code) > estimate_tokens(prose) / len(prose)
+
+
+def test_token_counter_memoizes_short_texts() -> None:
+    counter = TokenCounter(max_memo_chars=10, max_entries=2)
+    texts = ["a b", "a b", "c.d", "a long text with words"]
+
+    assert [counter(text) for text in texts] == [estimate_tokens(t) for t in texts]
+    assert len(counter) == 2
+    counter("e")
+    assert len(counter) == 1
+
+    clone = pickle.loads(pickle.dumps(counter))
+    assert len(clone) == 0
+    assert clone("a b") == 2
+
+
+def test_token_chunks_fit_in_chunk_size() -> None:
+    text = "\n\n".join(
+        f"## Answer {n}:\nUse `df.groupby('key')[['a', 'b']].sum()` then "
+        "plot it with matplotlib.\n" * (n % 4 + 1)
+        for n in range(30)
+    )
+
+    for strategy in ("recursive", "sections"):
+        splitter = make_text_splitter(strategy, 60, 10, length_unit="tokens")
+        chunks = splitter.split_text(text)
+        assert len(chunks) > 1
+        assert max(estimate_tokens(chunk) for chunk in chunks) <= 60
+
+    with pytest.raises(ValueError):
+        make_text_splitter("recursive", 60, 10, length_unit="words")
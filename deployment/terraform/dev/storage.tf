@@ -38,6 +38,15 @@ resource "google_storage_bucket" "data_ingestion_PIPELINE_GCS_ROOT" {
 }
 
 
+resource "google_artifact_registry_repository" "repo_artifacts_dev" {
+  location      = var.region
+  repository_id = "${var.project_name}-repo"
+  description   = "Repo for the data ingestion pipeline component image"
+  format        = "DOCKER"
+  project       = var.dev_project_id
+  depends_on    = [resource.google_project_service.services]
+}
+
 resource "google_discovery_engine_data_store" "data_store_dev" {
   location                    = var.data_store_region
   project                     = var.dev_project_id
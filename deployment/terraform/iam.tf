@@ -56,6 +56,17 @@ resource "google_project_iam_member" "cicd_run_invoker_artifact_registry_reader"
 
 }
 
+# 3b. Allow Vertex AI Pipelines to pull the data ingestion component image stored in the CICD project
+resource "google_project_iam_member" "vertexai_pipeline_artifact_registry_reader" {
+  for_each = local.deploy_project_ids
+  project  = var.cicd_runner_project_id
+
+  role       = "roles/artifactregistry.reader"
+  member     = "serviceAccount:service-${data.google_project.projects[each.key].number}@gcp-sa-aiplatform-cc.iam.gserviceaccount.com"
+  depends_on = [resource.google_project_service.cicd_services, resource.google_project_service.shared_services]
+
+}
+
 # 4. Grant Cloud Run SA the required permissions to run the application
 resource "google_project_iam_member" "cloud_run_app_sa_roles" {
   for_each = {